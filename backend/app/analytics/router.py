@@ -3,10 +3,25 @@ from collections import defaultdict
 
 from fastapi import APIRouter, Depends, Query
 
+from app.cache import TTLCache
 from app.dependencies import get_current_user, get_authenticated_supabase
+from app.encoding import NegotiatedResponse
 
 router = APIRouter()
 
+# Raw reviews plus compacted history (partition_reviews.sql); each row
+# carries review_count and successful_count (rating >= 3)
+ACTIVITY = "review_activity"
+
+# Forgetting curve buckets: interval and card age in days, ease in steps of 0.2
+INTERVAL_EDGES = (1, 3, 7, 14, 30, 60, 120, 240)
+EASE_RANGE = (1.3, 3.3, 10)
+AGE_EDGES = (7, 30, 90, 180, 365)
+
+# (user_id, days) -> (newest review time, curve). Deleted or backdated
+# reviews leave the newest time alone; the TTL bounds how long they go unseen.
+forgetting_curves = TTLCache(ttl_seconds=3600, max_entries=1000, name="forgetting_curves")
+
 
 @router.get("/summary")
 async def get_summary(
@@ -80,8 +95,8 @@ async def get_retention_rate(
     """Get retention rate over time."""
     start_date = datetime.now(timezone.utc) - timedelta(days=days)
 
-    response = supabase.table("reviews") \
-        .select("rating, reviewed_at") \
+    response = supabase.table(ACTIVITY) \
+        .select("reviewed_at, review_count, successful_count") \
         .eq("user_id", user["id"]) \
         .gte("reviewed_at", start_date.isoformat()) \
         .order("reviewed_at") \
@@ -90,11 +105,10 @@ async def get_retention_rate(
     # Group by date
     by_date = defaultdict(lambda: {"total": 0, "successful": 0})
 
-    for review in response.data:
-        date = review["reviewed_at"][:10]
-        by_date[date]["total"] += 1
-        if review["rating"] >= 3:
-            by_date[date]["successful"] += 1
+    for row in response.data:
+        date = row["reviewed_at"][:10]
+        by_date[date]["total"] += row["review_count"]
+        by_date[date]["successful"] += row["successful_count"]
 
     # Calculate retention rate per day
     result = []
@@ -118,19 +132,19 @@ async def get_heatmap(
     """Get activity heatmap data (GitHub-style)."""
     start_date = datetime.now(timezone.utc) - timedelta(days=days)
 
-    response = supabase.table("reviews") \
-        .select("reviewed_at") \
+    response = supabase.table(ACTIVITY) \
+        .select("reviewed_at, review_count") \
         .eq("user_id", user["id"]) \
         .gte("reviewed_at", start_date.isoformat()) \
         .execute()
 
     # Count reviews per day
     by_date = defaultdict(int)
-    for review in response.data:
-        date = review["reviewed_at"][:10]
-        by_date[date] += 1
+    for row in response.data:
+        date = row["reviewed_at"][:10]
+        by_date[date] += row["review_count"]
 
-    return [{"date": k, "count": v} for k, v in sorted(by_date.items())]
+    return NegotiatedResponse([{"date": k, "count": v} for k, v in sorted(by_date.items())])
 
 
 @router.get("/topics")
@@ -139,22 +153,34 @@ async def get_topics_performance(
     supabase=Depends(get_authenticated_supabase)
 ):
     """Get performance breakdown by topic."""
-    # Get all reviews with item metadata
-    response = supabase.table("reviews") \
-        .select("rating, items(metadata)") \
+    # All review activity, then item metadata (the view has no foreign keys
+    # to embed through)
+    response = supabase.table(ACTIVITY) \
+        .select("item_id, review_count, successful_count") \
         .eq("user_id", user["id"]) \
         .execute()
 
+    by_item = defaultdict(lambda: {"total": 0, "successful": 0})
+    for row in response.data:
+        by_item[row["item_id"]]["total"] += row["review_count"]
+        by_item[row["item_id"]]["successful"] += row["successful_count"]
+
+    items = []
+    if by_item:
+        items = supabase.table("items") \
+            .select("id, metadata") \
+            .eq("user_id", user["id"]) \
+            .execute().data
+
     # Aggregate by topic
     by_topic = defaultdict(lambda: {"total": 0, "successful": 0})
 
-    for review in response.data:
-        if review.get("items") and review["items"].get("metadata"):
-            topics = review["items"]["metadata"].get("topics", [])
-            for topic in topics:
-                by_topic[topic]["total"] += 1
-                if review["rating"] >= 3:
-                    by_topic[topic]["successful"] += 1
+    for item in items:
+        counts = by_item.get(item["id"])
+        if counts and item.get("metadata"):
+            for topic in item["metadata"].get("topics", []):
+                by_topic[topic]["total"] += counts["total"]
+                by_topic[topic]["successful"] += counts["successful"]
 
     # Calculate success rate per topic
     result = []
@@ -169,6 +195,63 @@ async def get_topics_performance(
     return sorted(result, key=lambda x: x["total_reviews"], reverse=True)
 
 
+@router.get("/forgetting-curve")
+async def get_forgetting_curve(
+    days: int = Query(default=365, ge=1, le=3650),
+    user: dict = Depends(get_current_user),
+    supabase=Depends(get_authenticated_supabase)
+):
+    """Success rate by interval, ease factor and card age.
+
+    Built from the ease and interval snapshots stored with each review,
+    so it covers raw reviews only (not compacted history). The grouping
+    runs in the database; the result is cached until the user's review
+    log gets a newer review.
+    """
+    # The newest review is the version: one row off the end of
+    # idx_reviews_user_date, where a count would read the whole log
+    latest = supabase.table("reviews") \
+        .select("reviewed_at") \
+        .eq("user_id", user["id"]) \
+        .order("reviewed_at", desc=True) \
+        .limit(1) \
+        .execute()
+    version = latest.data[0]["reviewed_at"] if latest.data else None
+
+    key = (user["id"], days)
+    cached = forgetting_curves.get(key)
+    if cached is not None and cached[0] == version:
+        return NegotiatedResponse(cached[1])
+
+    low, high, buckets = EASE_RANGE
+    response = supabase.rpc("forgetting_curve", {
+        "p_interval_edges": list(INTERVAL_EDGES),
+        "p_ease_low": low,
+        "p_ease_high": high,
+        "p_ease_buckets": buckets,
+        "p_age_edges": list(AGE_EDGES),
+        "p_days": days,
+    }).execute()
+
+    ease_edges = [round(low + (high - low) * i / buckets, 2) for i in range(buckets + 1)]
+    edges = {"interval": INTERVAL_EDGES, "ease": ease_edges, "age": AGE_EDGES}
+    curve = {dimension: [] for dimension in edges}
+    for row in response.data or []:
+        bounds = edges[row["dimension"]]
+        bucket = row["bucket"]
+        total = row["review_count"]
+        curve[row["dimension"]].append({
+            "min": bounds[bucket - 1] if bucket > 0 else None,
+            "max": bounds[bucket] if bucket < len(bounds) else None,
+            "total_reviews": total,
+            "success_rate": round(row["successful_count"] / total * 100, 1) if total else 0,
+        })
+
+    result = {"total_reviews": sum(b["total_reviews"] for b in curve["interval"]), **curve}
+    forgetting_curves.set(key, (version, result))
+    return NegotiatedResponse(result)
+
+
 async def calculate_streak(user_id: str, supabase) -> int:
     """Calculate current review streak in days."""
     # Get reviews from last 60 days
@@ -0,0 +1,166 @@
+"""Single-flight coalescing of identical concurrent GET requests.
+
+Dashboard mounts, remounts and extra tabs send the same GETs at the same
+moment. ``CoalesceMiddleware`` lets the first of a set of identical
+requests (same bearer token, path, normalized query string and
+negotiation headers) run, and replays its response to the others that
+arrive while it is in flight. With ``coalesce_cache_ms`` set, successful
+responses are also reused for that long; any write by the same caller
+drops them, so a user never sees their own change missing.
+
+Requests served from another's response never reach the route or auth, so
+they take the route (for metrics) and the verified user of the request
+that ran, and are charged that user's rate limit bucket as if they had run.
+
+State is per worker process. Requests without a bearer token pass through.
+"""
+import asyncio
+import hashlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import TTLCache
+from app.ratelimit import RateLimiter, send_too_many_requests, user_retry_after
+
+# Headers that change the response body, so they are part of the key
+VARY_HEADERS = ("accept", "accept-encoding")
+
+CapturedResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class Shared(NamedTuple):
+    """A response and what the request that produced it resolved."""
+
+    response: CapturedResponse
+    route: Any
+    user_id: Optional[str]
+
+
+class CoalesceMiddleware:
+    """Share one in-flight (and optionally recent) response among identical GETs."""
+
+    def __init__(self, app: ASGIApp, cache_ms: int = 0, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.cache_ms = cache_ms
+        # Per-user buckets; defaults to the one get_current_user charges
+        self.limiter = limiter
+        self.cache = TTLCache(ttl_seconds=cache_ms / 1000, name="coalesce") if cache_ms else None
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        # Bumped on every write by a caller; older cache entries are unreachable
+        self._generations = TTLCache(ttl_seconds=3600)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization")
+        if not authorization or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        caller = hashlib.sha256(authorization.encode()).hexdigest()
+        if scope["method"] != "GET":
+            # Again once the write is done: GETs that ran alongside it may
+            # have cached the state from before it
+            self._bump(caller)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._bump(caller)
+            return
+
+        key = self._key(scope, headers, caller)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                await self._serve(scope, send, cached, b"cache")
+                return
+
+        leader = self._in_flight.get(key)
+        if leader is not None:
+            try:
+                shared = await asyncio.shield(leader)
+            except Exception:
+                # The shared run failed outright; run this request on its own
+                await self.app(scope, receive, send)
+                return
+            await self._serve(scope, send, shared, b"hit")
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        messages: List[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException as exc:
+            future.set_exception(exc if isinstance(exc, Exception) else RuntimeError("cancelled"))
+            future.exception()  # mark retrieved when there are no followers
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        # Routing and get_current_user record these on the scope as they run
+        shared = Shared(self._collect(messages), scope.get("route"), scope.get("state", {}).get("user_id"))
+        future.set_result(shared)
+        if self.cache is not None and shared.response[0] == 200:
+            self.cache.set(key, shared)
+
+        for message in messages:
+            await send(message)
+
+    async def _serve(self, scope: Scope, send: Send, shared: Shared, how: bytes) -> None:
+        """Replay a shared response, charging the user like a request that ran."""
+        if shared.route is not None:
+            scope["route"] = shared.route
+        if shared.user_id is not None:
+            retry_after = user_retry_after(shared.user_id, scope["method"], scope["path"], self.limiter)
+            if retry_after:
+                await send_too_many_requests(send, retry_after)
+                return
+        await self._replay(shared.response, send, how)
+
+    def _bump(self, caller: str) -> None:
+        self._generations.set(caller, (self._generations.get(caller) or 0) + 1)
+
+    def _key(self, scope: Scope, headers: Headers, caller: str) -> tuple:
+        query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode(), keep_blank_values=True)))
+        return (
+            caller,
+            self._generations.get(caller) or 0,
+            scope["path"],
+            query,
+            tuple(headers.get(name, "") for name in VARY_HEADERS),
+        )
+
+    @staticmethod
+    def _collect(messages: List[Message]) -> CapturedResponse:
+        status = 500
+        response_headers: List[Tuple[bytes, bytes]] = []
+        body = b""
+        for message in messages:
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                body += message.get("body", b"")
+        return status, response_headers, body
+
+    @staticmethod
+    async def _replay(captured: CapturedResponse, send: Send, how: bytes) -> None:
+        status, response_headers, body = captured
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": response_headers + [(b"x-coalesced", how)],
+        })
+        await send({"type": "http.response.body", "body": body})
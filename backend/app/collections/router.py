@@ -3,7 +3,10 @@ from uuid import UUID
 from fastapi import APIRouter, Depends
 
 from app.dependencies import get_current_user, get_authenticated_supabase, ensure_profile_exists
-from app.collections.schemas import CollectionCreate, CollectionUpdate, CollectionResponse
+from app.collections.schemas import (
+    CollectionCreate, CollectionUpdate, CollectionResponse, CollectionClone, CollectionMerge, CopyResult,
+)
+from app.reviews.ingest import review_ingestor
 from app.services.collections import CollectionsService
 
 router = APIRouter()
@@ -19,10 +22,15 @@ def get_collections_service(
 
 @router.get("/")
 async def list_collections(
+    with_stats: bool = False,
     service: CollectionsService = Depends(get_collections_service)
 ):
-    """List user's collections."""
-    return await service.list()
+    """List user's collections.
+
+    With ``with_stats=true`` each collection carries item, due and
+    new/learning/review counts plus its 30-day retention rate.
+    """
+    return await service.list(with_stats=with_stats)
 
 
 @router.post("/", response_model=CollectionResponse)
@@ -53,11 +61,55 @@ async def get_collection(
 async def update_collection(
     collection_id: UUID,
     collection: CollectionUpdate,
+    user: dict = Depends(get_current_user),
     service: CollectionsService = Depends(get_collections_service)
 ):
     """Update collection."""
     update_data = collection.model_dump(exclude_unset=True)
-    return await service.update(collection_id, update_data, not_found_message="Collection not found")
+    updated = await service.update(collection_id, update_data, not_found_message="Collection not found")
+    if "config" in update_data:
+        # The scheduler engine may have changed
+        review_ingestor.invalidate_engine(user["id"])
+    return updated
+
+
+@router.post("/{collection_id}/clone", response_model=CopyResult)
+async def clone_collection(
+    collection_id: UUID,
+    request: CollectionClone,
+    user: dict = Depends(get_current_user),
+    service: CollectionsService = Depends(get_collections_service)
+):
+    """Copy a collection, its active items and (by default) their progress.
+
+    Runs inside the database; ``collection_id`` in the result is the copy.
+    """
+    if request.include_progress:
+        # Copy the states with every acknowledged review applied
+        await review_ingestor.settle(user["id"])
+    result = await service.clone(
+        collection_id, request.name, request.description, request.include_progress
+    )
+    # The copy carries the source's config, possibly another scheduler
+    review_ingestor.invalidate_engine(user["id"])
+    return result
+
+
+@router.post("/{collection_id}/merge", response_model=CopyResult)
+async def merge_collection(
+    collection_id: UUID,
+    request: CollectionMerge,
+    user: dict = Depends(get_current_user),
+    service: CollectionsService = Depends(get_collections_service)
+):
+    """Copy this collection's active items into ``target_id``.
+
+    Items the target already has (same external ID, or same title when
+    there is none) are skipped and counted. The source is left as is.
+    """
+    if request.include_progress:
+        await review_ingestor.settle(user["id"])
+    return await service.merge(collection_id, request.target_id, request.include_progress)
 
 
 @router.delete("/{collection_id}")
@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from uuid import UUID
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, field_validator
+
+SCHEDULERS = ("sm2", "fsrs")
 
 
 class CollectionCreate(BaseModel):
@@ -14,6 +16,33 @@ class CollectionCreate(BaseModel):
 class CollectionUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    # e.g. {"scheduler": "fsrs", "desired_retention": 0.9}
+    config: Optional[Dict[str, Any]] = None
+
+    @field_validator("config")
+    @classmethod
+    def check_scheduler(cls, config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if config and config.get("scheduler", "sm2") not in SCHEDULERS:
+            raise ValueError(f"scheduler must be one of {', '.join(SCHEDULERS)}")
+        return config
+
+
+class CollectionClone(BaseModel):
+    name: str
+    description: Optional[str] = None
+    # Copy scheduling states too; otherwise the copies start out new
+    include_progress: bool = True
+
+
+class CollectionMerge(BaseModel):
+    target_id: UUID
+    include_progress: bool = True
+
+
+class CopyResult(BaseModel):
+    collection_id: UUID
+    copied: int
+    skipped: int
 
 
 class CollectionResponse(BaseModel):
@@ -1,5 +1,7 @@
-import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 # Get the root directory (two levels up from this file)
@@ -13,10 +15,68 @@ class Settings(BaseSettings):
     supabase_anon_key: str
     supabase_service_key: str
 
+    # Background jobs (imports, recomputes)
+    job_max_concurrency: int = 2
+    # Unfinished job rows are touched this often; rows left untouched for
+    # longer than the orphan timeout belong to a stopped worker and fail
+    job_heartbeat_seconds: float = 30.0
+    job_orphan_after_seconds: float = 300.0
+
+    # /api/metrics is open unless a token is set (sent as a Bearer token)
+    metrics_token: str | None = None
+
+    # Per-request profiling: requests carrying the token (X-Profile header)
+    # are profiled, plus a random 1-in-N sample when the rate is non-zero
+    profile_token: str | None = None
+    profile_sample_rate: int = 0
+    profile_dir: str = "profiles"
+
+    # Review ingestion: "direct" writes each review to the database before
+    # acknowledging it; "log" acknowledges once it is in a local fsync'd log
+    # and writes to the database in batches (see app/reviews/ingest.py)
+    review_ingest_mode: Literal["direct", "log"] = "direct"
+    review_log_dir: str = "review_log"
+    review_flush_interval_seconds: float = 1.0
+    review_flush_batch_size: int = 500
+
+    # Per-user token buckets (requests per second, burst) by route class.
+    # Client addresses can also get the same buckets scaled by the
+    # multiplier, checked before the token is verified. That needs the real
+    # client address: set rate_limit_per_address when clients connect
+    # directly, or list the proxies in front of the app (comma-separated IPs
+    # or CIDRs) to read it from X-Forwarded-For.
+    rate_limit_enabled: bool = True
+    rate_limit_per_address: bool = False
+    rate_limit_trusted_proxies: str = ""
+    rate_limit_ip_multiplier: float = 10.0
+    rate_limit_read_rate: float = 20.0
+    rate_limit_read_burst: int = 100
+    rate_limit_write_rate: float = 10.0
+    rate_limit_write_burst: int = 50
+    rate_limit_import_rate: float = 0.1
+    rate_limit_import_burst: int = 3
+
+    # Synchronous imports running at once per worker
+    import_max_concurrency: int = 2
+
+    # Identical concurrent GETs per caller share one execution; with a
+    # non-zero cache window, successful responses are reused that long
+    coalesce_enabled: bool = True
+    coalesce_cache_ms: int = 0
+
+    # Responses smaller than this are sent uncompressed
+    gzip_minimum_size: int = 1024
+
+    # No route uses Prisma; connect it at startup only when enabled
+    prisma_connect_on_startup: bool = False
+
     class Config:
         env_file = str(ENV_FILE)
         case_sensitive = False
         extra = "ignore"  # Ignore extra fields like VITE_* vars
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Settings, read from the environment on first use."""
+    return Settings()
@@ -1,25 +1,37 @@
 import os
-from prisma import Prisma
 from contextlib import asynccontextmanager
-from .config import settings
+from functools import lru_cache
 
-# Ensure DATABASE_URL is set in environment for Prisma
-# Prisma reads from env("DATABASE_URL") in schema.prisma
-os.environ["DATABASE_URL"] = settings.database_url
+from .config import get_settings
 
-# Global Prisma client instance
-# Prisma will read DATABASE_URL from environment
-db = Prisma()
+
+@lru_cache
+def get_prisma():
+    """Global Prisma client, built on first use.
+
+    Importing the generated client is slow, and no route needs it, so it is
+    kept off the import path of the app.
+    """
+    from prisma import Prisma
+
+    # Ensure DATABASE_URL is set in environment for Prisma
+    # Prisma reads from env("DATABASE_URL") in schema.prisma
+    os.environ["DATABASE_URL"] = get_settings().database_url
+    return Prisma()
 
 
 async def connect_db():
     """Connect to the database."""
+    db = get_prisma()
     if not db.is_connected():
         await db.connect()
 
 
 async def disconnect_db():
-    """Disconnect from the database."""
+    """Disconnect from the database, if it was ever connected."""
+    if get_prisma.cache_info().currsize == 0:
+        return
+    db = get_prisma()
     if db.is_connected():
         await db.disconnect()
 
@@ -29,6 +41,6 @@ async def get_db():
     """Context manager for database sessions."""
     await connect_db()
     try:
-        yield db
+        yield get_prisma()
     finally:
         pass  # Keep connection alive for reuse
@@ -1,25 +1,46 @@
-from fastapi import Depends, HTTPException, status
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
 
-from app.config import settings
+from app.cache import TTLCache
+from app.config import get_settings
+from app.ratelimit import check_user_rate
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 security = HTTPBearer()
 
+# Users whose profile row is known to exist (skips a lookup per write)
+known_profiles = TTLCache(ttl_seconds=3600, name="known_profiles")
+
 
-def get_supabase() -> Client:
+@lru_cache
+def get_supabase() -> "Client":
+    """Shared anon client, built on first use (auth lookups only)."""
+    from supabase import create_client
+
+    settings = get_settings()
     return create_client(settings.supabase_url, settings.supabase_anon_key)
 
 
-def get_supabase_admin() -> Client:
+@lru_cache
+def get_supabase_admin() -> "Client":
+    """Shared service-role client, built on first use."""
+    from supabase import create_client
+
+    settings = get_settings()
     return create_client(settings.supabase_url, settings.supabase_service_key)
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    supabase: Client = Depends(get_supabase)
+    supabase=Depends(get_supabase)
 ) -> dict:
-    """Verify JWT token and return user data."""
+    """Verify JWT token, charge the user's rate limit and return user data."""
     try:
         token = credentials.credentials
         user_response = supabase.auth.get_user(token)
@@ -30,7 +51,10 @@ async def get_current_user(
                 detail="Invalid or expired token"
             )
 
-        return {
+        # Expose the user to middleware (profiling, metrics)
+        request.state.user_id = user_response.user.id
+
+        user = {
             "id": user_response.user.id,
             "email": user_response.user.email,
             "token": token
@@ -41,9 +65,15 @@ async def get_current_user(
             detail=str(e)
         )
 
+    check_user_rate(request, user["id"])
+    return user
+
 
-def get_authenticated_supabase(user: dict = Depends(get_current_user)) -> Client:
+def get_authenticated_supabase(user: dict = Depends(get_current_user)) -> "Client":
     """Get Supabase client with user's JWT token for RLS."""
+    from supabase import create_client
+
+    settings = get_settings()
     client = create_client(settings.supabase_url, settings.supabase_anon_key)
     # Set the Authorization header on the postgrest client so RLS policies can identify the user
     # This allows auth.uid() in RLS policies to work correctly
@@ -56,9 +86,12 @@ def get_authenticated_supabase(user: dict = Depends(get_current_user)) -> Client
 
 async def ensure_profile_exists(
     user: dict = Depends(get_current_user),
-    supabase: Client = Depends(get_authenticated_supabase)
+    supabase=Depends(get_authenticated_supabase)
 ) -> None:
     """Ensure user profile exists in database. Create if missing."""
+    if known_profiles.get(user["id"]):
+        return
+
     # Check if profile exists
     try:
         response = supabase.table("profiles") \
@@ -68,6 +101,7 @@ async def ensure_profile_exists(
         
         # Profile exists if we got any data back
         if response.data and len(response.data) > 0:
+            known_profiles.set(user["id"], True)
             return
     except Exception:
         # If check fails, try to create profile anyway
@@ -85,6 +119,7 @@ async def ensure_profile_exists(
             "new_items_per_day": 20,
             "default_ease_factor": 2.5
         }).execute()
+        known_profiles.set(user["id"], True)
     except Exception as e:
         # If insert fails, check the error type
         error_str = str(e).lower()
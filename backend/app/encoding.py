@@ -0,0 +1,95 @@
+"""Response encoding negotiated from the Accept header.
+
+Clients sending ``Accept: application/msgpack`` get MessagePack, everyone
+else JSON. JSON is encoded with orjson when it is installed (several times
+faster than the stdlib encoder on large lists), and falls back to the
+stdlib otherwise; the output is the same compact JSON either way. Large
+bodies are gzipped by ``GZipMiddleware`` in ``app.main``.
+
+FastAPI runs ``jsonable_encoder`` over whatever a route returns, which
+dominates serialization time for large lists. Routes returning rows as
+PostgREST sent them (already JSON types) return ``NegotiatedResponse(rows)``
+directly to skip that pass.
+"""
+import json
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack is then never negotiated
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_accept: ContextVar[Optional[str]] = ContextVar("accept", default=None)
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether the Accept header asks for MessagePack (and we can encode it)."""
+    if not accept or msgpack is None:
+        return False
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        if media_type.strip().lower() in MSGPACK_MEDIA_TYPES:
+            # An explicit q=0 means "not acceptable"
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0")
+    return False
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+class NegotiatedResponse(JSONResponse):
+    """Default response class: MessagePack or JSON per the request's Accept header."""
+
+    def render(self, content: Any) -> bytes:
+        if wants_msgpack(_accept.get()):
+            self.media_type = MSGPACK_MEDIA_TYPES[0]
+            return encode_msgpack(content)
+        return encode_json(content)
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        # Caches must key on Accept, since the body depends on it
+        self.raw_headers.append((b"vary", b"Accept"))
+
+
+class NegotiationMiddleware:
+    """Expose the Accept header to ``NegotiatedResponse`` for this request.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so responses are not
+    re-streamed on the way out.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _accept.set(Headers(scope=scope).get("accept"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _accept.reset(token)
@@ -0,0 +1,115 @@
+"""Sparse fieldsets (``fields=`` query parameter).
+
+List views ask only for the columns they render. ``fields`` is either a
+preset name (``card``, ``list``, ``full``) or a comma-separated list of
+columns; columns of the embedded resource are prefixed with the embed name,
+as they appear in the response (``title,scheduling_states.next_review_at``).
+The choice is translated into the PostgREST select list, so unrequested
+columns are never read from the database.
+"""
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from fastapi import HTTPException
+
+ITEM_COLUMNS = frozenset({
+    "id", "user_id", "collection_id", "title", "external_id", "external_url",
+    "metadata", "notes", "created_at", "updated_at", "archived_at",
+})
+
+STATE_COLUMNS = frozenset({
+    "id", "item_id", "user_id", "ease_factor", "interval_days", "repetitions",
+    "status", "next_review_at", "last_review_at", "last_rating",
+    "stability", "difficulty", "created_at", "updated_at",
+})
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    """Selectable columns of a resource and one embedded resource."""
+
+    columns: FrozenSet[str]
+    embed: str
+    embed_columns: FrozenSet[str]
+    presets: Dict[str, Tuple[str, str]]
+    # Always selected, because the endpoint itself reads them
+    required: Tuple[str, ...] = ()
+    embed_required: Tuple[str, ...] = ()
+
+    def resolve(self, fields: Optional[str]) -> Tuple[str, str]:
+        """Select lists for the resource and the embed, validated.
+
+        Raises 400 for unknown presets or columns.
+        """
+        fields = (fields or "full").strip()
+        if fields in self.presets:
+            return self.presets[fields]
+
+        columns = list(self.required)
+        embed_columns = list(self.embed_required)
+        unknown = []
+        for field in (f.strip() for f in fields.split(",")):
+            if not field:
+                continue
+            embed, _, column = field.rpartition(".")
+            if not embed and column in self.columns:
+                target = columns
+            elif embed == self.embed and column in self.embed_columns:
+                target = embed_columns
+            else:
+                unknown.append(field)
+                continue
+            if column not in target:
+                target.append(column)
+
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. "
+                       f"Use a preset ({', '.join(self.presets)}) or columns of "
+                       f"this resource and '{self.embed}.<column>'"
+            )
+
+        return ", ".join(columns), ", ".join(embed_columns)
+
+
+# Items with their scheduling state (items list and detail)
+ITEM_FIELDS = FieldSet(
+    columns=ITEM_COLUMNS,
+    embed="scheduling_states",
+    embed_columns=STATE_COLUMNS,
+    presets={
+        "card": (
+            "id, title, external_id, external_url, metadata",
+            "status, next_review_at, last_review_at, last_rating",
+        ),
+        "list": (
+            "id, collection_id, title, external_id, external_url, metadata, created_at, archived_at",
+            "status, interval_days, repetitions, next_review_at, last_review_at, last_rating",
+        ),
+        "full": ("*", "*"),
+    },
+    # recent_review is built from these
+    required=("id",),
+    embed_required=("last_rating", "last_review_at"),
+)
+
+# Due scheduling states with their item (review queue)
+DUE_FIELDS = FieldSet(
+    columns=STATE_COLUMNS,
+    embed="items",
+    embed_columns=ITEM_COLUMNS,
+    presets={
+        "card": (
+            "item_id, status, next_review_at, interval_days",
+            "id, title, external_id, external_url, metadata",
+        ),
+        "list": (
+            "item_id, status, ease_factor, interval_days, repetitions, next_review_at, last_review_at, last_rating",
+            "id, collection_id, title, external_id, external_url, metadata",
+        ),
+        "full": ("*", "*"),
+    },
+    required=("item_id",),
+    embed_required=("id",),
+)
@@ -1,11 +1,14 @@
 from uuid import UUID
-from typing import Optional
+from typing import Optional, List
 
 from fastapi import APIRouter, Depends, Query
 
 from app.dependencies import get_current_user, get_authenticated_supabase, ensure_profile_exists
+from app.encoding import NegotiatedResponse
+from app.fields import ITEM_FIELDS
+from app.ratelimit import import_slot
 from app.items.schemas import ItemCreate, ItemUpdate, ItemBulkCreate, ItemResponse
-from app.services.items import ItemsService
+from app.services.items import ItemsService, build_metadata_filter, encode_cursor, decode_cursor
 
 router = APIRouter()
 
@@ -23,10 +26,57 @@ async def list_items(
     collection_id: Optional[UUID] = None,
     archived: bool = False,
     limit: int = Query(default=100, le=500),
+    difficulty: Optional[str] = None,
+    topic: Optional[List[str]] = Query(default=None),
+    pattern: Optional[str] = None,
+    tag: Optional[UUID] = None,
+    facets: bool = False,
+    fields: Optional[str] = Query(default=None, max_length=500),
     service: ItemsService = Depends(get_items_service)
 ):
-    """List items with optional filtering."""
-    return await service.list(collection_id=collection_id, archived=archived, limit=limit)
+    """List items with optional filtering.
+
+    ``fields`` selects a preset (``card``, ``list``, ``full``) or a column
+    list such as ``title,metadata,scheduling_states.next_review_at``.
+
+    With ``facets=true`` the response is ``{"items": [...], "facets": {...}}``
+    with per-difficulty, topic and pattern counts for the filtered set.
+    """
+    metadata_filter = build_metadata_filter(difficulty, topic, pattern)
+    items = await service.list(
+        collection_id=collection_id,
+        archived=archived,
+        limit=limit,
+        metadata_filter=metadata_filter,
+        tag_id=tag,
+        fields=fields
+    )
+
+    if not facets:
+        return NegotiatedResponse(items)
+
+    return NegotiatedResponse({
+        "items": items,
+        "facets": await service.facets(
+            collection_id=collection_id,
+            archived=archived,
+            metadata_filter=metadata_filter,
+            tag_id=tag
+        ),
+    })
+
+
+@router.get("/search")
+async def search_items(
+    q: str = Query(min_length=1, max_length=200),
+    collection_id: Optional[UUID] = None,
+    archived: bool = False,
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    service: ItemsService = Depends(get_items_service)
+):
+    """Search items by title, notes and external ID."""
+    return await service.search(q, collection_id=collection_id, archived=archived, limit=limit, offset=offset)
 
 
 @router.post("/", response_model=ItemResponse)
@@ -50,7 +100,8 @@ async def create_item(
 async def bulk_create_items(
     bulk_items: ItemBulkCreate,
     service: ItemsService = Depends(get_items_service),
-    _: None = Depends(ensure_profile_exists)
+    _: None = Depends(ensure_profile_exists),
+    __: None = Depends(import_slot)
 ):
     """Bulk import items."""
     return await service.bulk_create(bulk_items.collection_id, bulk_items.items)
@@ -59,10 +110,36 @@ async def bulk_create_items(
 @router.get("/{item_id}")
 async def get_item(
     item_id: UUID,
+    fields: Optional[str] = Query(default=None, max_length=500),
+    service: ItemsService = Depends(get_items_service)
+):
+    """Get item details, optionally restricted to a sparse fieldset."""
+    columns, state_columns = ITEM_FIELDS.resolve(fields)
+    return await service.get(
+        item_id,
+        select=f"{columns}, scheduling_states({state_columns})",
+        not_found_message="Item not found"
+    )
+
+
+@router.get("/{item_id}/reviews")
+async def get_item_reviews(
+    item_id: UUID,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, max_length=100),
     service: ItemsService = Depends(get_items_service)
 ):
-    """Get item details."""
-    return await service.get(item_id, select="*, scheduling_states(*)", not_found_message="Item not found")
+    """An item's rating and interval timeline, newest first.
+
+    Pass ``next_cursor`` from a page as ``cursor`` to get the next one;
+    it is null on the last page.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether another page exists
+    rows = await service.review_timeline(item_id, limit=limit + 1, before=before)
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]["reviewed_at"], page[-1]["id"]) if len(rows) > limit else None
+    return NegotiatedResponse({"reviews": page, "next_cursor": next_cursor})
 
 
 @router.patch("/{item_id}")
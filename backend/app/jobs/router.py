@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.dependencies import get_current_user, get_authenticated_supabase, get_supabase_admin, ensure_profile_exists
+from app.items.schemas import ItemBulkCreate
+from app.jobs.runner import job_runner
+from app.jobs.schemas import JobResponse
+from app.presets.router import ImportPresetRequest, load_preset
+from app.reviews.ingest import review_ingestor
+from app.services.items import ItemsService
+from app.services.jobs import JobsService
+
+router = APIRouter()
+
+
+def get_jobs_service(
+    user: dict = Depends(get_current_user),
+    supabase = Depends(get_authenticated_supabase)
+) -> JobsService:
+    """Dependency to get jobs service."""
+    return JobsService(supabase, user["id"])
+
+
+def get_job_writer(
+    user: dict = Depends(get_current_user),
+    admin=Depends(get_supabase_admin)
+) -> JobsService:
+    """Jobs service on the service-role client, for the runner's writes.
+
+    Jobs can outlast the submitting request's token, so they never use it;
+    everything a job touches is filtered by the user id instead.
+    """
+    return JobsService(admin, user["id"])
+
+
+async def _import_preset(progress, service: ItemsService, collection_id: UUID, preset_data: dict):
+    return await service.import_preset(collection_id, preset_data, progress=progress)
+
+
+async def _bulk_create(progress, service: ItemsService, collection_id: UUID, items: list):
+    # No RLS on the service-role client: check the collection is the user's
+    collection = service.supabase.table("collections") \
+        .select("id") \
+        .eq("id", str(collection_id)) \
+        .eq("user_id", service.user_id) \
+        .maybe_single() \
+        .execute()
+    if not collection or not collection.data:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+    result = await service.bulk_create(collection_id, items, progress=progress)
+    # Keep the stored result small; the items can be listed normally
+    return {"message": result["message"], "items_created": len(result["items"])}
+
+
+async def _fit_fsrs(progress, supabase, user_id: str):
+    from app.reviews.fsrs_optimizer import build_sequences, fetch_reviews, fit_parameters
+
+    profile = supabase.table("profiles") \
+        .select("fsrs_parameters") \
+        .eq("id", user_id) \
+        .maybe_single() \
+        .execute()
+    if not profile or not profile.data:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    sequences = build_sequences(fetch_reviews(supabase, user_id))
+    await progress(1, 3)
+
+    # CPU-bound; a spawned process keeps it off the GIL the API threads share
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        result = await loop.run_in_executor(pool, fit_parameters, sequences, profile.data.get("fsrs_parameters"))
+    await progress(2, 3)
+
+    if result["parameters"] is not None:
+        supabase.table("profiles").update({"fsrs_parameters": result["parameters"]}).eq("id", user_id).execute()
+        review_ingestor.invalidate_engine(user_id)
+    await progress(3, 3)
+    return result
+
+
+@router.get("/", response_model=list[JobResponse])
+async def list_jobs(
+    limit: int = Query(default=20, le=100),
+    service: JobsService = Depends(get_jobs_service)
+):
+    """List recent jobs."""
+    return await service.list(limit=limit)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: UUID,
+    service: JobsService = Depends(get_jobs_service)
+):
+    """Get job status, progress and result."""
+    return await service.get(job_id, not_found_message="Job not found")
+
+
+@router.post("/presets/{preset_name}/import", response_model=JobResponse, status_code=202)
+async def import_preset_job(
+    preset_name: str,
+    request: ImportPresetRequest,
+    user: dict = Depends(get_current_user),
+    admin=Depends(get_supabase_admin),
+    service: JobsService = Depends(get_job_writer),
+    _: None = Depends(ensure_profile_exists)
+):
+    """Queue a preset import and return the job."""
+    preset_data = load_preset(preset_name)
+    return await job_runner.submit(
+        service,
+        "preset_import",
+        _import_preset,
+        ItemsService(admin, user["id"]),
+        request.collection_id,
+        preset_data,
+        params={"preset": preset_name, "collection_id": str(request.collection_id)},
+    )
+
+
+@router.post("/items/bulk", response_model=JobResponse, status_code=202)
+async def bulk_create_items_job(
+    bulk_items: ItemBulkCreate,
+    user: dict = Depends(get_current_user),
+    admin=Depends(get_supabase_admin),
+    service: JobsService = Depends(get_job_writer),
+    _: None = Depends(ensure_profile_exists)
+):
+    """Queue a bulk item import and return the job."""
+    return await job_runner.submit(
+        service,
+        "bulk_import",
+        _bulk_create,
+        ItemsService(admin, user["id"]),
+        bulk_items.collection_id,
+        bulk_items.items,
+        params={"collection_id": str(bulk_items.collection_id), "count": len(bulk_items.items)},
+    )
+
+
+@router.post("/fsrs/fit", response_model=JobResponse, status_code=202)
+async def fit_fsrs_job(
+    user: dict = Depends(get_current_user),
+    admin=Depends(get_supabase_admin),
+    service: JobsService = Depends(get_job_writer),
+    _: None = Depends(ensure_profile_exists)
+):
+    """Queue fitting of the user's FSRS parameters to their review log."""
+    return await job_runner.submit(service, "fsrs_fit", _fit_fsrs, admin, user["id"])
@@ -0,0 +1,238 @@
+"""In-process background job runner.
+
+Jobs are recorded in the ``jobs`` table and executed by a small pool of
+asyncio workers. Each job runs on its own event loop in a worker thread, so
+long imports and recomputes (whose Supabase calls are blocking) never stall
+the loop serving interactive requests.
+
+Job rows are written with the service-role client, so a job outlives the
+token of the request that submitted it; handlers get the user id and scope
+their own queries. The queue itself is in memory: while a job is queued or
+running its row's ``updated_at`` is touched every ``job_heartbeat_seconds``,
+and on each beat rows left unfinished and untouched for
+``job_orphan_after_seconds`` (their worker stopped or crashed) are marked
+failed. The first beat comes one interval after start, which keeps startup
+free of Supabase calls.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.dependencies import get_supabase_admin
+from app.metrics import metrics
+from app.services.jobs import JobsService
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ("queued", "running")
+
+JobHandler = Callable[..., Awaitable[Any]]
+
+
+class JobProgress:
+    """Progress reporter handed to job handlers."""
+
+    def __init__(self, service: JobsService, job_id: str):
+        self.service = service
+        self.job_id = job_id
+
+    async def __call__(self, done: int, total: int) -> None:
+        await self.service.update(self.job_id, {"progress": done, "total": total})
+
+
+class JobRunner:
+    """Bounded-concurrency job queue with no external broker."""
+
+    def __init__(self, max_concurrency: Optional[int] = None, supabase: Optional["Client"] = None):
+        # Defaults to the job_max_concurrency setting, read at start(), and
+        # the service-role client, built on first use
+        self.max_concurrency = max_concurrency
+        self.supabase = supabase
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Queued or running here; their rows get the heartbeat
+        self._unfinished: Set[str] = set()
+
+    async def start(self) -> None:
+        """Start the worker tasks and the heartbeat."""
+        if self._queue is not None:
+            return
+
+        if self.max_concurrency is None:
+            self.max_concurrency = get_settings().job_max_concurrency
+
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="job-worker"
+        )
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.max_concurrency)
+        ]
+        self._workers.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        """Stop the workers and mark jobs still queued or running here failed."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+        if self._unfinished:
+            try:
+                await asyncio.to_thread(
+                    self._fail, list(self._unfinished), "Interrupted: the server shut down before the job finished"
+                )
+            except Exception:
+                logger.exception("Could not fail unfinished jobs")
+        self._unfinished = set()
+
+        self._queue = None
+        self._workers = []
+        self._executor = None
+
+    async def submit(
+        self,
+        service: JobsService,
+        kind: str,
+        handler: JobHandler,
+        *args: Any,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Record a job and queue it. Returns the job row.
+
+        ``service`` should use the service-role client (see
+        ``get_job_writer``). The handler is called as
+        ``handler(progress, *args)`` and its return value is stored as the job
+        result.
+        """
+        if self._queue is None:
+            await self.start()
+
+        job = await service.create({
+            "kind": kind,
+            "status": "queued",
+            "params": params or {},
+        })
+        self._unfinished.add(job["id"])
+        await self._queue.put((job["id"], service, handler, args))
+        return job
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id, service, handler, args = await self._queue.get()
+            try:
+                await loop.run_in_executor(
+                    self._executor, self._run, job_id, service, handler, args
+                )
+            except Exception:
+                logger.exception("Job %s crashed", job_id)
+            finally:
+                self._unfinished.discard(job_id)
+                self._queue.task_done()
+
+    async def _heartbeat(self) -> None:
+        interval = get_settings().job_heartbeat_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._beat)
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def _admin(self) -> "Client":
+        if self.supabase is None:
+            self.supabase = get_supabase_admin()
+        return self.supabase
+
+    def _beat(self) -> None:
+        job_ids = list(self._unfinished)
+        if job_ids:
+            self._admin().table("jobs") \
+                .update({"updated_at": datetime.now(timezone.utc).isoformat()}) \
+                .in_("id", job_ids) \
+                .execute()
+        self._fail_orphans()
+
+    def _fail_orphans(self) -> None:
+        """Fail other workers' jobs that stopped getting the heartbeat."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=get_settings().job_orphan_after_seconds)
+        response = self._admin().table("jobs") \
+            .update({
+                "status": "failed",
+                "error": "Interrupted: the server stopped before the job finished",
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            }) \
+            .in_("status", list(UNFINISHED)) \
+            .lt("updated_at", cutoff.isoformat()) \
+            .execute()
+        if response.data:
+            logger.warning("Marked %d orphaned jobs failed", len(response.data))
+
+    def _fail(self, job_ids: List[str], error: str) -> None:
+        self._admin().table("jobs") \
+            .update({
+                "status": "failed",
+                "error": error,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            }) \
+            .in_("id", job_ids) \
+            .in_("status", list(UNFINISHED)) \
+            .execute()
+
+    def _run(
+        self,
+        job_id: str,
+        service: JobsService,
+        handler: JobHandler,
+        args: Tuple[Any, ...]
+    ) -> None:
+        asyncio.run(self._execute(job_id, service, handler, args))
+
+    async def _execute(
+        self,
+        job_id: str,
+        service: JobsService,
+        handler: JobHandler,
+        args: Tuple[Any, ...]
+    ) -> None:
+        await service.update(job_id, {
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+        try:
+            result = await handler(JobProgress(service, job_id), *args)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            detail = getattr(e, "detail", None) or str(e)
+            await service.update(job_id, {
+                "status": "failed",
+                "error": str(detail),
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            })
+            return
+
+        await service.update(job_id, {
+            "status": "succeeded",
+            "result": result,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+job_runner = JobRunner()
+metrics.register_gauge("spacerep_jobs_queued", "Background jobs waiting for a worker.", job_runner.queued)
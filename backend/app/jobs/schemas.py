@@ -0,0 +1,21 @@
+from datetime import datetime
+from uuid import UUID
+from typing import Optional, Any, Literal
+from pydantic import BaseModel
+
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobResponse(BaseModel):
+    id: UUID
+    kind: str
+    status: JobStatus
+    params: dict
+    progress: int
+    total: Optional[int]
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
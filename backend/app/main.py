@@ -1,6 +1,9 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.auth.router import router as auth_router
 from app.collections.router import router as collections_router
@@ -8,15 +11,35 @@ from app.items.router import router as items_router
 from app.reviews.router import router as reviews_router
 from app.analytics.router import router as analytics_router
 from app.presets.router import router as presets_router
+from app.jobs.router import router as jobs_router
+from app.tags.router import router as tags_router
+from app.sync.router import router as sync_router
+from app.jobs.runner import job_runner
+from app.reviews.ingest import review_ingestor
+from app.config import get_settings
 from app.database import connect_db, disconnect_db
+from app.encoding import NegotiatedResponse, NegotiationMiddleware
+from app.metrics import instrument_upstream, metrics, metrics_middleware
+from app.profiling import profiling_enabled, profiling_middleware
+from app.ratelimit import RateLimitMiddleware, per_address_configured
+from app.coalesce import CoalesceMiddleware
+
+# Measure every Supabase round trip
+instrument_upstream()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Connect to database
-    await connect_db()
+    # Startup: Connect to database (unused by the routes, so opt-in)
+    if get_settings().prisma_connect_on_startup:
+        await connect_db()
+    await job_runner.start()
+    if get_settings().review_ingest_mode == "log":
+        await review_ingestor.start()
     yield
-    # Shutdown: Disconnect from database
+    # Shutdown: Flush logged reviews, stop job workers and disconnect from database
+    await review_ingestor.stop()
+    await job_runner.stop()
     await disconnect_db()
 
 
@@ -24,9 +47,36 @@ app = FastAPI(
     title="SpaceRep API",
     description="Spaced repetition scheduling for LeetCode and more",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=NegotiatedResponse
 )
 
+# Compress large responses. Innermost, so it sees whole bodies (and skips
+# small ones), and the metrics below record response sizes as sent
+app.add_middleware(GZipMiddleware, minimum_size=get_settings().gzip_minimum_size)
+
+# MessagePack for clients that ask for it, JSON otherwise
+app.add_middleware(NegotiationMiddleware)
+
+# Opt-in per-request profiling (not installed unless configured)
+if profiling_enabled():
+    app.add_middleware(BaseHTTPMiddleware, dispatch=profiling_middleware)
+
+# Identical concurrent GETs share one execution. Inside the per-address
+# limiter; requests served a shared response are charged the per-user
+# bucket by the middleware itself.
+if get_settings().coalesce_enabled:
+    app.add_middleware(CoalesceMiddleware, cache_ms=get_settings().coalesce_cache_ms)
+
+# Per-address token buckets; rejects floods before they reach auth or
+# PostgREST (per-user buckets are charged in get_current_user). Off until
+# the client address can be trusted (see Settings).
+if get_settings().rate_limit_enabled and per_address_configured():
+    app.add_middleware(RateLimitMiddleware)
+
+# Request latency and upstream call metrics
+app.add_middleware(BaseHTTPMiddleware, dispatch=metrics_middleware)
+
 # CORS for local development
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +84,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Upstream-Calls", "X-Profile-File", "Retry-After"],
 )
 
 # Routers
@@ -43,8 +94,20 @@ app.include_router(items_router, prefix="/api/items", tags=["items"])
 app.include_router(reviews_router, prefix="/api/reviews", tags=["reviews"])
 app.include_router(analytics_router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(presets_router, prefix="/api/presets", tags=["presets"])
+app.include_router(tags_router, prefix="/api/tags", tags=["tags"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(sync_router, prefix="/api/sync", tags=["sync"])
 
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: str | None = Header(default=None)):
+    """Prometheus metrics for this worker."""
+    settings = get_settings()
+    if settings.metrics_token and authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return metrics.render()
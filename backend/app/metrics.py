@@ -0,0 +1,300 @@
+"""Request and upstream metrics, exposed in Prometheus text format.
+
+Every outgoing Supabase call (PostgREST queries and RPCs, auth lookups)
+goes through ``httpx.Client.send``, which is wrapped once at startup to
+attribute its latency and payload size to the API route being served.
+Metrics are kept per worker process.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import Request, Response
+
+from app.cache import registered_caches
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # bucket counts, then +Inf count, then sum
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {_format_value(cumulative)}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label set."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, value: float = 1) -> None:
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_duration = Histogram(
+            "spacerep_http_request_duration_seconds", "API request latency.", LATENCY_BUCKETS)
+        self.requests = Counter(
+            "spacerep_http_requests_total", "API requests by status code.")
+        self.response_bytes = Histogram(
+            "spacerep_http_response_bytes", "API response body size.", SIZE_BUCKETS)
+        self.request_errors = Counter(
+            "spacerep_http_request_errors_total", "API requests that raised or returned 5xx.")
+        self.upstream_duration = Histogram(
+            "spacerep_upstream_request_duration_seconds", "Supabase call latency.", LATENCY_BUCKETS)
+        self.upstream_requests = Counter(
+            "spacerep_upstream_requests_total", "Supabase calls by status code.")
+        self.upstream_bytes = Histogram(
+            "spacerep_upstream_response_bytes", "Supabase response body size.", SIZE_BUCKETS)
+        self.upstream_calls_per_request = Histogram(
+            "spacerep_upstream_calls_per_request", "Supabase round trips per API request.", COUNT_BUCKETS)
+        self.rate_limited = Counter(
+            "spacerep_rate_limited_total", "Requests rejected by rate limits and concurrency gates.")
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def register_gauge(self, name: str, help_text: str, fn: Callable[[], float]) -> None:
+        """Register a gauge sampled at scrape time."""
+        self._gauges.append((name, help_text, fn))
+
+    def record_request(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration: float,
+        response_bytes: Optional[int],
+        upstream_calls: int
+    ) -> None:
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self.request_duration.observe(labels, duration)
+            self.requests.inc(labels + (("status", str(status_code)),))
+            if response_bytes is not None:
+                self.response_bytes.observe(labels, response_bytes)
+            if status_code >= 500:
+                self.request_errors.inc(labels)
+            self.upstream_calls_per_request.observe(labels, upstream_calls)
+
+    def record_upstream(
+        self,
+        route: str,
+        upstream: str,
+        status_code: int,
+        duration: float,
+        response_bytes: int
+    ) -> None:
+        labels = (("route", route), ("upstream", upstream))
+        with self._lock:
+            self.upstream_duration.observe(labels, duration)
+            self.upstream_requests.inc(labels + (("status", str(status_code)),))
+            self.upstream_bytes.observe(labels, response_bytes)
+
+    def record_rate_limited(self, limit: str) -> None:
+        with self._lock:
+            self.rate_limited.inc((("limit", limit),))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            for metric in (
+                self.request_duration, self.requests, self.response_bytes, self.request_errors,
+                self.upstream_duration, self.upstream_requests, self.upstream_bytes,
+                self.upstream_calls_per_request, self.rate_limited,
+            ):
+                lines.extend(metric.render())
+
+        lines.extend(_render_cache_stats())
+        for name, help_text, fn in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(fn())}")
+
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestMetrics:
+    """Upstream calls made while serving one API request."""
+
+    scope: dict
+    upstream: List[Tuple[str, float, int]] = field(default_factory=list)
+
+    @property
+    def route(self) -> str:
+        # Set by the router once the request is matched
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    @property
+    def upstream_seconds(self) -> float:
+        return sum(duration for _, duration, _ in self.upstream)
+
+
+metrics = MetricsRegistry()
+
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+_original_send = httpx.Client.send
+
+
+def _instrumented_send(self, request: httpx.Request, *args, **kwargs) -> httpx.Response:
+    started = time.perf_counter()
+    status_code = 0
+    size = 0
+    try:
+        response = _original_send(self, request, *args, **kwargs)
+        status_code = response.status_code
+        if not kwargs.get("stream"):
+            size = len(response.content)
+        return response
+    finally:
+        duration = time.perf_counter() - started
+        upstream = _upstream_name(request.url.raw_path.decode())
+        current = _current_request.get()
+        route = current.route if current else "background"
+        if current:
+            current.upstream.append((upstream, duration, size))
+        metrics.record_upstream(route, upstream, status_code, duration, size)
+
+
+def instrument_upstream() -> None:
+    """Wrap httpx so every Supabase call is measured. Idempotent."""
+    httpx.Client.send = _instrumented_send
+
+
+async def metrics_middleware(request: Request, call_next) -> Response:
+    """Time the request and attribute upstream calls to its route."""
+    current = RequestMetrics(request.scope)
+    token = _current_request.set(current)
+    started = time.perf_counter()
+    status_code = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - started
+        _current_request.reset(token)
+
+        content_length = response.headers.get("content-length") if response is not None else None
+
+        metrics.record_request(
+            request.method,
+            current.route,
+            status_code,
+            duration,
+            int(content_length) if content_length else None,
+            len(current.upstream),
+        )
+
+        if response is not None and request.headers.get("x-debug-timing"):
+            response.headers["Server-Timing"] = _server_timing(duration, current)
+            response.headers["X-Upstream-Calls"] = str(len(current.upstream))
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    """Metrics for the request being served, if any."""
+    return _current_request.get()
+
+
+def _server_timing(duration: float, current: RequestMetrics) -> str:
+    parts = [
+        f"total;dur={duration * 1000:.1f}",
+        f'upstream;dur={current.upstream_seconds * 1000:.1f};desc="{len(current.upstream)} calls"',
+    ]
+    for index, (upstream, upstream_duration, size) in enumerate(current.upstream):
+        parts.append(f'u{index};dur={upstream_duration * 1000:.1f};desc="{upstream} {size}B"')
+    return ", ".join(parts)
+
+
+def _upstream_name(path: str) -> str:
+    """Collapse a Supabase URL path to a low-cardinality label."""
+    path = urlsplit(path).path
+    if path.startswith("/rest/v1/rpc/"):
+        return "rpc:" + path[len("/rest/v1/rpc/"):]
+    if path.startswith("/rest/v1/"):
+        return "rest:" + path[len("/rest/v1/"):].split("/")[0]
+    if path.startswith("/auth/v1/"):
+        return "auth"
+    return "other"
+
+
+def _render_cache_stats() -> List[str]:
+    lines = []
+    for name, help_text, attr in (
+        ("spacerep_cache_hits_total", "Cache hits.", "hits"),
+        ("spacerep_cache_misses_total", "Cache misses.", "misses"),
+        ("spacerep_cache_entries", "Live cache entries.", None),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {'gauge' if attr is None else 'counter'}")
+        for cache in registered_caches:
+            value = len(cache) if attr is None else getattr(cache, attr)
+            lines.append(f'{name}{{cache="{cache.name}"}} {value}')
+    return lines
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,87 @@
+"""Opt-in per-request profiling.
+
+A request is profiled with cProfile when it carries the admin profiling
+token (``X-Profile`` header or ``__profile`` query parameter), or when it
+falls in the configured 1-in-N random sample. Profiles are written to
+the configured ``profile_dir`` and can be opened with ``snakeviz`` or ``pstats``.
+
+The middleware is only installed when a token or sample rate is
+configured, so it costs nothing otherwise. cProfile sees everything that
+runs on the event loop thread while the request is in flight, so one
+profile at a time is taken and concurrent requests may show up in it.
+"""
+import cProfile
+import hmac
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import Request, Response
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_active = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    settings = get_settings()
+    return bool(settings.profile_token or settings.profile_sample_rate)
+
+
+def _requested(request: Request) -> bool:
+    settings = get_settings()
+    token = request.headers.get("x-profile") or request.query_params.get("__profile")
+    if not token or not settings.profile_token:
+        return False
+    return hmac.compare_digest(token, settings.profile_token)
+
+
+def _sampled() -> bool:
+    rate = get_settings().profile_sample_rate
+    return rate > 0 and random.randrange(rate) == 0
+
+
+async def profiling_middleware(request: Request, call_next) -> Response:
+    """Profile the request if asked to by an admin or picked by sampling."""
+    requested = _requested(request)
+    if not (requested or _sampled()) or not _active.acquire(blocking=False):
+        return await call_next(request)
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        response = await call_next(request)
+    finally:
+        profiler.disable()
+        _active.release()
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    path = _profile_path(request, elapsed_ms)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+    except OSError:
+        logger.exception("Could not write profile %s", path)
+        return response
+
+    if requested:
+        response.headers["X-Profile-File"] = path.name
+    return response
+
+
+def _profile_path(request: Request, elapsed_ms: float) -> Path:
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", request.url.path)
+    user_id = getattr(request.state, "user_id", None) or "anonymous"
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", route_path).strip("-") or "root"
+    name = f"{timestamp}_{request.method}_{slug}_{user_id}_{elapsed_ms:.0f}ms.prof"
+    return Path(get_settings().profile_dir) / name
@@ -0,0 +1,282 @@
+"""Per-user rate limiting and admission control.
+
+Token buckets are kept per caller and route class (reads, writes, imports);
+a caller whose bucket is empty gets 429 with ``Retry-After``. There are two
+layers:
+
+- ``check_user_rate`` runs from ``get_current_user`` once the token is
+  verified and keys on the user id, so one user has one budget however many
+  tokens they hold.
+- ``RateLimitMiddleware`` runs before auth and keys on the client address,
+  with the per-user limits scaled by ``rate_limit_ip_multiplier`` (several
+  users can share an address). It bounds unverified traffic: made-up tokens
+  do not get fresh buckets, and floods are stopped before the auth lookup.
+  Behind a proxy every request comes from the proxy's address, so the
+  middleware is only installed once configured: ``rate_limit_per_address``
+  when clients connect directly, or ``rate_limit_trusted_proxies`` to take
+  the client from ``X-Forwarded-For`` past those hops.
+
+State is in memory, per worker process.
+
+``import_slot`` is a dependency that bounds how many heavy imports run at
+once in this worker; callers over the limit get 503 with ``Retry-After``.
+"""
+import asyncio
+import ipaddress
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import get_settings
+from app.metrics import metrics
+
+MAX_BUCKETS = 100_000
+
+# Never limited: load balancer and scraper endpoints, CORS preflights
+EXEMPT_PATHS = ("/api/health", "/api/metrics")
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The bucket a request draws from, or None if it is not limited."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS or not path.startswith("/api/"):
+        return None
+    if method in WRITE_METHODS:
+        if path.endswith("/import") or path.endswith("/items/bulk") or path.startswith("/api/jobs/"):
+            return "imports"
+        return "writes"
+    return "reads"
+
+
+class TokenBucket:
+    """``burst`` tokens, refilled at ``rate`` per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token. Returns 0 on success, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (caller, route class), LRU-bounded."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self.clock = clock
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, caller: str, route_class: str) -> float:
+        """Take a token for the caller. Returns 0 if allowed, else the retry delay."""
+        rate, burst = self.limits[route_class]
+        key = (caller, route_class)
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst, now)
+                # Evicted buckets were idle longest; they come back full
+                while len(self._buckets) > MAX_BUCKETS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+def limits_from_settings(multiplier: float = 1.0) -> Dict[str, Tuple[float, int]]:
+    settings = get_settings()
+    limits = {
+        "reads": (settings.rate_limit_read_rate, settings.rate_limit_read_burst),
+        "writes": (settings.rate_limit_write_rate, settings.rate_limit_write_burst),
+        "imports": (settings.rate_limit_import_rate, settings.rate_limit_import_burst),
+    }
+    return {name: (rate * multiplier, max(1, int(burst * multiplier))) for name, (rate, burst) in limits.items()}
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+_user_limiter: Optional[RateLimiter] = None
+
+
+def get_user_limiter() -> RateLimiter:
+    global _user_limiter
+    if _user_limiter is None:
+        _user_limiter = RateLimiter(limits_from_settings())
+    return _user_limiter
+
+
+def user_retry_after(user_id: str, method: str, path: str, limiter: Optional[RateLimiter] = None) -> float:
+    """Take a token from the verified user's bucket; 0 if allowed, else the retry delay."""
+    if limiter is None:
+        if not get_settings().rate_limit_enabled:
+            return 0.0
+        limiter = get_user_limiter()
+    limited_class = route_class(method, path)
+    if limited_class is None:
+        return 0.0
+    retry_after = limiter.check("user:" + user_id, limited_class)
+    if retry_after:
+        metrics.record_rate_limited(limited_class)
+    return retry_after
+
+
+def check_user_rate(request: Request, user_id: str, limiter: Optional[RateLimiter] = None) -> None:
+    """Take a token from the verified user's bucket, or raise 429."""
+    retry_after = user_retry_after(user_id, request.method, request.url.path, limiter)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": retry_after_header(retry_after)},
+        )
+
+
+async def send_too_many_requests(send: Send, retry_after: float) -> None:
+    """A 429 response from ASGI middleware."""
+    body = json.dumps({"detail": "Too many requests"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", retry_after_header(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(text: str) -> List[Network]:
+    """Comma-separated addresses or CIDR ranges."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in text.split(",") if part.strip()]
+
+
+def _is_trusted(address: str, trusted_proxies: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def caller_key(scope: Scope, trusted_proxies: Optional[List[Network]] = None) -> str:
+    """Client address; the token is not verified yet, so it is not trusted.
+
+    Walks ``X-Forwarded-For`` from the right while the hop it came through is
+    a trusted proxy; entries further left were written by the client.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if trusted_proxies:
+        forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        while hops and _is_trusted(address, trusted_proxies):
+            address = hops.pop()
+    return "ip:" + address
+
+
+def per_address_configured() -> bool:
+    settings = get_settings()
+    return settings.rate_limit_per_address or bool(settings.rate_limit_trusted_proxies.strip())
+
+
+class RateLimitMiddleware:
+    """Reject client addresses over their route class budget with 429."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[RateLimiter] = None,
+        trusted_proxies: Optional[List[Network]] = None
+    ):
+        self.app = app
+        settings = get_settings()
+        self.limiter = limiter or RateLimiter(limits_from_settings(settings.rate_limit_ip_multiplier))
+        if trusted_proxies is None:
+            trusted_proxies = parse_networks(settings.rate_limit_trusted_proxies)
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limited_class = route_class(scope["method"], scope["path"])
+        if limited_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = self.limiter.check(caller_key(scope, self.trusted_proxies), limited_class)
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.record_rate_limited(limited_class)
+        await send_too_many_requests(send, retry_after)
+
+
+class ConcurrencyGate:
+    """Bounded number of concurrent holders; others wait briefly, then get 503."""
+
+    def __init__(self, name: str, limit: Optional[int] = None, wait_seconds: float = 2.0):
+        self.name = name
+        # Defaults to the import_max_concurrency setting, read on first use
+        self.limit = limit
+        self.wait_seconds = wait_seconds
+        self.active = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "ConcurrencyGate":
+        if self._semaphore is None:
+            self.limit = self.limit or get_settings().import_max_concurrency
+            self._semaphore = asyncio.Semaphore(self.limit)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.wait_seconds)
+        except asyncio.TimeoutError:
+            metrics.record_rate_limited(self.name)
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy with other imports, try again shortly",
+                headers={"Retry-After": "5"},
+            )
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+import_gate = ConcurrencyGate("import_gate")
+
+
+async def import_slot():
+    """Dependency holding an import slot for the duration of the request."""
+    async with import_gate:
+        yield
@@ -0,0 +1,153 @@
+"""FSRS scheduling engine.
+
+Implements the FSRS-4.5 memory model: each item has a stability ``S`` (days
+until recall probability falls to 90%) and a difficulty ``D`` (1-10). After
+each review both are updated from the rating and the retrievability at the
+time of review, and the next interval is the time until retrievability
+reaches the desired retention.
+
+The 17 model parameters default to the published FSRS-4.5 values; per-user
+parameters fitted from the review log (``app.reviews.fsrs_optimizer``) are
+stored in ``profiles.fsrs_parameters``. Collections opt in with
+``{"scheduler": "fsrs"}`` in their config, optionally with
+``"desired_retention"``.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from app.reviews.scheduler import Rating, ReviewResult, SchedulingState, Status
+
+DEFAULT_PARAMETERS: Tuple[float, ...] = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)
+
+# Parameter ranges, as clamped by the reference optimizer
+PARAMETER_BOUNDS: Tuple[Tuple[float, float], ...] = (
+    (0.1, 100.0), (0.1, 100.0), (0.1, 100.0), (0.1, 100.0),
+    (1.0, 10.0), (0.1, 5.0), (0.1, 5.0), (0.0, 0.5), (0.0, 3.0),
+    (0.1, 0.8), (0.01, 2.5), (0.5, 5.0), (0.01, 0.2), (0.01, 0.9),
+    (0.01, 2.0), (0.0, 1.0), (1.0, 6.0),
+)
+
+DECAY = -0.5
+FACTOR = 19 / 81  # so that R(S, S) = 0.9
+
+MIN_STABILITY = 0.01
+MAX_INTERVAL_DAYS = 36500
+
+
+def validate_parameters(parameters: Optional[Sequence[float]]) -> List[float]:
+    """Parameters clamped to their bounds; defaults if missing or malformed."""
+    if not parameters or len(parameters) != len(DEFAULT_PARAMETERS):
+        return list(DEFAULT_PARAMETERS)
+    return [min(high, max(low, float(w))) for w, (low, high) in zip(parameters, PARAMETER_BOUNDS)]
+
+
+def retrievability(elapsed_days: float, stability: float) -> float:
+    """Probability of recall after ``elapsed_days`` at the given stability."""
+    return (1 + FACTOR * max(0.0, elapsed_days) / stability) ** DECAY
+
+
+class FSRSScheduler:
+    """FSRS-4.5 scheduler with per-user parameters."""
+
+    def __init__(
+        self,
+        parameters: Optional[Sequence[float]] = None,
+        desired_retention: float = 0.9,
+        maximum_interval: int = MAX_INTERVAL_DAYS
+    ):
+        self.w = validate_parameters(parameters)
+        self.desired_retention = min(0.99, max(0.7, float(desired_retention)))
+        self.maximum_interval = maximum_interval
+
+    def process_review(
+        self,
+        current_state: SchedulingState,
+        rating: Rating,
+        now: Optional[datetime] = None
+    ) -> ReviewResult:
+        """Process a review and calculate next scheduling state."""
+        now = now or datetime.now(timezone.utc)
+        w = self.w
+
+        if current_state.last_review_at is None:
+            stability = w[rating - 1]
+            difficulty = self.initial_difficulty(rating)
+        else:
+            stability, difficulty = self._memory_state(current_state)
+            elapsed = (now - current_state.last_review_at).total_seconds() / 86400
+            r = retrievability(elapsed, stability)
+            if rating == 1:
+                stability = min(stability, self.forget_stability(difficulty, stability, r))
+            else:
+                stability = self.recall_stability(difficulty, stability, r, rating)
+            difficulty = self.next_difficulty(difficulty, rating)
+
+        stability = max(MIN_STABILITY, stability)
+        interval_days = self.next_interval(stability)
+        repetitions = 0 if rating == 1 else current_state.repetitions + 1
+
+        next_review_at = now + timedelta(days=interval_days)
+        new_state = SchedulingState(
+            ease_factor=current_state.ease_factor,
+            interval_days=interval_days,
+            repetitions=repetitions,
+            status=self._status(repetitions, interval_days),
+            next_review_at=next_review_at,
+            last_review_at=now,
+            stability=round(stability, 4),
+            difficulty=round(difficulty, 4),
+        )
+        return ReviewResult(new_state=new_state, next_review_at=next_review_at)
+
+    # Model
+
+    def initial_difficulty(self, rating: int) -> float:
+        return _clamp_difficulty(self.w[4] - (rating - 3) * self.w[5])
+
+    def next_difficulty(self, difficulty: float, rating: int) -> float:
+        w = self.w
+        updated = difficulty - w[6] * (rating - 3)
+        # Mean reversion towards the difficulty of a first "Good"
+        return _clamp_difficulty(w[7] * self.initial_difficulty(3) + (1 - w[7]) * updated)
+
+    def recall_stability(self, difficulty: float, stability: float, r: float, rating: int) -> float:
+        w = self.w
+        hard_penalty = w[15] if rating == 2 else 1.0
+        easy_bonus = w[16] if rating == 4 else 1.0
+        return stability * (
+            math.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+            * (math.exp(w[10] * (1 - r)) - 1) * hard_penalty * easy_bonus + 1
+        )
+
+    def forget_stability(self, difficulty: float, stability: float, r: float) -> float:
+        w = self.w
+        return w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * math.exp(w[14] * (1 - r))
+
+    def next_interval(self, stability: float) -> int:
+        interval = stability / FACTOR * (self.desired_retention ** (1 / DECAY) - 1)
+        return int(min(self.maximum_interval, max(1, round(interval))))
+
+    def _memory_state(self, state: SchedulingState) -> Tuple[float, float]:
+        """Stability and difficulty, seeded from SM-2 fields for items new to FSRS."""
+        stability = state.stability
+        difficulty = state.difficulty
+        if stability is None:
+            # The SM-2 interval was chosen for ~90% recall, i.e. about S
+            stability = float(max(state.interval_days, 1))
+        if difficulty is None:
+            difficulty = self.initial_difficulty(3)
+        return stability, difficulty
+
+    @staticmethod
+    def _status(repetitions: int, interval_days: int) -> Status:
+        if repetitions == 0 or interval_days < 7:
+            return "learning"
+        return "review"
+
+
+def _clamp_difficulty(difficulty: float) -> float:
+    return min(10.0, max(1.0, difficulty))
@@ -0,0 +1,216 @@
+"""Fit per-user FSRS parameters from the review log.
+
+The model is trained to predict recall (any rating above "Again") at each
+review from the memory state built up by the item's earlier reviews and
+the time elapsed since the last one, minimizing binary cross-entropy.
+
+The whole log is simulated at once with numpy: items are sorted by number
+of reviews (longest first) so step ``k`` of the simulation is a prefix
+slice of every array, and each mini-batch evaluates the base parameters
+and the central-difference perturbations of all 17 of them in one pass,
+along a leading parameter axis. Adam then takes a step and the result is
+clamped to ``PARAMETER_BOUNDS``.
+
+numpy is imported by ``fit_parameters`` (run in a worker process by the
+fitting job), never at app import time.
+"""
+import math
+import random
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.reviews.fsrs import DECAY, DEFAULT_PARAMETERS, FACTOR, MIN_STABILITY, PARAMETER_BOUNDS
+
+# Reviews of one item: (days since the previous review, rating)
+ReviewSequence = List[Tuple[float, int]]
+
+# Fewer predictions than this and the defaults are kept
+MIN_REVIEWS = 100
+MAX_SEQUENCE_LENGTH = 64
+REVIEW_PAGE_SIZE = 1000
+
+STEP = 1e-3  # central-difference step
+EPSILON = 1e-6
+
+
+def fetch_reviews(supabase, user_id: str) -> List[Dict[str, Any]]:
+    """A user's full review log, ordered by item then time, paged.
+
+    Each page starts after the last row of the previous one by
+    (item_id, reviewed_at, id), so it costs the same however deep into the
+    log it is, and reviews sharing a timestamp are neither skipped nor
+    repeated at a page boundary.
+    """
+    reviews: List[Dict[str, Any]] = []
+    while True:
+        query = supabase.table("reviews") \
+            .select("id, item_id, rating, reviewed_at") \
+            .eq("user_id", user_id) \
+            .order("item_id") \
+            .order("reviewed_at") \
+            .order("id") \
+            .limit(REVIEW_PAGE_SIZE)
+
+        if reviews:
+            last = reviews[-1]
+            item_id, reviewed_at = last["item_id"], last["reviewed_at"]
+            query = query.or_(
+                f"item_id.gt.{item_id},"
+                f'and(item_id.eq.{item_id},reviewed_at.gt."{reviewed_at}"),'
+                f'and(item_id.eq.{item_id},reviewed_at.eq."{reviewed_at}",id.gt.{last["id"]})'
+            )
+
+        page = query.execute().data or []
+        reviews.extend(page)
+        if len(page) < REVIEW_PAGE_SIZE:
+            return reviews
+
+
+def build_sequences(reviews: Iterable[Dict[str, Any]]) -> List[ReviewSequence]:
+    """Group review rows (item_id, rating, reviewed_at) into per-item sequences.
+
+    Rows must be ordered by item, then review time. Items reviewed only once
+    have nothing to predict and are dropped.
+    """
+    sequences: List[ReviewSequence] = []
+    current: ReviewSequence = []
+    last_item = None
+    last_at: Optional[datetime] = None
+
+    for review in reviews:
+        reviewed_at = _parse_timestamp(review["reviewed_at"])
+        if review["item_id"] != last_item:
+            if len(current) > 1:
+                sequences.append(current[:MAX_SEQUENCE_LENGTH])
+            current, last_item = [], review["item_id"]
+            elapsed = 0.0
+        else:
+            elapsed = max(0.0, (reviewed_at - last_at).total_seconds() / 86400)
+        current.append((elapsed, int(review["rating"])))
+        last_at = reviewed_at
+
+    if len(current) > 1:
+        sequences.append(current[:MAX_SEQUENCE_LENGTH])
+    return sequences
+
+
+def fit_parameters(
+    sequences: List[ReviewSequence],
+    initial: Optional[Sequence[float]] = None,
+    epochs: int = 5,
+    batch_size: int = 512,
+    learning_rate: float = 4e-2,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Fit FSRS parameters. Returns the parameters and log loss before and after."""
+    import numpy as np
+
+    predictions = sum(len(sequence) - 1 for sequence in sequences)
+    if predictions < MIN_REVIEWS:
+        return {"parameters": None, "reviews": predictions, "detail": "Not enough reviews to fit"}
+
+    rng = random.Random(seed)
+    low = np.array([bound[0] for bound in PARAMETER_BOUNDS])
+    high = np.array([bound[1] for bound in PARAMETER_BOUNDS])
+    w = np.clip(np.array(initial or DEFAULT_PARAMETERS, dtype=float), low, high)
+
+    # Row 0 is w itself, rows 1..17 add STEP to one parameter, rows 18..34 subtract it
+    size = len(w)
+    offsets = np.vstack([np.zeros(size), np.eye(size) * STEP, -np.eye(size) * STEP])
+
+    full_batch = _pack(np, sequences)
+    loss_before = float(_log_loss(np, w[None, :], *full_batch)[0])
+
+    m = np.zeros(size)
+    v = np.zeros(size)
+    beta1, beta2 = 0.9, 0.999
+    t = 0
+    order = list(range(len(sequences)))
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for start in range(0, len(order), batch_size):
+            batch = _pack(np, [sequences[i] for i in order[start:start + batch_size]])
+            losses = _log_loss(np, w[None, :] + offsets, *batch)
+            gradient = (losses[1:size + 1] - losses[size + 1:]) / (2 * STEP)
+
+            t += 1
+            m = beta1 * m + (1 - beta1) * gradient
+            v = beta2 * v + (1 - beta2) * gradient ** 2
+            m_hat = m / (1 - beta1 ** t)
+            v_hat = v / (1 - beta2 ** t)
+            w = np.clip(w - learning_rate * m_hat / (np.sqrt(v_hat) + 1e-8), low, high)
+
+    loss_after = float(_log_loss(np, w[None, :], *full_batch)[0])
+    if not math.isfinite(loss_after) or loss_after > loss_before:
+        # No improvement on this log; keep what we started from
+        w, loss_after = np.clip(np.array(initial or DEFAULT_PARAMETERS, dtype=float), low, high), loss_before
+
+    return {
+        "parameters": [round(float(x), 4) for x in w],
+        "reviews": predictions,
+        "items": len(sequences),
+        "loss_before": round(loss_before, 5),
+        "loss_after": round(loss_after, 5),
+    }
+
+
+def _pack(np, sequences: List[ReviewSequence]):
+    """Pad sequences into (items, steps) arrays, longest first, plus active counts per step."""
+    sequences = sorted(sequences, key=len, reverse=True)
+    steps = len(sequences[0])
+    elapsed = np.zeros((len(sequences), steps))
+    ratings = np.ones((len(sequences), steps), dtype=np.int64)
+    for row, sequence in enumerate(sequences):
+        elapsed[row, :len(sequence)] = [review[0] for review in sequence]
+        ratings[row, :len(sequence)] = [review[1] for review in sequence]
+    lengths = np.array([len(sequence) for sequence in sequences])
+    # Items still active at step k: a prefix, since lengths are descending
+    active = [int((lengths > k).sum()) for k in range(steps)]
+    return elapsed, ratings, active
+
+
+def _log_loss(np, w, elapsed, ratings, active):
+    """Mean cross-entropy of recall predictions, for each row of ``w`` (P, 17)."""
+    col = [w[:, i:i + 1] for i in range(w.shape[1])]
+
+    def init_d(rating):
+        return np.clip(col[4] - (rating - 3) * col[5], 1.0, 10.0)
+
+    first = ratings[:, 0]
+    stability = np.maximum(MIN_STABILITY, w[:, first - 1])
+    difficulty = init_d(first[None, :])
+    mean_d = init_d(3)
+
+    total = np.zeros(w.shape[0])
+    count = 0
+    for k in range(1, len(active)):
+        n = active[k]
+        stability, difficulty = stability[:, :n], difficulty[:, :n]
+        rating = ratings[:n, k][None, :]
+
+        r = (1 + FACTOR * elapsed[:n, k][None, :] / stability) ** DECAY
+        r = np.clip(r, EPSILON, 1 - EPSILON)
+        recalled = rating > 1
+        total -= np.where(recalled, np.log(r), np.log(1 - r)).sum(axis=1)
+        count += n
+
+        hard_penalty = np.where(rating == 2, col[15], 1.0)
+        easy_bonus = np.where(rating == 4, col[16], 1.0)
+        recall = stability * (
+            np.exp(col[8]) * (11 - difficulty) * stability ** -col[9]
+            * (np.exp(col[10] * (1 - r)) - 1) * hard_penalty * easy_bonus + 1
+        )
+        forget = np.minimum(
+            stability,
+            col[11] * difficulty ** -col[12] * ((stability + 1) ** col[13] - 1) * np.exp(col[14] * (1 - r)),
+        )
+        stability = np.maximum(MIN_STABILITY, np.where(recalled, recall, forget))
+        difficulty = np.clip(col[7] * mean_d + (1 - col[7]) * (difficulty - col[6] * (rating - 3)), 1.0, 10.0)
+
+    return total / max(count, 1)
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
@@ -0,0 +1,599 @@
+"""Write-behind review ingestion.
+
+With ``REVIEW_INGEST_MODE=log`` a review is scheduled from the item's cached
+state, appended to a local fsync'd log and acknowledged. A background
+flusher then writes reviews and scheduling states to the database in
+batches: one upsert for the reviews (keyed on the review ID assigned at
+ingest, so replays are idempotent) and one for the latest state per item.
+
+Durability: an acknowledged review is on local disk. Concurrent appends
+share one fsync (group commit). The log's checkpoint records how far it
+has been flushed, and on startup everything after the checkpoint is
+replayed. Each worker process claims its own log slot with an exclusive
+lock, so a restarted worker picks up a crashed one's log.
+
+A review the database rejects outright (e.g. its item was hard-deleted
+after the review was acknowledged) is written to the slot's ``.dead``
+file and skipped, so one bad record never holds up the rest.
+
+Caveats of this mode: scheduling states are cached per worker, so a user
+reviewing the same item on two workers within the cache TTL may be
+scheduled from a stale state; dashboards and forecasts lag the log by up
+to one flush interval. The due queue hides items with unflushed reviews.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.dependencies import get_supabase_admin
+from app.metrics import metrics
+from app.reviews.scheduler import Rating, scheduler_for, state_from_row, state_update
+
+logger = logging.getLogger(__name__)
+
+MAX_LOG_SLOTS = 64
+
+StateKey = Tuple[str, str]  # (user_id, item_id)
+
+STATE_COLUMNS = (
+    "ease_factor", "interval_days", "repetitions", "status",
+    "next_review_at", "last_review_at", "last_rating", "stability", "difficulty",
+)
+
+# Enough to schedule an item (stability and difficulty start out unset)
+REQUIRED_STATE_COLUMNS = STATE_COLUMNS[:6]
+
+# SQLSTATE classes a retry cannot fix: data exceptions and integrity
+# constraint violations (a foreign key to a deleted item, say)
+POISON_SQLSTATE_CLASSES = ("22", "23")
+
+
+def is_poison(error: Exception) -> bool:
+    """Whether the database rejected the record itself, not the request."""
+    return isinstance(error, APIError) and str(error.code or "")[:2] in POISON_SQLSTATE_CLASSES
+
+
+@dataclass
+class LogEntry:
+    """A logged review and the byte offset just past it in the log."""
+
+    record: Dict[str, Any]
+    offset: int
+    # Written to the database (or dead-lettered) ahead of the checkpoint
+    done: bool = False
+
+
+class ReviewLog:
+    """Append-only JSONL log with a flushed-up-to checkpoint."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path: Optional[Path] = None
+        self._file = None
+        self._offset = 0
+
+    def open(self) -> List[LogEntry]:
+        """Claim a free log slot and return its unflushed entries."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for slot in range(MAX_LOG_SLOTS):
+            path = self.directory / f"reviews-{slot}.log"
+            handle = open(path, "a+b")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                continue
+
+            self.path = path
+            self._file = handle
+            return self._recover()
+
+        raise RuntimeError(f"No free review log slot in {self.directory}")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()  # releases the slot lock
+            self._file = None
+
+    @property
+    def offset(self) -> int:
+        """Bytes written so far."""
+        return self._offset
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Append a record (durable once ``sync`` returns). Returns the offset past it."""
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        self._file.write(line)
+        self._file.flush()
+        self._offset += len(line)
+        return self._offset
+
+    def sync(self) -> None:
+        """fsync everything appended so far."""
+        os.fsync(self._file.fileno())
+
+    def dead_letter(self, record: Dict[str, Any], error: str) -> None:
+        """Keep a record the database will never accept, for inspection."""
+        line = json.dumps({"record": record, "error": error}, separators=(",", ":")).encode() + b"\n"
+        with open(self.path.with_suffix(".dead"), "ab") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def checkpoint(self, offset: int) -> None:
+        """Record that everything before ``offset`` is in the database.
+
+        Once the whole log is flushed it is truncated, so it only ever
+        holds the reviews of the last few flush intervals.
+        """
+        if offset >= self._offset:
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._offset = offset = 0
+        self._write_checkpoint(offset)
+
+    def _checkpoint_path(self) -> Path:
+        return self.path.with_suffix(".checkpoint")
+
+    def _write_checkpoint(self, offset: int) -> None:
+        tmp = self._checkpoint_path().with_suffix(".tmp")
+        with open(tmp, "w") as handle:
+            handle.write(str(offset))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, self._checkpoint_path())
+
+    def _recover(self) -> List[LogEntry]:
+        try:
+            start = int(self._checkpoint_path().read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            start = 0
+
+        self._file.seek(0)
+        data = self._file.read()
+        if start > len(data):
+            # Crashed between truncating the log and resetting the checkpoint
+            start = len(data)
+            self._write_checkpoint(start)
+        entries = []
+        offset = start
+        for line in data[start:].splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # torn write from a crash mid-append; never acknowledged
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            offset += len(line)
+            entries.append(LogEntry(record, offset))
+
+        # Drop any torn tail so new appends start on a clean line
+        self._file.truncate(offset)
+        self._offset = offset
+        return entries
+
+
+class ReviewIngestor:
+    """Acknowledges reviews from the log and flushes them in batches."""
+
+    def __init__(
+        self,
+        log_dir: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None
+    ):
+        # Unset options are read from settings at start()
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # Clean scheduling states (plus collection_id) by (user_id, item_id)
+        self.states = TTLCache(ttl_seconds=600, max_entries=50_000, name="review_states")
+        # Per user: FSRS parameters and each collection's config
+        self.engines = TTLCache(ttl_seconds=300, name="review_engines")
+
+        self._log: Optional[ReviewLog] = None
+        # Logged entries in log order; done ones leave from the front
+        self._queue: List[LogEntry] = []
+        # Latest unflushed record per (user_id, item_id)
+        self._pending: Dict[StateKey, Dict[str, Any]] = {}
+        # Entries in the queue not yet done, kept by _enqueue and _checkpoint
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        # Serializes reviews of the same item; gone once nobody holds it
+        self._item_locks: "weakref.WeakValueDictionary[StateKey, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # Group commit: appends written, appends fsync'd, the fsync under way
+        self._appended = 0
+        self._synced = 0
+        self._syncing: Optional[asyncio.Future] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._log is not None
+
+    async def start(self, run_flusher: bool = True) -> None:
+        """Claim a log, replay what it holds and start the flusher."""
+        if self.enabled:
+            return
+
+        settings = get_settings()
+        self.log_dir = self.log_dir or settings.review_log_dir
+        self.flush_interval = self.flush_interval or settings.review_flush_interval_seconds
+        self.batch_size = self.batch_size or settings.review_flush_batch_size
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+        log = ReviewLog(Path(self.log_dir))
+        entries = await asyncio.to_thread(log.open)
+        self._log = log
+        # Reviews flushed ahead of the checkpoint (see _checkpoint) are not replayed
+        flushed = {review_id for entry in entries for review_id in entry.record.get("flushed", ())}
+        replayed = [
+            entry for entry in entries
+            if "review" in entry.record and entry.record["review"]["id"] not in flushed
+        ]
+        for entry in replayed:
+            self._enqueue(entry)
+        if replayed:
+            logger.info("Replaying %d unflushed reviews from %s", len(replayed), log.path)
+
+        if run_flusher:
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def stop(self) -> None:
+        """Flush what is queued (best effort) and release the log."""
+        if not self.enabled:
+            return
+
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        try:
+            while await self.flush():
+                pass
+        except Exception:
+            logger.exception("Final review flush failed; the log is replayed on next start")
+
+        self._log.close()
+        self._log = None
+        self._queue = []
+        self._pending = {}
+        self._unflushed = 0
+        self._appended = self._synced = 0
+        self.states.clear()
+        self.engines.clear()
+
+    async def submit(self, supabase, user_id: str, item_id: str, rating: Rating) -> Dict[str, Any]:
+        """Schedule and durably log a review.
+
+        Only reviews of the same item wait for each other; database reads
+        happen outside any lock and concurrent appends share an fsync.
+
+        Returns the logged record: ``{"review": {...}, "state": {...}}``.
+        """
+        key = (user_id, item_id)
+        engine_info = await self._engine_info(supabase, user_id)
+        current = None
+        if key not in self._pending:
+            current = self.states.get(key)
+            if current is None:
+                current = await asyncio.to_thread(self._read_state, supabase, user_id, item_id)
+
+        async with self._item_lock(key):
+            # A review of the item logged (or flushed) meanwhile is newer
+            pending = self._pending.get(key)
+            if pending is not None:
+                current = {**pending["state"], "collection_id": pending["collection_id"]}
+            else:
+                current = self.states.get(key) or current
+                if current is None:
+                    current = await asyncio.to_thread(self._read_state, supabase, user_id, item_id)
+
+            engine = scheduler_for(engine_info["configs"].get(current["collection_id"]), engine_info["parameters"])
+            result = engine.process_review(state_from_row(current), rating)
+            new_state = result.new_state
+
+            state = state_update(new_state, rating)
+            record = {
+                "review": {
+                    "id": str(uuid.uuid4()),
+                    "item_id": item_id,
+                    "user_id": user_id,
+                    "rating": rating,
+                    "ease_factor_before": float(current["ease_factor"]),
+                    "interval_before": current["interval_days"],
+                    "ease_factor_after": state["ease_factor"],
+                    "interval_after": state["interval_days"],
+                    "reviewed_at": new_state.last_review_at.isoformat(),
+                },
+                "state": state,
+                "collection_id": current["collection_id"],
+            }
+
+            sequence = await asyncio.to_thread(self._append, record)
+
+        await self._durable(sequence)
+
+        if self.pending_count() >= self.batch_size:
+            self._wakeup.set()
+        return record
+
+    def cache_state(self, user_id: str, state: Dict[str, Any]) -> None:
+        """Prime the state cache with a row read elsewhere (e.g. the due queue).
+
+        The row needs the scheduling columns and its item's collection_id.
+        """
+        key = (user_id, str(state["item_id"]))
+        collection_id = state.get("collection_id") or (state.get("items") or {}).get("collection_id")
+        if key in self._pending or not collection_id:
+            return
+        if all(column in state for column in REQUIRED_STATE_COLUMNS):
+            cached = {column: state.get(column) for column in STATE_COLUMNS}
+            self.states.set(key, {**cached, "collection_id": collection_id})
+
+    async def settle(self, user_id: str, supabase=None) -> None:
+        """Flush a user's pending reviews and forget their cached states.
+
+        Only this user's reviews are written; other users' stay queued.
+
+        For writes that change scheduling states outside ``submit`` (bulk
+        reschedules), which pending or cached states would otherwise undo.
+        """
+        while self.pending_items(user_id):
+            await self.flush(supabase, user_id=user_id)
+        self.states.invalidate_where(lambda key: key[0] == user_id)
+
+    def invalidate_engine(self, user_id: str) -> None:
+        """Forget a user's scheduler settings after a config or parameter change."""
+        self.engines.invalidate(user_id)
+
+    def pending_items(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """Unflushed scheduling states of a user, by item ID."""
+        with self._lock:
+            return {
+                item_id: record["state"]
+                for (uid, item_id), record in self._pending.items() if uid == user_id
+            }
+
+    def pending_count(self) -> int:
+        """Reviews logged but not yet flushed, without scanning the queue."""
+        return self._unflushed
+
+    async def flush(self, supabase=None, user_id: Optional[str] = None) -> int:
+        """Write one batch to the database. Returns the number of reviews taken.
+
+        With ``user_id`` only that user's reviews are taken, wherever they
+        are in the log. Reviews the database rejects are dead-lettered.
+        """
+        async with self._flush_lock:
+            with self._lock:
+                batch = [
+                    entry for entry in self._queue
+                    if not entry.done and (user_id is None or entry.record["review"]["user_id"] == user_id)
+                ][:self.batch_size]
+            if not batch:
+                return 0
+
+            dead = await asyncio.to_thread(self._write_batch, supabase or get_supabase_admin(), batch)
+            await asyncio.to_thread(self._checkpoint, batch)
+
+            with self._lock:
+                for entry in batch:
+                    review = entry.record["review"]
+                    key = (review["user_id"], review["item_id"])
+                    # Later reviews of the item stay pending until their own flush
+                    if self._pending.get(key) is not entry.record:
+                        continue
+                    del self._pending[key]
+                    if id(entry) in dead:
+                        self.states.invalidate(key)
+                    else:
+                        self.states.set(key, {**entry.record["state"], "collection_id": entry.record["collection_id"]})
+
+            return len(batch)
+
+    # Internals
+
+    @staticmethod
+    def _read_state(supabase, user_id: str, item_id: str) -> Dict[str, Any]:
+        response = supabase.table("scheduling_states") \
+            .select(", ".join(STATE_COLUMNS) + ", items(collection_id)") \
+            .eq("item_id", item_id) \
+            .eq("user_id", user_id) \
+            .maybe_single() \
+            .execute()
+
+        if not response or not response.data:
+            raise HTTPException(status_code=404, detail="Item not found")
+        state = response.data
+        state["collection_id"] = (state.pop("items", None) or {}).get("collection_id")
+        return state
+
+    async def _engine_info(self, supabase, user_id: str) -> Dict[str, Any]:
+        info = self.engines.get(user_id)
+        if info is None:
+            info = await asyncio.to_thread(self._read_engine_info, supabase, user_id)
+            self.engines.set(user_id, info)
+        return info
+
+    @staticmethod
+    def _read_engine_info(supabase, user_id: str) -> Dict[str, Any]:
+        response = supabase.table("profiles") \
+            .select("fsrs_parameters, collections(id, config)") \
+            .eq("id", user_id) \
+            .maybe_single() \
+            .execute()
+
+        profile = (response.data if response else None) or {}
+        return {
+            "parameters": profile.get("fsrs_parameters"),
+            "configs": {c["id"]: c.get("config") for c in profile.get("collections") or []},
+        }
+
+    def _item_lock(self, key: StateKey) -> asyncio.Lock:
+        lock = self._item_locks.get(key)
+        if lock is None:
+            lock = self._item_locks[key] = asyncio.Lock()
+        return lock
+
+    def _append(self, record: Dict[str, Any]) -> int:
+        """Write a record to the log (not yet fsync'd). Returns its sequence number."""
+        with self._lock:
+            offset = self._log.append(record)
+            self._enqueue(LogEntry(record, offset))
+            self._appended += 1
+            return self._appended
+
+    async def _durable(self, sequence: int) -> None:
+        """Wait until append ``sequence`` is fsync'd.
+
+        One fsync covers every append written before it starts; appends
+        arriving meanwhile wait for the next one, together.
+        """
+        while self._synced < sequence:
+            if self._syncing is None:
+                self._syncing = asyncio.ensure_future(self._sync())
+            await asyncio.shield(self._syncing)
+
+    async def _sync(self) -> None:
+        try:
+            self._synced = max(self._synced, await asyncio.to_thread(self._sync_log))
+        finally:
+            self._syncing = None
+
+    def _sync_log(self) -> int:
+        with self._lock:
+            appended = self._appended
+        self._log.sync()
+        return appended
+
+    def _checkpoint(self, entries: List[LogEntry]) -> None:
+        """Mark entries done and advance the checkpoint past the done prefix.
+
+        Done entries behind an unflushed one (a single user's flush) are
+        recorded in the log, so a replay does not write them again over
+        newer changes.
+        """
+        with self._lock:
+            for entry in entries:
+                if not entry.done:
+                    entry.done = True
+                    self._unflushed -= 1
+
+            done = 0
+            while done < len(self._queue) and self._queue[done].done:
+                done += 1
+            offset = self._queue[done - 1].offset if done else None
+            del self._queue[:done]
+
+            taken = {id(entry) for entry in entries}
+            ahead = [entry.record["review"]["id"] for entry in self._queue if id(entry) in taken]
+            if ahead:
+                self._log.append({"flushed": ahead})
+                self._log.sync()
+
+            if not self._queue:
+                self._log.checkpoint(self._log.offset)
+            elif offset is not None:
+                self._log.checkpoint(offset)
+
+    def _enqueue(self, entry: LogEntry) -> None:
+        review = entry.record["review"]
+        self._queue.append(entry)
+        self._unflushed += 1
+        self._pending[(review["user_id"], review["item_id"])] = entry.record
+
+    def _write_batch(self, supabase, batch: List[LogEntry]) -> Set[int]:
+        """Write a batch, or record by record if the database rejects it.
+
+        Returns the ``id()`` of each entry that had to be dead-lettered.
+        Errors that are not the records' fault (network, timeouts) raise,
+        so the batch is retried as a whole.
+        """
+        latest: Dict[StateKey, Dict[str, Any]] = {}
+        for entry in batch:
+            review = entry.record["review"]
+            latest[(review["user_id"], review["item_id"])] = entry.record
+        try:
+            self._write(supabase, [entry.record["review"] for entry in batch], latest)
+            return set()
+        except Exception as error:
+            if not is_poison(error):
+                raise
+            logger.warning("Review batch rejected (%s); writing record by record", error)
+
+        dead = set()
+        for entry in batch:
+            review = entry.record["review"]
+            try:
+                self._write(supabase, [review], {(review["user_id"], review["item_id"]): entry.record})
+            except Exception as error:
+                if not is_poison(error):
+                    raise
+                logger.error("Dead-lettering review %s of item %s: %s", review["id"], review["item_id"], error)
+                self._log.dead_letter(entry.record, str(error))
+                dead.add(id(entry))
+        return dead
+
+    @staticmethod
+    def _write(supabase, reviews: List[Dict[str, Any]], records: Dict[StateKey, Dict[str, Any]]) -> None:
+        # Replayed reviews already written before a crash are skipped by
+        # primary key (reviews is partitioned, so it includes reviewed_at)
+        supabase.table("reviews") \
+            .upsert(reviews, on_conflict="id,reviewed_at", ignore_duplicates=True) \
+            .execute()
+
+        now = datetime.now(timezone.utc).isoformat()
+        supabase.table("scheduling_states") \
+            .upsert([
+                {"user_id": user_id, "item_id": item_id, **record["state"], "updated_at": now}
+                for (user_id, item_id), record in records.items()
+            ], on_conflict="item_id,user_id") \
+            .execute()
+
+    async def _run_flusher(self) -> None:
+        failures = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                while await self.flush() == self.batch_size:
+                    pass
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                failures += 1
+                logger.exception("Review flush failed (%d in a row); retrying", failures)
+                await asyncio.sleep(min(30, self.flush_interval * 2 ** failures))
+
+
+review_ingestor = ReviewIngestor()
+metrics.register_gauge(
+    "spacerep_review_ingest_pending", "Logged reviews not yet written to the database.",
+    review_ingestor.pending_count,
+)
@@ -1,13 +1,19 @@
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Literal, Optional, List
 from uuid import UUID
 from collections import defaultdict
 
 from fastapi import APIRouter, Depends, Query
 
 from app.dependencies import get_current_user, get_authenticated_supabase, ensure_profile_exists
-from app.reviews.scheduler import scheduler, SchedulingState
-from app.reviews.schemas import ReviewCreate, ReviewResponse
+from app.encoding import NegotiatedResponse
+from app.fields import DUE_FIELDS
+from app.reviews.ingest import review_ingestor, STATE_COLUMNS
+from app.reviews.scheduler import scheduler_for, state_update, state_from_row, preview_ratings, SchedulingState
+from app.reviews.schemas import (
+    ReviewCreate, ReviewResponse, ShiftDueDates, ShiftResult, SpreadBacklog, SpreadResult,
+)
+from app.services.items import ItemsService, apply_metadata_filter, build_metadata_filter
 
 router = APIRouter()
 
@@ -16,22 +22,157 @@ router = APIRouter()
 async def get_due_items(
     limit: int = Query(default=50, le=100),
     collection_id: Optional[UUID] = None,
+    difficulty: Optional[str] = None,
+    topic: Optional[List[str]] = Query(default=None),
+    pattern: Optional[str] = None,
+    tag: Optional[UUID] = None,
+    facets: bool = False,
+    fields: Optional[str] = Query(default=None, max_length=500),
+    order: Literal["due", "urgency"] = "due",
     user: dict = Depends(get_current_user),
     supabase=Depends(get_authenticated_supabase)
 ):
-    """Get items due for review."""
+    """Get items due for review.
+
+    ``fields`` selects a preset (``card``, ``list``, ``full``) or a column
+    list such as ``item_id,next_review_at,items.title``.
+
+    ``order=urgency`` puts the items most overdue relative to their
+    interval first (2 days late on a 3-day interval before 5 days late on
+    200), instead of the earliest due date.
+
+    With ``facets=true`` the response is ``{"items": [...], "facets": {...}}``
+    with per-difficulty, topic and pattern counts over all due items.
+    """
+    metadata_filter = build_metadata_filter(difficulty, topic, pattern)
+    columns, item_columns = DUE_FIELDS.resolve(fields)
+
+    # Filtering on the embedded item requires an inner join, otherwise
+    # PostgREST only nulls out the embed and still returns the state.
+    # Archived items are never due (like item_facets and collection_stats).
+    if tag:
+        items_embed = f"items!inner({item_columns}, item_tags!inner(tag_id))"
+    else:
+        items_embed = f"items!inner({item_columns})"
+
+    # Items reviewed since the last write-behind flush are still due in the
+    # database; fetch enough extra rows to drop them
+    pending = review_ingestor.pending_items(user["id"]) if review_ingestor.enabled else {}
+
+    if order == "urgency":
+        # Ranked (and filtered) in the database, then read like the due order
+        ranked = supabase.rpc("urgent_due_items", {
+            "p_limit": limit + len(pending),
+            "p_collection_id": str(collection_id) if collection_id else None,
+            "p_metadata": metadata_filter,
+            "p_tag_id": str(tag) if tag else None,
+        }).execute().data or []
+        item_ids = [row["item_id"] for row in ranked]
+
+        due = []
+        if item_ids:
+            rows = supabase.table("scheduling_states") \
+                .select(f"{columns}, items({item_columns})") \
+                .eq("user_id", user["id"]) \
+                .in_("item_id", item_ids) \
+                .execute().data
+            by_item = {row["item_id"]: row for row in rows}
+            due = [by_item[item_id] for item_id in item_ids if item_id in by_item]
+    else:
+        query = supabase.table("scheduling_states") \
+            .select(f"{columns}, {items_embed}") \
+            .eq("user_id", user["id"]) \
+            .lte("next_review_at", datetime.now(timezone.utc).isoformat()) \
+            .is_("items.archived_at", "null") \
+            .order("next_review_at") \
+            .limit(limit + len(pending))
+
+        if collection_id:
+            query = query.eq("items.collection_id", str(collection_id))
+
+        if metadata_filter:
+            query = apply_metadata_filter(query, metadata_filter, reference_table="items")
+
+        if tag:
+            query = query.eq("items.item_tags.tag_id", str(tag))
+
+        due = query.execute().data
+
+    if review_ingestor.enabled:
+        due = [state for state in due if state["item_id"] not in pending][:limit]
+        # Reviews submitted from this queue are scheduled without a state read
+        for state in due:
+            review_ingestor.cache_state(user["id"], state)
+
+    if not facets:
+        return NegotiatedResponse(due)
+
+    service = ItemsService(supabase, user["id"])
+    return NegotiatedResponse({
+        "items": due,
+        "facets": await service.facets(
+            collection_id=collection_id,
+            metadata_filter=metadata_filter,
+            tag_id=tag,
+            due_only=True
+        ),
+    })
+
+
+@router.get("/session/next")
+async def next_session_cards(
+    n: int = Query(default=20, ge=1, le=50),
+    collection_id: Optional[UUID] = None,
+    exclude: Optional[List[UUID]] = Query(default=None, max_length=100),
+    user: dict = Depends(get_current_user),
+    supabase=Depends(get_authenticated_supabase)
+):
+    """The next ``n`` due cards, each with what every rating would schedule.
+
+    ``previews`` holds the ``interval_days`` and ``next_review_at`` that
+    ratings 1-4 would give, so the client can label the rating buttons,
+    move on at once and submit in the background. Pass the item IDs the
+    client already holds as ``exclude`` to prefetch the cards after them.
+    """
+    skip = {str(item_id) for item_id in exclude or []}
+    if review_ingestor.enabled:
+        skip.update(review_ingestor.pending_items(user["id"]))
+
+    # The collection config and FSRS parameters come along, so previews
+    # need no further reads
     query = supabase.table("scheduling_states") \
-        .select("*, items(*)") \
+        .select(
+            f"item_id, {', '.join(STATE_COLUMNS)}, "
+            "items!inner(id, collection_id, title, external_id, external_url, metadata, notes, collections(config)), "
+            "profiles(fsrs_parameters)"
+        ) \
         .eq("user_id", user["id"]) \
         .lte("next_review_at", datetime.now(timezone.utc).isoformat()) \
+        .is_("items.archived_at", "null") \
         .order("next_review_at") \
-        .limit(limit)
+        .limit(n + len(skip))
 
     if collection_id:
         query = query.eq("items.collection_id", str(collection_id))
 
-    response = query.execute()
-    return response.data
+    rows = [row for row in query.execute().data or [] if row["item_id"] not in skip][:n]
+
+    engines = {}
+    cards = []
+    for row in rows:
+        item = row["items"]
+        collection = item.pop("collections", None) or {}
+        parameters = (row.pop("profiles", None) or {}).get("fsrs_parameters")
+        engine = engines.get(item["collection_id"])
+        if engine is None:
+            engine = engines[item["collection_id"]] = scheduler_for(collection.get("config"), parameters)
+
+        cards.append({**row, "previews": preview_ratings(engine, state_from_row(row))})
+        if review_ingestor.enabled:
+            # Ratings submitted from this session are scheduled without a state read
+            review_ingestor.cache_state(user["id"], row)
+
+    return NegotiatedResponse(cards)
 
 
 @router.post("/", response_model=ReviewResponse)
@@ -42,10 +183,20 @@ async def submit_review(
     _: None = Depends(ensure_profile_exists)
 ):
     """Submit a review rating and update scheduling."""
+    if review_ingestor.enabled:
+        record = await review_ingestor.submit(supabase, user["id"], str(review.item_id), review.rating)
+        return ReviewResponse(
+            id=record["review"]["id"],
+            item_id=review.item_id,
+            rating=review.rating,
+            next_review_at=record["state"]["next_review_at"],
+            interval_days=record["state"]["interval_days"]
+        )
 
-    # Get current scheduling state
+    # Get current scheduling state, with the collection's scheduler choice
+    # and the user's fitted FSRS parameters
     state_response = supabase.table("scheduling_states") \
-        .select("*") \
+        .select("*, items(collections(config)), profiles(fsrs_parameters)") \
         .eq("item_id", str(review.item_id)) \
         .eq("user_id", user["id"]) \
         .single() \
@@ -60,10 +211,15 @@ async def submit_review(
         repetitions=current_state["repetitions"],
         status=current_state["status"],
         next_review_at=current_state["next_review_at"],
-        last_review_at=current_state["last_review_at"]
+        last_review_at=current_state["last_review_at"],
+        stability=current_state.get("stability"),
+        difficulty=current_state.get("difficulty")
     )
 
-    result = scheduler.process_review(state, review.rating)
+    collection = ((current_state.get("items") or {}).get("collections") or {})
+    profile = current_state.get("profiles") or {}
+    engine = scheduler_for(collection.get("config"), profile.get("fsrs_parameters"))
+    result = engine.process_review(state, review.rating)
 
     # Record review
     review_record = supabase.table("reviews").insert({
@@ -78,12 +234,7 @@ async def submit_review(
 
     # Update scheduling state
     supabase.table("scheduling_states").update({
-        "ease_factor": float(result.new_state.ease_factor),
-        "interval_days": result.new_state.interval_days,
-        "repetitions": result.new_state.repetitions,
-        "status": result.new_state.status,
-        "next_review_at": result.new_state.next_review_at.isoformat(),
-        "last_review_at": result.new_state.last_review_at.isoformat(),
+        **state_update(result.new_state, review.rating),
         "updated_at": datetime.now(timezone.utc).isoformat()
     }).eq("item_id", str(review.item_id)).eq("user_id", user["id"]).execute()
 
@@ -96,6 +247,66 @@ async def submit_review(
     )
 
 
+@router.post("/reschedule/shift", response_model=ShiftResult)
+async def shift_due_dates(
+    request: ShiftDueDates,
+    user: dict = Depends(get_current_user),
+    supabase=Depends(get_authenticated_supabase)
+):
+    """Move every due date by ``days`` (e.g. after a vacation), in one UPDATE.
+
+    With ``dry_run`` nothing changes and the result previews the effect.
+    """
+    if not request.dry_run:
+        await review_ingestor.settle(user["id"])
+
+    response = supabase.rpc("shift_due_dates", {
+        "p_days": request.days,
+        "p_collection_id": str(request.collection_id) if request.collection_id else None,
+        "p_dry_run": request.dry_run,
+    }).execute()
+
+    row = (response.data or [{}])[0]
+    return ShiftResult(
+        affected=row.get("affected") or 0,
+        first_due=row.get("first_due"),
+        last_due=row.get("last_due"),
+        dry_run=request.dry_run,
+    )
+
+
+@router.post("/reschedule/spread", response_model=SpreadResult)
+async def spread_backlog(
+    request: SpreadBacklog,
+    user: dict = Depends(get_current_user),
+    supabase=Depends(get_authenticated_supabase)
+):
+    """Spread overdue items over the next ``days`` days, most urgent first.
+
+    At most ``daily_cap`` items land on each day (default: an even split);
+    a backlog larger than ``days * daily_cap`` spills past ``days``. With
+    ``dry_run`` nothing changes and the per-day plan is returned.
+    ``affected`` counts the items moved; ``due_now`` the ones left due today.
+    """
+    if not request.dry_run:
+        await review_ingestor.settle(user["id"])
+
+    response = supabase.rpc("spread_backlog", {
+        "p_days": request.days,
+        "p_daily_cap": request.daily_cap,
+        "p_collection_id": str(request.collection_id) if request.collection_id else None,
+        "p_dry_run": request.dry_run,
+    }).execute()
+
+    rows = response.data or []
+    return SpreadResult(
+        affected=sum(row["count"] for row in rows if row["day_offset"] > 0),
+        due_now=sum(row["count"] for row in rows if row["day_offset"] == 0),
+        days=[{"date": row["day"], "count": row["count"]} for row in rows],
+        dry_run=request.dry_run,
+    )
+
+
 @router.get("/forecast")
 async def get_forecast(
     days: int = Query(default=30, le=90),
@@ -137,4 +348,4 @@ async def get_review_history(
         .limit(limit) \
         .execute()
 
-    return response.data
+    return NegotiatedResponse(response.data)
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional, Sequence
 
 from pydantic import BaseModel
 
@@ -16,6 +16,9 @@ class SchedulingState(BaseModel):
     status: Status = "new"
     next_review_at: datetime = datetime.now(timezone.utc)
     last_review_at: datetime | None = None
+    # FSRS memory state; unused by SM-2
+    stability: float | None = None
+    difficulty: float | None = None
 
 
 class ReviewResult(BaseModel):
@@ -125,3 +128,49 @@ class SM2Scheduler:
 
 
 scheduler = SM2Scheduler()
+
+
+def scheduler_for(collection_config: Optional[dict], fsrs_parameters: Optional[Sequence[float]] = None):
+    """The scheduling engine a collection is configured to use (SM-2 by default)."""
+    config = collection_config or {}
+    if config.get("scheduler") == "fsrs":
+        from app.reviews.fsrs import FSRSScheduler
+        return FSRSScheduler(fsrs_parameters, desired_retention=config.get("desired_retention", 0.9))
+    return scheduler
+
+
+def state_update(new_state: SchedulingState, rating: Rating) -> dict:
+    """Column values for ``scheduling_states`` after a review."""
+    update = {
+        "ease_factor": float(new_state.ease_factor),
+        "interval_days": new_state.interval_days,
+        "repetitions": new_state.repetitions,
+        "status": new_state.status,
+        "next_review_at": new_state.next_review_at.isoformat(),
+        "last_review_at": new_state.last_review_at.isoformat(),
+        "last_rating": rating,
+    }
+    if new_state.stability is not None:
+        update["stability"] = new_state.stability
+        update["difficulty"] = new_state.difficulty
+    return update
+
+
+def state_from_row(row: Dict[str, Any]) -> SchedulingState:
+    """A scheduling state from a ``scheduling_states`` row (extra keys ignored)."""
+    return SchedulingState(**{
+        column: row[column] for column in SchedulingState.model_fields if row.get(column) is not None
+    })
+
+
+def preview_ratings(engine, state: SchedulingState) -> List[Dict[str, Any]]:
+    """Where each rating would schedule the item, for the rating buttons."""
+    previews = []
+    for rating in (1, 2, 3, 4):
+        new_state = engine.process_review(state, rating).new_state
+        previews.append({
+            "rating": rating,
+            "interval_days": new_state.interval_days,
+            "next_review_at": new_state.next_review_at.isoformat(),
+        })
+    return previews
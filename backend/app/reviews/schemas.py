@@ -1,6 +1,7 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.reviews.scheduler import Rating
 
 
@@ -15,3 +16,35 @@ class ReviewResponse(BaseModel):
     rating: int
     next_review_at: datetime
     interval_days: int
+
+
+class ShiftDueDates(BaseModel):
+    days: int = Field(ge=-365, le=365)
+    collection_id: Optional[UUID] = None
+    dry_run: bool = False
+
+
+class SpreadBacklog(BaseModel):
+    days: int = Field(ge=1, le=90)
+    daily_cap: Optional[int] = Field(default=None, ge=1, le=1000)
+    collection_id: Optional[UUID] = None
+    dry_run: bool = False
+
+
+class ShiftResult(BaseModel):
+    affected: int
+    first_due: Optional[datetime]
+    last_due: Optional[datetime]
+    dry_run: bool
+
+
+class DayCount(BaseModel):
+    date: date
+    count: int
+
+
+class SpreadResult(BaseModel):
+    affected: int  # moved to a later day
+    due_now: int
+    days: List[DayCount]
+    dry_run: bool
@@ -1,16 +1,21 @@
 """Base service class for common database operations."""
 from datetime import datetime, timezone
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, TYPE_CHECKING
 from uuid import UUID
 
 from fastapi import HTTPException
-from supabase import Client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 
 class BaseService:
     """Base service with common CRUD operations."""
 
-    def __init__(self, table_name: str, supabase: Client, user_id: str):
+    # Whether the table has an updated_at column to stamp on update
+    has_updated_at = True
+
+    def __init__(self, table_name: str, supabase: "Client", user_id: str):
         self.table_name = table_name
         self.supabase = supabase
         self.user_id = user_id
@@ -77,7 +82,8 @@ class BaseService:
     ) -> Dict[str, Any]:
         """Update an existing item."""
         # Add updated_at timestamp
-        data["updated_at"] = datetime.now(timezone.utc).isoformat()
+        if self.has_updated_at:
+            data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
         response = self.supabase.table(self.table_name).update(data) \
             .eq("id", str(item_id)) \
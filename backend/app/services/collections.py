@@ -1,17 +1,90 @@
 """Collections service."""
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from uuid import UUID
 
-from supabase import Client
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
 
 from app.services.base import BaseService
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+EMPTY_STATS = {
+    "item_count": 0,
+    "due_count": 0,
+    "new_count": 0,
+    "learning_count": 0,
+    "review_count": 0,
+    "retention_rate": None,
+}
+
 
 class CollectionsService(BaseService):
     """Service for collections operations."""
 
-    def __init__(self, supabase: Client, user_id: str):
+    def __init__(self, supabase: "Client", user_id: str):
         super().__init__("collections", supabase, user_id)
 
-    async def list(self, **kwargs) -> List[Dict[str, Any]]:
-        """List collections ordered by creation date."""
-        return await super().list(order_by="created_at", desc=False, **kwargs)
+    async def list(self, with_stats: bool = False, **kwargs) -> List[Dict[str, Any]]:
+        """List collections ordered by creation date, optionally with stats."""
+        collections = await super().list(order_by="created_at", desc=False, **kwargs)
+
+        if with_stats:
+            stats = await self.stats()
+            for collection in collections:
+                collection["stats"] = stats.get(collection["id"], dict(EMPTY_STATS))
+
+        return collections
+
+    async def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-collection counts and retention from one grouped query."""
+        response = self.supabase.rpc("collection_stats", {}).execute()
+
+        stats = {}
+        for row in response.data or []:
+            collection_id = row.pop("collection_id")
+            retention_rate = row.get("retention_rate")
+            row["retention_rate"] = float(retention_rate) if retention_rate is not None else None
+            stats[collection_id] = row
+
+        return stats
+
+    async def clone(
+        self,
+        source_id: UUID,
+        name: str,
+        description: Optional[str] = None,
+        include_progress: bool = True
+    ) -> Dict[str, Any]:
+        """Copy a collection and its items in one database transaction."""
+        try:
+            response = self.supabase.rpc("clone_collection", {
+                "p_source_id": str(source_id),
+                "p_name": name,
+                "p_description": description,
+                "p_include_progress": include_progress,
+            }).execute()
+        except APIError as error:
+            if error.code == "23505":  # unique_violation on (user_id, name)
+                raise HTTPException(status_code=409, detail="A collection with this name already exists")
+            raise
+
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        return response.data[0]
+
+    async def merge(self, source_id: UUID, target_id: UUID, include_progress: bool = True) -> Dict[str, Any]:
+        """Copy a collection's items into another, skipping those already there."""
+        if source_id == target_id:
+            raise HTTPException(status_code=400, detail="Cannot merge a collection into itself")
+
+        response = self.supabase.rpc("merge_collection_items", {
+            "p_source_id": str(source_id),
+            "p_target_id": str(target_id),
+            "p_include_progress": include_progress,
+        }).execute()
+
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        return {"collection_id": str(target_id), **response.data[0]}
@@ -1,17 +1,95 @@
 """Items service."""
+import base64
+import binascii
+import json
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple, TYPE_CHECKING
 from uuid import UUID
 
-from supabase import Client
+from fastapi import HTTPException
 
+from app.fields import ITEM_FIELDS
 from app.services.base import BaseService
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Rows per insert when importing large lists
+IMPORT_CHUNK_SIZE = 100
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+# Review columns in an item's timeline
+TIMELINE_COLUMNS = (
+    "id", "rating", "reviewed_at",
+    "ease_factor_before", "ease_factor_after", "interval_before", "interval_after",
+)
+
+
+def encode_cursor(reviewed_at: str, review_id: str) -> str:
+    """Opaque, URL-safe page cursor for the last review on a page."""
+    return base64.urlsafe_b64encode(f"{reviewed_at}|{review_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(reviewed_at, id) from a page cursor; 400 if it was tampered with."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        reviewed_at, review_id = raw.split("|")
+        datetime.fromisoformat(reviewed_at.replace("Z", "+00:00"))
+        UUID(review_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return reviewed_at, review_id
+
+
+def build_metadata_filter(
+    difficulty: Optional[str] = None,
+    topics: Optional[List[str]] = None,
+    pattern: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build a filter for item metadata.
+
+    Every key is a JSONB containment match except ``topics``: an item
+    matches if it has any of them, like ticking several topic facets.
+    Apply it with ``apply_metadata_filter``; the SQL functions take it as
+    ``p_metadata`` (see ``metadata_matches``).
+    """
+    metadata_filter: Dict[str, Any] = {}
+    if difficulty:
+        metadata_filter["difficulty"] = difficulty
+    if topics:
+        metadata_filter["topics"] = topics
+    if pattern:
+        metadata_filter["pattern"] = pattern
+    return metadata_filter
+
+
+def apply_metadata_filter(query, metadata_filter: Dict[str, Any], reference_table: Optional[str] = None):
+    """Add a ``build_metadata_filter`` filter to a query on items.
+
+    With ``reference_table`` it filters the embedded items resource of
+    that name instead. Each condition, one ``metadata @>`` per topic
+    included, is served by the GIN index on ``items.metadata``.
+    """
+    column = f"{reference_table}.metadata" if reference_table else "metadata"
+    containment = {key: value for key, value in metadata_filter.items() if key != "topics"}
+    if containment:
+        query = query.contains(column, containment)
+
+    topics = metadata_filter.get("topics")
+    if topics:
+        query = query.or_(
+            ",".join(f"metadata.cs.{json.dumps({'topics': [topic]})}" for topic in topics),
+            reference_table=reference_table,
+        )
+    return query
+
 
 class ItemsService(BaseService):
     """Service for items operations."""
 
-    def __init__(self, supabase: Client, user_id: str):
+    def __init__(self, supabase: "Client", user_id: str):
         super().__init__("items", supabase, user_id)
 
     async def list(
@@ -19,16 +97,24 @@ class ItemsService(BaseService):
         collection_id: Optional[UUID] = None,
         archived: bool = False,
         limit: int = 100,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        tag_id: Optional[UUID] = None,
+        fields: Optional[str] = None,
         **kwargs
     ) -> List[Dict[str, Any]]:
-        """List items with optional filtering."""
-        filters = {}
-        if collection_id:
-            filters["collection_id"] = str(collection_id)
+        """List items with optional filtering.
+
+        ``fields`` is a sparse fieldset (see ``app.fields``); all columns by default.
+        """
+        columns, state_columns = ITEM_FIELDS.resolve(fields)
+        select = f"{columns}, scheduling_states({state_columns})"
+        if tag_id:
+            # Inner join through item_tags(tag_id, item_id) keeps only tagged items
+            select += ", item_tags!inner(tag_id)"
 
         # Build query
         query = self.supabase.table(self.table_name) \
-            .select("*, scheduling_states(*)") \
+            .select(select) \
             .eq("user_id", self.user_id) \
             .order("created_at", desc=True) \
             .limit(limit)
@@ -39,30 +125,125 @@ class ItemsService(BaseService):
         if not archived:
             query = query.is_("archived_at", "null")
 
+        if metadata_filter:
+            query = apply_metadata_filter(query, metadata_filter)
+
+        if tag_id:
+            query = query.eq("item_tags.tag_id", str(tag_id))
+
         response = query.execute()
         items = response.data
 
-        # Fetch the most recent review for each item
-        if items:
-            item_ids = [item["id"] for item in items]
-            reviews_response = self.supabase.table("reviews") \
-                .select("item_id, rating, reviewed_at") \
+        # The most recent rating is denormalized onto the scheduling state by
+        # the review path, so no per-page scan of the reviews table is needed
+        for item in items:
+            states = item.get("scheduling_states") or []
+            state = states[0] if states else None
+            if state and state.get("last_rating") is not None:
+                item["recent_review"] = {
+                    "item_id": item["id"],
+                    "rating": state["last_rating"],
+                    "reviewed_at": state["last_review_at"],
+                }
+            else:
+                item["recent_review"] = None
+
+        return items
+
+    async def review_timeline(
+        self,
+        item_id: UUID,
+        limit: int = 50,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """An item's reviews, newest first, after the (reviewed_at, id) ``before``.
+
+        Ordered by id within a timestamp, so reviews sharing one are neither
+        skipped nor repeated at a page boundary. Served by
+        ``idx_reviews_item_date`` (item_id, reviewed_at DESC).
+        """
+        query = self.supabase.table("reviews") \
+            .select(", ".join(TIMELINE_COLUMNS)) \
+            .eq("item_id", str(item_id)) \
+            .eq("user_id", self.user_id) \
+            .order("reviewed_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit)
+
+        if before:
+            reviewed_at, review_id = before
+            query = query.or_(
+                f'reviewed_at.lt."{reviewed_at}",'
+                f'and(reviewed_at.eq."{reviewed_at}",id.lt.{review_id})'
+            )
+
+        rows = query.execute().data or []
+        if not rows and not before:
+            # Distinguish "never reviewed" from "no such item"
+            item = self.supabase.table("items") \
+                .select("id") \
+                .eq("id", str(item_id)) \
                 .eq("user_id", self.user_id) \
-                .in_("item_id", item_ids) \
-                .order("reviewed_at", desc=True) \
+                .maybe_single() \
                 .execute()
+            if not item or not item.data:
+                raise HTTPException(status_code=404, detail="Item not found")
+        return rows
 
-            # Create a map of item_id to most recent review
-            recent_reviews = {}
-            for review in reviews_response.data:
-                if review["item_id"] not in recent_reviews:
-                    recent_reviews[review["item_id"]] = review
+    async def facets(
+        self,
+        collection_id: Optional[UUID] = None,
+        archived: bool = False,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        tag_id: Optional[UUID] = None,
+        due_only: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Count items per difficulty, topic and pattern within the current filters."""
+        response = self.supabase.rpc("item_facets", {
+            "p_collection_id": str(collection_id) if collection_id else None,
+            "p_metadata": metadata_filter or {},
+            "p_tag_id": str(tag_id) if tag_id else None,
+            "p_include_archived": archived,
+            "p_due_only": due_only,
+        }).execute()
 
-            # Add recent review to each item
-            for item in items:
-                item["recent_review"] = recent_reviews.get(item["id"])
+        facets: Dict[str, List[Dict[str, Any]]] = {"difficulty": [], "topics": [], "pattern": []}
+        for row in response.data or []:
+            facets[row["facet"]].append({"value": row["value"], "count": row["count"]})
 
-        return items
+        for values in facets.values():
+            values.sort(key=lambda x: x["count"], reverse=True)
+
+        return facets
+
+    async def search(
+        self,
+        query: str,
+        collection_id: Optional[UUID] = None,
+        archived: bool = False,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """Ranked full-text and fuzzy search over title, notes and external ID."""
+        response = self.supabase.rpc("search_items", {
+            "p_query": query,
+            "p_collection_id": str(collection_id) if collection_id else None,
+            "p_include_archived": archived,
+            "p_limit": limit,
+            "p_offset": offset,
+        }).execute()
+
+        rows = response.data or []
+        total = rows[0]["total_count"] if rows else 0
+        for row in rows:
+            row.pop("total_count", None)
+
+        return {
+            "items": rows,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
 
     async def create_with_scheduling(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Create item and its scheduling state."""
@@ -83,7 +264,12 @@ class ItemsService(BaseService):
 
         return created_item
 
-    async def bulk_create(self, collection_id: UUID, items_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def bulk_create(
+        self,
+        collection_id: UUID,
+        items_data: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """Bulk import items."""
         items_to_insert = []
         for item_data in items_data:
@@ -97,26 +283,110 @@ class ItemsService(BaseService):
                 "notes": item_data.get("notes"),
             })
 
-        # Insert items
-        items_response = self.supabase.table(self.table_name).insert(items_to_insert).execute()
+        created_items = await self._insert_with_scheduling(items_to_insert, progress)
+
+        return {
+            "message": f"Created {len(created_items)} items",
+            "items": created_items
+        }
+
+    async def import_preset(
+        self,
+        collection_id: UUID,
+        preset_data: Dict[str, Any],
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Import a preset list into a collection, skipping problems already present."""
+        # Verify collection exists and belongs to user
+        collection_response = self.supabase.table("collections") \
+            .select("id") \
+            .eq("id", str(collection_id)) \
+            .eq("user_id", self.user_id) \
+            .maybe_single() \
+            .execute()
+
+        if not collection_response or not collection_response.data:
+            raise HTTPException(status_code=404, detail="Collection not found")
 
-        # Create scheduling states
-        scheduling_states = []
-        for item in items_response.data:
-            scheduling_states.append({
-                "item_id": item["id"],
+        # Check for existing items to avoid duplicates
+        problems = preset_data.get("problems", [])
+        external_ids = [p.get("external_id") for p in problems if p.get("external_id")]
+
+        existing_items_response = self.supabase.table(self.table_name) \
+            .select("external_id") \
+            .eq("collection_id", str(collection_id)) \
+            .eq("user_id", self.user_id) \
+            .in_("external_id", external_ids) \
+            .execute()
+
+        existing_external_ids = {item["external_id"] for item in existing_items_response.data}
+
+        # Prepare items for insertion (skip existing ones)
+        items_to_insert = []
+        skipped_count = 0
+        for problem in problems:
+            external_id = problem.get("external_id")
+            if external_id in existing_external_ids:
+                skipped_count += 1
+                continue
+
+            items_to_insert.append({
                 "user_id": self.user_id,
-                "status": "new",
-                "next_review_at": datetime.now(timezone.utc).isoformat(),
+                "collection_id": str(collection_id),
+                "title": problem.get("title"),
+                "external_id": external_id,
+                "external_url": problem.get("external_url"),
+                "metadata": problem.get("metadata", {}),
             })
 
-        self.supabase.table("scheduling_states").insert(scheduling_states).execute()
+        if not items_to_insert:
+            return {
+                "message": f"All {skipped_count} problems from {preset_data.get('name')} already exist in this collection",
+                "items_created": 0,
+                "items_skipped": skipped_count
+            }
+
+        created_items = await self._insert_with_scheduling(items_to_insert, progress)
 
         return {
-            "message": f"Created {len(items_response.data)} items",
-            "items": items_response.data
+            "message": f"Imported {len(created_items)} problems from {preset_data.get('name')}" +
+                       (f" ({skipped_count} already existed)" if skipped_count > 0 else ""),
+            "items_created": len(created_items),
+            "items_skipped": skipped_count
         }
 
+    async def _insert_with_scheduling(
+        self,
+        items_to_insert: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """Insert items and their scheduling states in chunks, reporting progress per chunk."""
+        created_items = []
+        total = len(items_to_insert)
+
+        for start in range(0, total, IMPORT_CHUNK_SIZE):
+            chunk = items_to_insert[start:start + IMPORT_CHUNK_SIZE]
+            items_response = self.supabase.table(self.table_name).insert(chunk).execute()
+
+            # Create scheduling states
+            now = datetime.now(timezone.utc).isoformat()
+            scheduling_states = []
+            for item in items_response.data:
+                scheduling_states.append({
+                    "item_id": item["id"],
+                    "user_id": self.user_id,
+                    "status": "new",
+                    "next_review_at": now,
+                })
+
+            self.supabase.table("scheduling_states").insert(scheduling_states).execute()
+            created_items.extend(items_response.data)
+
+            if progress:
+                await progress(len(created_items), total)
+
+        return created_items
+
     async def archive(self, item_id: UUID) -> Dict[str, Any]:
         """Archive (soft delete) an item."""
         return await self.update(
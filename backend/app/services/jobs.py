@@ -0,0 +1,18 @@
+"""Jobs service."""
+from typing import List, Dict, Any, TYPE_CHECKING
+
+from app.services.base import BaseService
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+class JobsService(BaseService):
+    """Service for background job records."""
+
+    def __init__(self, supabase: "Client", user_id: str):
+        super().__init__("jobs", supabase, user_id)
+
+    async def list(self, **kwargs) -> List[Dict[str, Any]]:
+        """List jobs, most recent first."""
+        return await super().list(order_by="created_at", desc=True, **kwargs)
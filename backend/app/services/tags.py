@@ -0,0 +1,100 @@
+"""Tags service."""
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.cache import TTLCache
+from app.services.base import BaseService
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Per-user {tag_id: item_count}; invalidated by this process on writes
+tag_counts_cache = TTLCache(ttl_seconds=60, name="tag_counts")
+
+
+class TagsService(BaseService):
+    """Service for tags and item tagging."""
+
+    has_updated_at = False
+
+    def __init__(self, supabase: "Client", user_id: str):
+        super().__init__("tags", supabase, user_id)
+
+    async def list(self, collection_id: Optional[UUID] = None, **kwargs) -> List[Dict[str, Any]]:
+        """List tags ordered by name, each with its item count."""
+        filters = {"collection_id": str(collection_id)} if collection_id else None
+        tags = await super().list(order_by="name", filters=filters, **kwargs)
+
+        counts = await self.counts()
+        for tag in tags:
+            tag["item_count"] = counts.get(tag["id"], 0)
+
+        return tags
+
+    async def counts(self) -> Dict[str, int]:
+        """Item count per tag, cached per user."""
+        counts = tag_counts_cache.get(self.user_id)
+        if counts is not None:
+            return counts
+
+        response = self.supabase.table(self.table_name) \
+            .select("id, item_tags(count)") \
+            .eq("user_id", self.user_id) \
+            .execute()
+
+        counts = {}
+        for tag in response.data:
+            embedded = tag.get("item_tags") or [{"count": 0}]
+            counts[tag["id"]] = embedded[0]["count"]
+
+        tag_counts_cache.set(self.user_id, counts)
+        return counts
+
+    async def delete(self, item_id: UUID, **kwargs) -> Dict[str, str]:
+        """Delete a tag; its item links cascade."""
+        result = await super().delete(item_id, **kwargs)
+        tag_counts_cache.invalidate(self.user_id)
+        return result
+
+    async def bulk_tag(self, tag_ids: List[UUID], item_ids: List[UUID]) -> Dict[str, Any]:
+        """Attach every tag to every item in one set-based upsert."""
+        await self._verify_tags(tag_ids)
+
+        rows = [
+            {"item_id": str(item_id), "tag_id": str(tag_id)}
+            for tag_id in tag_ids
+            for item_id in item_ids
+        ]
+        if rows:
+            self.supabase.table("item_tags") \
+                .upsert(rows, on_conflict="item_id,tag_id", ignore_duplicates=True) \
+                .execute()
+
+        tag_counts_cache.invalidate(self.user_id)
+        return {"message": f"Tagged {len(item_ids)} items with {len(tag_ids)} tags"}
+
+    async def bulk_untag(self, tag_ids: List[UUID], item_ids: List[UUID]) -> Dict[str, Any]:
+        """Detach the tags from the items in one set-based delete."""
+        await self._verify_tags(tag_ids)
+
+        response = self.supabase.table("item_tags") \
+            .delete() \
+            .in_("tag_id", [str(tag_id) for tag_id in tag_ids]) \
+            .in_("item_id", [str(item_id) for item_id in item_ids]) \
+            .execute()
+
+        tag_counts_cache.invalidate(self.user_id)
+        return {"message": f"Removed {len(response.data)} tag links"}
+
+    async def _verify_tags(self, tag_ids: List[UUID]) -> None:
+        """Ensure all tags belong to the user (item_tags RLS only checks the item)."""
+        response = self.supabase.table(self.table_name) \
+            .select("id") \
+            .eq("user_id", self.user_id) \
+            .in_("id", [str(tag_id) for tag_id in tag_ids]) \
+            .execute()
+
+        if len(response.data) != len(set(tag_ids)):
+            raise HTTPException(status_code=404, detail="Tag not found")
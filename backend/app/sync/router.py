@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.dependencies import get_current_user, get_authenticated_supabase
+from app.encoding import NegotiatedResponse
+
+router = APIRouter()
+
+# updated_at is the writing transaction's start time, so a row can commit
+# with a timestamp older than a watermark already handed out. Every delta
+# re-reads this far back; clients apply rows idempotently.
+OVERLAP = timedelta(seconds=60)
+
+# deleted_records rows older than this may be pruned (prune_deleted_records);
+# clients further behind get a full snapshot instead of a delta
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+SYNCED_TABLES = ("collections", "items", "scheduling_states")
+
+# PostgREST caps each response (1000 rows by default), so reads are paged
+SYNC_PAGE_SIZE = 1000
+
+
+@router.get("")
+async def sync(
+    since: Optional[datetime] = None,
+    user: dict = Depends(get_current_user),
+    supabase=Depends(get_authenticated_supabase)
+):
+    """Collections, items and scheduling states changed since a watermark.
+
+    Without ``since`` (or when it is older than the tombstone retention) the
+    response is a full snapshot with ``reset: true``. Otherwise it holds the
+    rows whose ``updated_at`` is at or after ``since`` (less a short
+    overlap), plus ``tombstones`` for archived items and hard deletes.
+    Pass the returned ``watermark`` as ``since`` next time.
+    """
+    now = datetime.now(timezone.utc)
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+
+    def changed(table: str):
+        query = supabase.table(table).select("*").eq("user_id", user["id"])
+        if reset:
+            if table == "items":
+                query = query.is_("archived_at", "null")
+        else:
+            query = query.gte("updated_at", (since - OVERLAP).isoformat())
+        return query.order("updated_at").order("id")
+
+    changes: Dict[str, List[Dict[str, Any]]] = {
+        table: _read_all(lambda: changed(table)) for table in SYNCED_TABLES
+    }
+
+    tombstones: List[Dict[str, Any]] = []
+    if not reset:
+        # Archiving is an update; replicas drop the item like a delete
+        live_items = []
+        for item in changes["items"]:
+            if item.get("archived_at"):
+                tombstones.append({"table": "items", "id": item["id"], "reason": "archived", "at": item["updated_at"]})
+            else:
+                live_items.append(item)
+        changes["items"] = live_items
+
+        deleted = _read_all(lambda: supabase.table("deleted_records")
+                            .select("table_name, record_id, deleted_at")
+                            .eq("user_id", user["id"])
+                            .gte("deleted_at", (since - OVERLAP).isoformat())
+                            .order("deleted_at")
+                            .order("record_id"))
+        tombstones.extend(
+            {"table": row["table_name"], "id": row["record_id"], "reason": "deleted", "at": row["deleted_at"]}
+            for row in deleted
+        )
+
+    # The newest change seen, so the watermark follows the database clock
+    seen = [row["updated_at"] for rows in changes.values() for row in rows]
+    seen += [tombstone["at"] for tombstone in tombstones]
+    watermark = max((_parse(value) for value in seen), default=None)
+    if since is not None and not reset and (watermark is None or watermark < since):
+        watermark = since
+    if watermark is None:
+        watermark = now
+
+    return NegotiatedResponse({
+        "watermark": watermark.isoformat(),
+        "reset": reset,
+        **changes,
+        "tombstones": tombstones,
+    })
+
+
+def _read_all(build: Callable[[], Any]) -> List[Dict[str, Any]]:
+    """Every row of the query ``build()`` returns, one page at a time."""
+    rows: List[Dict[str, Any]] = []
+    while True:
+        page = build().range(len(rows), len(rows) + SYNC_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < SYNC_PAGE_SIZE:
+            return rows
+
+
+def _parse(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
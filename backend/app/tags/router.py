@@ -0,0 +1,72 @@
+from uuid import UUID
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from app.dependencies import get_current_user, get_authenticated_supabase, ensure_profile_exists
+from app.tags.schemas import TagCreate, TagUpdate, TagResponse, BulkTagRequest
+from app.services.tags import TagsService
+
+router = APIRouter()
+
+
+def get_tags_service(
+    user: dict = Depends(get_current_user),
+    supabase = Depends(get_authenticated_supabase)
+) -> TagsService:
+    """Dependency to get tags service."""
+    return TagsService(supabase, user["id"])
+
+
+@router.get("/")
+async def list_tags(
+    collection_id: Optional[UUID] = None,
+    service: TagsService = Depends(get_tags_service)
+):
+    """List user's tags with item counts."""
+    return await service.list(collection_id=collection_id)
+
+
+@router.post("/", response_model=TagResponse)
+async def create_tag(
+    tag: TagCreate,
+    service: TagsService = Depends(get_tags_service),
+    _: None = Depends(ensure_profile_exists)
+):
+    """Create a new tag."""
+    return await service.create({
+        "name": tag.name,
+        "color": tag.color,
+        "collection_id": str(tag.collection_id) if tag.collection_id else None,
+    })
+
+
+@router.post("/bulk")
+async def bulk_tag_items(
+    request: BulkTagRequest,
+    service: TagsService = Depends(get_tags_service)
+):
+    """Add or remove tags on many items in one request."""
+    if request.action == "remove":
+        return await service.bulk_untag(request.tag_ids, request.item_ids)
+    return await service.bulk_tag(request.tag_ids, request.item_ids)
+
+
+@router.patch("/{tag_id}")
+async def update_tag(
+    tag_id: UUID,
+    tag: TagUpdate,
+    service: TagsService = Depends(get_tags_service)
+):
+    """Update tag."""
+    update_data = tag.model_dump(exclude_unset=True)
+    return await service.update(tag_id, update_data, not_found_message="Tag not found")
+
+
+@router.delete("/{tag_id}")
+async def delete_tag(
+    tag_id: UUID,
+    service: TagsService = Depends(get_tags_service)
+):
+    """Delete tag."""
+    return await service.delete(tag_id, not_found_message="Tag not found")
@@ -0,0 +1,30 @@
+from datetime import datetime
+from uuid import UUID
+from typing import Optional, List, Literal
+from pydantic import BaseModel, Field
+
+
+class TagCreate(BaseModel):
+    name: str
+    color: str = "#6B7280"
+    collection_id: Optional[UUID] = None
+
+
+class TagUpdate(BaseModel):
+    name: Optional[str] = None
+    color: Optional[str] = None
+
+
+class TagResponse(BaseModel):
+    id: UUID
+    user_id: UUID
+    collection_id: Optional[UUID]
+    name: str
+    color: str
+    created_at: datetime
+
+
+class BulkTagRequest(BaseModel):
+    tag_ids: List[UUID] = Field(min_length=1, max_length=50)
+    item_ids: List[UUID] = Field(min_length=1, max_length=1000)
+    action: Literal["add", "remove"] = "add"
@@ -0,0 +1,207 @@
+-- =====================================================
+-- Monthly partitioning of reviews, with compacted cold history
+-- Required: run this AFTER supabase_setup.sql. Safe to re-run.
+-- =====================================================
+--
+-- reviews becomes a table partitioned by month on reviewed_at
+-- (reviews_YYYY_MM). Old months can be compacted into
+-- review_daily_summaries (one row per user, item and day), then detached
+-- and archived with scripts/archive_reviews.py. Analytics read the
+-- review_activity view, which unions recent raw reviews with the
+-- summaries. The app needs both the view and the (id, reviewed_at) key.
+--
+-- The first run copies the existing table into the partitions inside one
+-- transaction and holds an exclusive lock on reviews while it does; run it
+-- in a quiet window.
+
+-- =====================================================
+-- PARTITION MANAGEMENT
+-- =====================================================
+
+-- Create the partition for the month containing p_month (idempotent)
+CREATE OR REPLACE FUNCTION public.create_review_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start TIMESTAMPTZ := date_trunc('month', p_month::TIMESTAMP) AT TIME ZONE 'UTC';
+    v_name TEXT := 'reviews_' || to_char(p_month, 'YYYY_MM');
+BEGIN
+    IF to_regclass('public.' || v_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.reviews FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_start + INTERVAL '1 month'
+        );
+        -- Partitions are reachable through the API too; with RLS on and no
+        -- policy, only the parent's policies give access
+        EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+    END IF;
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions for this month and the next p_months_ahead, so inserts never
+-- land in the default partition. Call monthly (archive_reviews.py does).
+CREATE OR REPLACE FUNCTION public.ensure_review_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS SETOF TEXT AS $$
+    SELECT public.create_review_partition((date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => m))::DATE)
+    FROM generate_series(0, p_months_ahead) AS m;
+$$ LANGUAGE sql;
+
+REVOKE EXECUTE ON FUNCTION public.create_review_partition(DATE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.ensure_review_partitions(INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- MIGRATION FROM THE UNPARTITIONED TABLE
+-- =====================================================
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = 'reviews' AND c.relkind = 'r'
+    ) THEN
+        ALTER TABLE public.reviews RENAME TO reviews_unpartitioned;
+        -- Index names are schema-wide; free them for the new table
+        ALTER INDEX IF EXISTS public.idx_reviews_user_date RENAME TO idx_reviews_unpartitioned_user_date;
+        ALTER INDEX IF EXISTS public.idx_reviews_item_date RENAME TO idx_reviews_unpartitioned_item_date;
+        ALTER INDEX IF EXISTS public.reviews_pkey RENAME TO reviews_unpartitioned_pkey;
+    END IF;
+END $$;
+
+-- The partition key has to be part of the primary key
+CREATE TABLE IF NOT EXISTS public.reviews (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    item_id UUID NOT NULL REFERENCES public.items(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    rating INTEGER NOT NULL CONSTRAINT reviews_rating_check CHECK (rating BETWEEN 1 AND 4),
+    ease_factor_before DECIMAL(4,2),
+    interval_before INTEGER,
+    ease_factor_after DECIMAL(4,2),
+    interval_after INTEGER,
+    reviewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, reviewed_at)
+) PARTITION BY RANGE (reviewed_at);
+
+-- Catches rows outside every monthly partition (e.g. clock skew)
+CREATE TABLE IF NOT EXISTS public.reviews_default PARTITION OF public.reviews DEFAULT;
+ALTER TABLE public.reviews_default ENABLE ROW LEVEL SECURITY;
+
+-- Created on the parent, so every partition gets a local copy
+CREATE INDEX IF NOT EXISTS idx_reviews_user_date ON public.reviews(user_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_item_date ON public.reviews(item_id, reviewed_at DESC);
+
+SELECT public.ensure_review_partitions(3);
+
+DO $$
+DECLARE
+    v_month DATE;
+BEGIN
+    IF to_regclass('public.reviews_unpartitioned') IS NOT NULL THEN
+        FOR v_month IN
+            SELECT generate_series(date_trunc('month', min(reviewed_at) AT TIME ZONE 'UTC'),
+                                   date_trunc('month', NOW() AT TIME ZONE 'UTC'), INTERVAL '1 month')::DATE
+            FROM public.reviews_unpartitioned
+        LOOP
+            PERFORM public.create_review_partition(v_month);
+        END LOOP;
+
+        INSERT INTO public.reviews (
+            id, item_id, user_id, rating, ease_factor_before, interval_before,
+            ease_factor_after, interval_after, reviewed_at
+        )
+        SELECT id, item_id, user_id, rating, ease_factor_before, interval_before,
+               ease_factor_after, interval_after, reviewed_at
+        FROM public.reviews_unpartitioned
+        ON CONFLICT DO NOTHING;
+
+        DROP TABLE public.reviews_unpartitioned;
+    END IF;
+END $$;
+
+ALTER TABLE public.reviews ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can manage own reviews" ON public.reviews;
+CREATE POLICY "Users can manage own reviews" ON public.reviews
+    FOR ALL USING (auth.uid() = user_id);
+
+-- =====================================================
+-- COMPACTED HISTORY
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.review_daily_summaries (
+    user_id UUID NOT NULL REFERENCES public.profiles(id) ON DELETE CASCADE,
+    item_id UUID NOT NULL REFERENCES public.items(id) ON DELETE CASCADE,
+    day DATE NOT NULL,  -- UTC
+    review_count INTEGER NOT NULL,
+    successful_count INTEGER NOT NULL,  -- rating >= 3
+    last_rating INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day, item_id)
+);
+
+ALTER TABLE public.review_daily_summaries ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can view own review summaries" ON public.review_daily_summaries;
+CREATE POLICY "Users can view own review summaries" ON public.review_daily_summaries
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- Raw reviews (one row each) plus compacted days (one row per item and
+-- day). A month is in exactly one of the two: compaction summarizes and
+-- detaches a partition in the same transaction.
+CREATE OR REPLACE VIEW public.review_activity WITH (security_invoker = true) AS
+    SELECT user_id, item_id, reviewed_at,
+           1 AS review_count,
+           (rating >= 3)::INTEGER AS successful_count
+    FROM public.reviews
+    UNION ALL
+    SELECT user_id, item_id, day::TIMESTAMP AT TIME ZONE 'UTC' AS reviewed_at,
+           review_count, successful_count
+    FROM public.review_daily_summaries;
+
+GRANT SELECT ON public.review_activity TO authenticated;
+
+-- Summarize one month into review_daily_summaries and detach its
+-- partition, atomically. The detached table is left for
+-- archive_reviews.py to export and drop. Months within p_keep_months of
+-- now are refused: streaks and the review history read raw reviews.
+CREATE OR REPLACE FUNCTION public.compact_review_partition(p_month DATE, p_keep_months INTEGER DEFAULT 12)
+RETURNS BIGINT AS $$
+DECLARE
+    v_name TEXT := 'reviews_' || to_char(p_month, 'YYYY_MM');
+    v_rows BIGINT;
+BEGIN
+    IF date_trunc('month', p_month) > date_trunc('month', NOW()) - make_interval(months => greatest(p_keep_months, 3)) THEN
+        RAISE EXCEPTION 'Refusing to compact %: newer than % months', v_name, greatest(p_keep_months, 3);
+    END IF;
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhparent = 'public.reviews'::REGCLASS
+          AND inhrelid = to_regclass('public.' || v_name)
+    ) THEN
+        RAISE EXCEPTION 'No attached partition %', v_name;
+    END IF;
+
+    -- A partition holds whole days, so re-running overwrites rather than adds
+    EXECUTE format($sql$
+        INSERT INTO public.review_daily_summaries
+            (user_id, item_id, day, review_count, successful_count, last_rating)
+        SELECT user_id, item_id, (reviewed_at AT TIME ZONE 'UTC')::DATE,
+               count(*), count(*) FILTER (WHERE rating >= 3),
+               (array_agg(rating ORDER BY reviewed_at DESC))[1]
+        FROM public.%I
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, day, item_id) DO UPDATE
+        SET review_count = EXCLUDED.review_count,
+            successful_count = EXCLUDED.successful_count,
+            last_rating = EXCLUDED.last_rating
+    $sql$, v_name);
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    EXECUTE format('ALTER TABLE public.reviews DETACH PARTITION public.%I', v_name);
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION public.compact_review_partition(DATE, INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- DONE
+-- =====================================================
+SELECT 'reviews is partitioned by month.' AS status;
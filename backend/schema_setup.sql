@@ -15,6 +15,7 @@ CREATE TABLE IF NOT EXISTS profiles (
     daily_review_limit INTEGER NOT NULL DEFAULT 100,
     new_items_per_day INTEGER NOT NULL DEFAULT 20,
     default_ease_factor DECIMAL(4,2) NOT NULL DEFAULT 2.5,
+    fsrs_parameters JSONB,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
@@ -78,14 +79,27 @@ CREATE TABLE IF NOT EXISTS scheduling_states (
     status TEXT NOT NULL DEFAULT 'new',
     next_review_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     last_review_at TIMESTAMPTZ,
+    last_rating INTEGER,
+    stability DOUBLE PRECISION,
+    difficulty DOUBLE PRECISION,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     UNIQUE(item_id, user_id)
 );
 
+-- Columns added after the initial release (no-ops on fresh installs)
+ALTER TABLE scheduling_states ADD COLUMN IF NOT EXISTS last_rating INTEGER;
+-- FSRS memory state (collections with config {"scheduler": "fsrs"})
+ALTER TABLE scheduling_states ADD COLUMN IF NOT EXISTS stability DOUBLE PRECISION;
+ALTER TABLE scheduling_states ADD COLUMN IF NOT EXISTS difficulty DOUBLE PRECISION;
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS fsrs_parameters JSONB;
+
 -- Create reviews table
+-- Keyed on (id, reviewed_at) like the partitioned table that
+-- partition_reviews.sql turns it into (required; the write-behind flush
+-- upserts on those columns)
 CREATE TABLE IF NOT EXISTS reviews (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     item_id UUID NOT NULL REFERENCES items(id) ON DELETE CASCADE,
     user_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
     rating INTEGER NOT NULL,
@@ -93,15 +107,56 @@ CREATE TABLE IF NOT EXISTS reviews (
     interval_before INTEGER,
     ease_factor_after DECIMAL(4,2),
     interval_after INTEGER,
-    reviewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    reviewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, reviewed_at)
+);
+
+-- Create jobs table (background imports and recomputes)
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    params JSONB NOT NULL DEFAULT '{}',
+    progress INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- Create deleted_records table (tombstones for delta sync). No foreign key
+-- to profiles: rows are written while a deleted profile's data cascades away.
+CREATE TABLE IF NOT EXISTS deleted_records (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    table_name TEXT NOT NULL,
+    record_id UUID NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_items_user_collection ON items(user_id, collection_id);
 CREATE INDEX IF NOT EXISTS idx_items_archived ON items(user_id) WHERE archived_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_items_metadata ON items USING GIN (metadata jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_item_tags_tag ON item_tags(tag_id, item_id);
 CREATE INDEX IF NOT EXISTS idx_scheduling_due ON scheduling_states(user_id, next_review_at);
+-- Urgency-ordered due queue (urgent_due_items)
+CREATE INDEX IF NOT EXISTS idx_scheduling_interval_due ON scheduling_states(user_id, interval_days, next_review_at);
 CREATE INDEX IF NOT EXISTS idx_scheduling_status ON scheduling_states(user_id, status);
 CREATE INDEX IF NOT EXISTS idx_reviews_user_date ON reviews(user_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_item_date ON reviews(item_id, reviewed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at);
+-- Orphaned job sweep (app/jobs/runner.py)
+CREATE INDEX IF NOT EXISTS idx_jobs_unfinished_updated ON jobs(updated_at) WHERE status IN ('queued', 'running');
+-- Delta sync (GET /api/sync?since=)
+CREATE INDEX IF NOT EXISTS idx_collections_user_updated ON collections(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_items_user_updated ON items(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_scheduling_user_updated ON scheduling_states(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_deleted_records_user_deleted ON deleted_records(user_id, deleted_at);
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -128,3 +183,30 @@ CREATE TRIGGER update_items_updated_at BEFORE UPDATE ON items
 DROP TRIGGER IF EXISTS update_scheduling_states_updated_at ON scheduling_states;
 CREATE TRIGGER update_scheduling_states_updated_at BEFORE UPDATE ON scheduling_states
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_jobs_updated_at ON jobs;
+CREATE TRIGGER update_jobs_updated_at BEFORE UPDATE ON jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Record hard deletes for delta sync. SECURITY DEFINER: callers can read
+-- their tombstones but not write them.
+CREATE OR REPLACE FUNCTION log_deleted_record()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.deleted_records (user_id, table_name, record_id)
+    VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS log_collections_deleted ON collections;
+CREATE TRIGGER log_collections_deleted AFTER DELETE ON collections
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_record();
+
+DROP TRIGGER IF EXISTS log_items_deleted ON items;
+CREATE TRIGGER log_items_deleted AFTER DELETE ON items
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_record();
+
+DROP TRIGGER IF EXISTS log_scheduling_states_deleted ON scheduling_states;
+CREATE TRIGGER log_scheduling_states_deleted AFTER DELETE ON scheduling_states
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_record();
@@ -0,0 +1,144 @@
+"""Compact, detach and archive cold monthly partitions of ``reviews``.
+
+Needs ``partition_reviews.sql`` applied. For every attached
+``reviews_YYYY_MM`` partition older than ``--keep-months``:
+
+1. ``compact_review_partition`` summarizes it into
+   ``review_daily_summaries`` and detaches it, in one transaction, so
+   analytics keep counting those reviews exactly once;
+2. the detached table is exported to ``<archive-dir>/reviews_YYYY_MM.csv.gz``;
+3. the table is dropped.
+
+Detached partitions left behind by an interrupted run are exported and
+dropped too. It also creates partitions for the coming months, so run it
+monthly (e.g. from cron). Connects with ``DATABASE_URL`` (the service
+role; row level security does not apply).
+
+Usage:
+  python scripts/archive_reviews.py --dry-run
+  python scripts/archive_reviews.py --keep-months 12 --archive-dir /backups/reviews
+"""
+import argparse
+import asyncio
+import gzip
+import re
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import asyncpg
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import get_settings  # noqa: E402
+
+PARTITION_NAME = re.compile(r"^reviews_(\d{4})_(\d{2})$")
+MIN_KEEP_MONTHS = 3
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def cutoff_month(keep_months: int, today: Optional[date] = None) -> date:
+    """First month that stays raw; partitions before it are archived."""
+    today = today or datetime.now(timezone.utc).date()
+    months = today.year * 12 + today.month - 1 - keep_months
+    return date(months // 12, months % 12 + 1, 1)
+
+
+async def attached_partitions(conn: asyncpg.Connection) -> List[str]:
+    rows = await conn.fetch("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.reviews'::regclass
+    """)
+    return [row["relname"] for row in rows]
+
+
+async def detached_partitions(conn: asyncpg.Connection) -> List[str]:
+    rows = await conn.fetch("""
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relkind = 'r'
+          AND c.relname ~ '^reviews_[0-9]{4}_[0-9]{2}$'
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+    """)
+    return [row["relname"] for row in rows]
+
+
+async def archive_table(conn: asyncpg.Connection, name: str, archive_dir: Path) -> Path:
+    """Export a detached partition to gzipped CSV, then drop it."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    partial = path.with_suffix(".gz.partial")
+    with gzip.open(partial, "wb") as output:
+        await conn.copy_from_table(name, schema_name="public", output=output, format="csv", header=True)
+    # Only drop once the export is complete on disk
+    partial.replace(path)
+    await conn.execute(f'DROP TABLE public."{name}"')
+    return path
+
+
+async def run(args: argparse.Namespace) -> None:
+    keep_months = max(args.keep_months, MIN_KEEP_MONTHS)
+    cutoff = cutoff_month(keep_months)
+    archive_dir = Path(args.archive_dir)
+
+    conn = await asyncpg.connect(args.database_url or get_settings().database_url)
+    try:
+        if not args.dry_run:
+            created = await conn.fetch("SELECT public.ensure_review_partitions($1)", args.months_ahead)
+            print(f"Partitions ensured: {', '.join(row[0] for row in created)}")
+
+        cold = sorted(
+            name for name in await attached_partitions(conn)
+            if (month := partition_month(name)) is not None and month < cutoff
+        )
+        leftovers = sorted(await detached_partitions(conn))
+        print(f"Keeping {keep_months} months raw (from {cutoff:%Y-%m}); "
+              f"{len(cold)} partitions to compact, {len(leftovers)} detached to archive")
+
+        for name in cold:
+            rows = await conn.fetchval(f'SELECT count(*) FROM public."{name}"')
+            if args.dry_run:
+                print(f"  would compact {name} ({rows} reviews)")
+                continue
+            summaries = await conn.fetchval(
+                "SELECT public.compact_review_partition($1, $2)", partition_month(name), keep_months
+            )
+            print(f"  compacted {name}: {rows} reviews -> {summaries} daily summaries")
+            leftovers.append(name)
+
+        for name in leftovers:
+            if args.dry_run:
+                print(f"  would archive {name}")
+                continue
+            path = await archive_table(conn, name, archive_dir)
+            print(f"  archived {name} -> {path}")
+
+        if cold and not args.dry_run:
+            await conn.execute("VACUUM ANALYZE public.review_daily_summaries")
+    finally:
+        await conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=12,
+                        help=f"Months of raw reviews to keep (minimum {MIN_KEEP_MONTHS})")
+    parser.add_argument("--archive-dir", default="reviews_archive", help="Where exported partitions go")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future partitions to create")
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would happen")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
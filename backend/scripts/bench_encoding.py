@@ -0,0 +1,176 @@
+"""Serialization benchmark for the largest API responses.
+
+Compares FastAPI's default JSON encoding with the negotiated encoders in
+``app.encoding`` (orjson JSON, MessagePack) on representative payloads:
+the items list (500 rows with nested scheduling states), the review
+history (500 rows) and a 365-day heatmap. Reports median encode time and
+bytes on the wire, raw and gzipped. "prepare" is FastAPI's
+``jsonable_encoder`` pass, which these routes now skip by returning a
+``NegotiatedResponse`` directly.
+
+Usage:
+  python scripts/bench_encoding.py
+  python scripts/bench_encoding.py --rows 500 --repeat 200 --output bench.json
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app import encoding  # noqa: E402
+
+TOPICS = ["Array", "Hash Table", "Two Pointers", "Sliding Window", "Stack", "Binary Search", "Tree", "Graph"]
+
+
+def _ts(now: datetime, days: int) -> str:
+    return (now - timedelta(days=days, seconds=random.randint(0, 86400))).isoformat()
+
+
+def items_payload(rows: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    user_id = str(uuid.uuid4())
+    collection_id = str(uuid.uuid4())
+    payload = []
+    for i in range(rows):
+        item_id = str(uuid.uuid4())
+        payload.append({
+            "id": item_id,
+            "user_id": user_id,
+            "collection_id": collection_id,
+            "title": f"Problem {i}",
+            "external_id": str(i),
+            "external_url": f"https://leetcode.com/problems/problem-{i}/",
+            "metadata": {
+                "difficulty": random.choice(["Easy", "Medium", "Hard"]),
+                "topics": random.sample(TOPICS, 2),
+                "pattern": "Two Pointers",
+            },
+            "notes": "Remember the invariant." if i % 3 == 0 else None,
+            "created_at": _ts(now, 90),
+            "updated_at": _ts(now, 30),
+            "archived_at": None,
+            "scheduling_states": [{
+                "id": str(uuid.uuid4()),
+                "item_id": item_id,
+                "user_id": user_id,
+                "ease_factor": 2.5,
+                "interval_days": random.randint(0, 60),
+                "repetitions": random.randint(0, 8),
+                "status": "review",
+                "next_review_at": _ts(now, -7),
+                "last_review_at": _ts(now, 7),
+                "last_rating": random.randint(1, 4),
+                "created_at": _ts(now, 90),
+                "updated_at": _ts(now, 7),
+            }],
+            "recent_review": None,
+        })
+    return payload
+
+
+def history_payload(rows: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    user_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "item_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "rating": random.randint(1, 4),
+            "reviewed_at": _ts(now, i // 10),
+            "ease_factor_before": 2.5,
+            "interval_before": 6,
+            "ease_factor_after": 2.6,
+            "interval_after": 15,
+            "items": {"title": f"Problem {i}", "metadata": {"difficulty": "Medium", "topics": random.sample(TOPICS, 2)}},
+        }
+        for i in range(rows)
+    ]
+
+
+def heatmap_payload(days: int = 365) -> List[Dict[str, Any]]:
+    today = datetime.now(timezone.utc).date()
+    return [
+        {"date": (today - timedelta(days=d)).isoformat(), "count": random.randint(0, 40)}
+        for d in range(days)
+    ]
+
+
+def default_fastapi(content: Any) -> bytes:
+    # FastAPI's default response class (stdlib json)
+    return JSONResponse(content).body
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def measure(encoder: Callable[[Any], bytes], content: Any, repeat: int) -> Dict[str, float]:
+    body = encoder(content)
+    return {
+        "median_ms": _median_ms(lambda: encoder(content), repeat),
+        "bytes": len(body),
+        # GZipMiddleware compresses at level 9
+        "gzip_bytes": len(gzip.compress(body, compresslevel=9)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="Rows in the items and history payloads")
+    parser.add_argument("--repeat", type=int, default=100, help="Encodes per measurement")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    payloads = {
+        "GET /api/items": items_payload(args.rows),
+        "GET /api/reviews/history": history_payload(args.rows),
+        "GET /api/analytics/heatmap": heatmap_payload(),
+    }
+    encoders = {"fastapi-json": default_fastapi, "json": encoding.encode_json}
+    if encoding.msgpack is not None:
+        encoders["msgpack"] = encoding.encode_msgpack
+
+    print(f"JSON encoder: {'orjson' if encoding.orjson is not None else 'stdlib'}"
+          f"{'' if encoding.msgpack is not None else '; msgpack not installed, skipped'}\n")
+    header = f"{'endpoint':<28} {'encoding':<14} {'encode ms':>10} {'bytes':>9} {'gzip bytes':>11}"
+    print(header)
+    print("-" * len(header))
+
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for endpoint, payload in payloads.items():
+        prepare_ms = _median_ms(lambda: jsonable_encoder(payload), args.repeat)
+        content = jsonable_encoder(payload)
+        report[endpoint] = {"prepare": {"median_ms": prepare_ms}}
+        print(f"{endpoint:<28} {'prepare':<14} {prepare_ms:>10}")
+        for name, encoder in encoders.items():
+            result = report[endpoint][name] = measure(encoder, content, args.repeat)
+            print(f"{endpoint:<28} {name:<14} {result['median_ms']:>10} {result['bytes']:>9} {result['gzip_bytes']:>11}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nSaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,21 +40,24 @@ echo ""
 # Step 3: Instructions for RLS setup
 echo "⚙️  Step 3/3: Supabase-specific setup"
 echo ""
-echo "Please complete the following manual step:"
+echo "Please complete the following manual steps:"
 echo "1. Go to your Supabase dashboard"
 echo "2. Open SQL Editor"
 echo "3. Copy and run the contents of 'supabase_setup.sql'"
+echo "4. Then copy and run the contents of 'partition_reviews.sql'"
 echo ""
 echo "This sets up:"
 echo "  - Row Level Security (RLS) policies"
 echo "  - Auto-profile creation trigger"
 echo "  - Validation constraints"
+echo "  - Monthly review partitions and the review_activity view (required"
+echo "    by analytics and review ingestion)"
 echo ""
 echo "======================================"
 echo "🎉 Database setup complete!"
 echo "======================================"
 echo ""
 echo "Next steps:"
-echo "1. Run the SQL from supabase_setup.sql in Supabase dashboard"
+echo "1. Run supabase_setup.sql, then partition_reviews.sql, in Supabase dashboard"
 echo "2. Start the backend: uvicorn app.main:app --reload"
 echo ""
@@ -56,6 +56,8 @@ ALTER TABLE public.tags ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.item_tags ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.scheduling_states ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.reviews ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.deleted_records ENABLE ROW LEVEL SECURITY;
 
 -- =====================================================
 -- RLS POLICIES
@@ -98,6 +100,17 @@ DROP POLICY IF EXISTS "Users can manage own reviews" ON public.reviews;
 CREATE POLICY "Users can manage own reviews" ON public.reviews
     FOR ALL USING (auth.uid() = user_id);
 
+-- Jobs: Users can only see and update their own background jobs
+DROP POLICY IF EXISTS "Users can manage own jobs" ON public.jobs;
+CREATE POLICY "Users can manage own jobs" ON public.jobs
+    FOR ALL USING (auth.uid() = user_id);
+
+-- Deleted records: Users can read their own tombstones; the delete
+-- triggers write them
+DROP POLICY IF EXISTS "Users can view own deleted records" ON public.deleted_records;
+CREATE POLICY "Users can view own deleted records" ON public.deleted_records
+    FOR SELECT USING (auth.uid() = user_id);
+
 -- =====================================================
 -- CONSTRAINTS (add any missing constraints)
 -- =====================================================
@@ -128,6 +141,527 @@ BEGIN
     END IF;
 END $$;
 
+-- Ensure job status only accepts valid values
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'jobs_status_check'
+    ) THEN
+        ALTER TABLE public.jobs
+        ADD CONSTRAINT jobs_status_check
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed'));
+    END IF;
+END $$;
+
+-- =====================================================
+-- SEARCH (full-text + trigram)
+-- =====================================================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Weighted document used by both the index and the search function
+CREATE OR REPLACE FUNCTION public.items_search_vector(p_title TEXT, p_notes TEXT)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(p_notes, '')), 'B');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE INDEX IF NOT EXISTS idx_items_search ON public.items
+    USING GIN (public.items_search_vector(title, notes));
+CREATE INDEX IF NOT EXISTS idx_items_title_trgm ON public.items USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_items_notes_trgm ON public.items USING GIN (notes gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_items_external_id_trgm ON public.items USING GIN (external_id gin_trgm_ops);
+
+-- Ranked, paginated search over the caller's items (RLS applies)
+CREATE OR REPLACE FUNCTION public.search_items(
+    p_query TEXT,
+    p_collection_id UUID DEFAULT NULL,
+    p_include_archived BOOLEAN DEFAULT FALSE,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    collection_id UUID,
+    title TEXT,
+    external_id TEXT,
+    external_url TEXT,
+    metadata JSONB,
+    notes TEXT,
+    archived_at TIMESTAMPTZ,
+    rank REAL,
+    total_count BIGINT
+) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS tsq,
+               '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%' AS pattern
+    )
+    SELECT i.id, i.collection_id, i.title, i.external_id, i.external_url,
+           i.metadata, i.notes, i.archived_at,
+           (ts_rank(public.items_search_vector(i.title, i.notes), q.tsq) +
+            greatest(similarity(i.title, p_query), similarity(coalesce(i.external_id, ''), p_query)))::REAL AS rank,
+           count(*) OVER () AS total_count
+    FROM public.items i, q
+    WHERE i.user_id = auth.uid()
+      AND (p_collection_id IS NULL OR i.collection_id = p_collection_id)
+      AND (p_include_archived OR i.archived_at IS NULL)
+      AND (
+          public.items_search_vector(i.title, i.notes) @@ q.tsq
+          OR i.title % p_query
+          OR i.title ILIKE q.pattern
+          OR i.notes ILIKE q.pattern
+          OR i.external_id ILIKE q.pattern
+      )
+    ORDER BY rank DESC, i.title
+    LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- METADATA FACETS
+-- =====================================================
+
+-- Whether item metadata passes a filter from the list endpoints: every key
+-- is a containment match except "topics", where any listed topic will do.
+CREATE OR REPLACE FUNCTION public.metadata_matches(p_metadata JSONB, p_filter JSONB)
+RETURNS BOOLEAN AS $$
+    SELECT p_metadata @> (p_filter - 'topics')
+       AND (NOT p_filter ? 'topics'
+            OR p_metadata->'topics' ?| ARRAY(SELECT jsonb_array_elements_text(p_filter->'topics')));
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Per-difficulty, topic and pattern counts over the caller's filtered items.
+-- p_metadata is the same filter the list endpoints apply (see metadata_matches).
+DROP FUNCTION IF EXISTS public.item_facets(UUID, JSONB, BOOLEAN, BOOLEAN);
+CREATE OR REPLACE FUNCTION public.item_facets(
+    p_collection_id UUID DEFAULT NULL,
+    p_metadata JSONB DEFAULT '{}',
+    p_tag_id UUID DEFAULT NULL,
+    p_include_archived BOOLEAN DEFAULT FALSE,
+    p_due_only BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (facet TEXT, value TEXT, count BIGINT) AS $$
+    WITH filtered AS (
+        SELECT i.metadata
+        FROM public.items i
+        WHERE i.user_id = auth.uid()
+          AND (p_collection_id IS NULL OR i.collection_id = p_collection_id)
+          AND (p_include_archived OR i.archived_at IS NULL)
+          AND public.metadata_matches(i.metadata, p_metadata)
+          AND (p_tag_id IS NULL OR EXISTS (
+              SELECT 1 FROM public.item_tags it
+              WHERE it.tag_id = p_tag_id AND it.item_id = i.id
+          ))
+          AND (NOT p_due_only OR EXISTS (
+              SELECT 1 FROM public.scheduling_states ss
+              WHERE ss.item_id = i.id
+                AND ss.user_id = i.user_id
+                AND ss.next_review_at <= NOW()
+          ))
+    )
+    SELECT 'difficulty', metadata->>'difficulty', count(*)
+    FROM filtered
+    WHERE metadata ? 'difficulty'
+    GROUP BY 2
+    UNION ALL
+    SELECT 'topics', t.topic, count(*)
+    FROM filtered,
+         jsonb_array_elements_text(
+             CASE WHEN jsonb_typeof(metadata->'topics') = 'array'
+                  THEN metadata->'topics' ELSE '[]'::jsonb END
+         ) AS t(topic)
+    GROUP BY 2
+    UNION ALL
+    SELECT 'pattern', metadata->>'pattern', count(*)
+    FROM filtered
+    WHERE metadata ? 'pattern'
+    GROUP BY 2;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- COLLECTION STATS
+-- =====================================================
+
+-- Item, due and status counts plus recent retention for every collection
+-- of the caller, in one grouped pass
+CREATE OR REPLACE FUNCTION public.collection_stats(p_retention_days INTEGER DEFAULT 30)
+RETURNS TABLE (
+    collection_id UUID,
+    item_count BIGINT,
+    due_count BIGINT,
+    new_count BIGINT,
+    learning_count BIGINT,
+    review_count BIGINT,
+    retention_rate NUMERIC
+) AS $$
+    WITH recent AS (
+        SELECT r.item_id,
+               count(*) AS total,
+               count(*) FILTER (WHERE r.rating >= 3) AS successful
+        FROM public.reviews r
+        WHERE r.user_id = auth.uid()
+          AND r.reviewed_at >= NOW() - make_interval(days => p_retention_days)
+        GROUP BY r.item_id
+    )
+    SELECT i.collection_id,
+           count(*) AS item_count,
+           count(*) FILTER (WHERE ss.next_review_at <= NOW()) AS due_count,
+           count(*) FILTER (WHERE ss.status = 'new') AS new_count,
+           count(*) FILTER (WHERE ss.status = 'learning') AS learning_count,
+           count(*) FILTER (WHERE ss.status = 'review') AS review_count,
+           round(100.0 * sum(recent.successful) / nullif(sum(recent.total), 0), 1) AS retention_rate
+    FROM public.items i
+    LEFT JOIN public.scheduling_states ss ON ss.item_id = i.id AND ss.user_id = i.user_id
+    LEFT JOIN recent ON recent.item_id = i.id
+    WHERE i.user_id = auth.uid()
+      AND i.archived_at IS NULL
+    GROUP BY i.collection_id;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- URGENCY-ORDERED DUE QUEUE
+-- =====================================================
+
+-- The caller's p_limit most urgent due items. Urgency is how far overdue
+-- an item is relative to its interval, as in spread_backlog. It depends on
+-- NOW(), so no index can hold it; but within one interval it follows
+-- next_review_at. So: skip-scan the distinct interval_days on
+-- idx_scheduling_interval_due, take each interval's p_limit earliest due
+-- items from the same index, and rank only those candidates.
+-- p_metadata and p_tag_id filter like item_facets.
+CREATE OR REPLACE FUNCTION public.urgent_due_items(
+    p_limit INTEGER,
+    p_collection_id UUID DEFAULT NULL,
+    p_metadata JSONB DEFAULT '{}',
+    p_tag_id UUID DEFAULT NULL
+)
+RETURNS TABLE (item_id UUID, urgency DOUBLE PRECISION) AS $$
+    WITH RECURSIVE intervals AS (
+        (
+            SELECT ss.interval_days
+            FROM public.scheduling_states ss
+            WHERE ss.user_id = auth.uid()
+            ORDER BY ss.interval_days
+            LIMIT 1
+        )
+        UNION ALL
+        SELECT next.interval_days
+        FROM intervals iv
+        CROSS JOIN LATERAL (
+            SELECT ss.interval_days
+            FROM public.scheduling_states ss
+            WHERE ss.user_id = auth.uid()
+              AND ss.interval_days > iv.interval_days
+            ORDER BY ss.interval_days
+            LIMIT 1
+        ) next
+    )
+    SELECT c.item_id,
+           extract(epoch FROM NOW() - c.next_review_at) / (86400.0 * greatest(iv.interval_days, 1)) AS urgency
+    FROM intervals iv
+    CROSS JOIN LATERAL (
+        SELECT ss.item_id, ss.next_review_at
+        FROM public.scheduling_states ss
+        JOIN public.items i ON i.id = ss.item_id
+        WHERE ss.user_id = auth.uid()
+          AND ss.interval_days = iv.interval_days
+          AND ss.next_review_at <= NOW()
+          AND i.archived_at IS NULL
+          AND (p_collection_id IS NULL OR i.collection_id = p_collection_id)
+          AND public.metadata_matches(i.metadata, p_metadata)
+          AND (p_tag_id IS NULL OR EXISTS (
+              SELECT 1 FROM public.item_tags it
+              WHERE it.tag_id = p_tag_id AND it.item_id = i.id
+          ))
+        ORDER BY ss.next_review_at
+        LIMIT p_limit
+    ) c
+    ORDER BY urgency DESC, c.next_review_at
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- FORGETTING CURVE
+-- =====================================================
+
+-- Review and success (rating >= 3) counts of the caller's last p_days of
+-- reviews, bucketed three ways in one pass (GROUPING SETS): by the
+-- interval before the review, by the ease factor before it and by the
+-- card's age (days since its first raw review). Buckets are width_bucket
+-- numbers over the given edges; 0 is below the first edge.
+CREATE OR REPLACE FUNCTION public.forgetting_curve(
+    p_interval_edges INTEGER[],
+    p_ease_low NUMERIC,
+    p_ease_high NUMERIC,
+    p_ease_buckets INTEGER,
+    p_age_edges INTEGER[],
+    p_days INTEGER DEFAULT 365
+)
+RETURNS TABLE (dimension TEXT, bucket INTEGER, review_count BIGINT, successful_count BIGINT) AS $$
+    WITH recent AS (
+        -- The window first, off idx_reviews_user_date
+        SELECT r.item_id, r.reviewed_at, r.rating, r.interval_before, r.ease_factor_before
+        FROM public.reviews r
+        WHERE r.user_id = auth.uid()
+          AND r.reviewed_at >= NOW() - make_interval(days => p_days)
+          AND r.interval_before IS NOT NULL
+          AND r.ease_factor_before IS NOT NULL
+    ),
+    first_review AS (
+        -- Card age: one lookup per item in the window on idx_reviews_item_date
+        SELECT i.item_id, f.reviewed_at AS first_at
+        FROM (SELECT DISTINCT item_id FROM recent) i
+        CROSS JOIN LATERAL (
+            SELECT r.reviewed_at
+            FROM public.reviews r
+            WHERE r.item_id = i.item_id
+              AND r.user_id = auth.uid()
+            ORDER BY r.reviewed_at
+            LIMIT 1
+        ) f
+    ),
+    log AS (
+        SELECT r.rating >= 3 AS success,
+               width_bucket(r.interval_before, p_interval_edges) AS interval_bucket,
+               width_bucket(r.ease_factor_before, p_ease_low, p_ease_high, p_ease_buckets) AS ease_bucket,
+               width_bucket(r.reviewed_at::DATE - fr.first_at::DATE, p_age_edges) AS age_bucket
+        FROM recent r
+        JOIN first_review fr ON fr.item_id = r.item_id
+    )
+    SELECT CASE
+               WHEN GROUPING(interval_bucket) = 0 THEN 'interval'
+               WHEN GROUPING(ease_bucket) = 0 THEN 'ease'
+               ELSE 'age'
+           END,
+           coalesce(interval_bucket, ease_bucket, age_bucket),
+           count(*),
+           count(*) FILTER (WHERE success)
+    FROM log
+    GROUP BY GROUPING SETS ((interval_bucket), (ease_bucket), (age_bucket))
+    ORDER BY 1, 2;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- BULK RESCHEDULE
+-- =====================================================
+
+-- Move every due date of the caller's active items by p_days (vacation
+-- mode), as one UPDATE. With p_dry_run nothing changes; either way the
+-- result is the number of items and their new first and last due dates.
+CREATE OR REPLACE FUNCTION public.shift_due_dates(
+    p_days INTEGER,
+    p_collection_id UUID DEFAULT NULL,
+    p_dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (affected BIGINT, first_due TIMESTAMPTZ, last_due TIMESTAMPTZ) AS $$
+    WITH target AS (
+        SELECT ss.id, ss.next_review_at + make_interval(days => p_days) AS new_due
+        FROM public.scheduling_states ss
+        JOIN public.items i ON i.id = ss.item_id
+        WHERE ss.user_id = auth.uid()
+          AND i.archived_at IS NULL
+          AND (p_collection_id IS NULL OR i.collection_id = p_collection_id)
+    ),
+    shifted AS (
+        -- Runs to completion even though nothing reads it
+        UPDATE public.scheduling_states ss
+        SET next_review_at = t.new_due
+        FROM target t
+        WHERE ss.id = t.id
+          AND NOT p_dry_run
+        RETURNING ss.id
+    )
+    SELECT count(*), min(new_due), max(new_due)
+    FROM target;
+$$ LANGUAGE sql VOLATILE;
+
+-- Spread the caller's overdue items over the next p_days days, most urgent
+-- first, at most p_daily_cap per day (default: an even split). Urgency is
+-- how far overdue an item is relative to its interval. Day 0 stays due
+-- now; a cap too small for the backlog spills past p_days. Returns the
+-- planned count per day (day_offset 0 is left as is), applied in one
+-- UPDATE unless p_dry_run.
+DROP FUNCTION IF EXISTS public.spread_backlog(INTEGER, INTEGER, UUID, BOOLEAN);
+CREATE OR REPLACE FUNCTION public.spread_backlog(
+    p_days INTEGER,
+    p_daily_cap INTEGER DEFAULT NULL,
+    p_collection_id UUID DEFAULT NULL,
+    p_dry_run BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (day DATE, day_offset INTEGER, count BIGINT) AS $$
+    WITH backlog AS (
+        SELECT ss.id,
+               row_number() OVER (
+                   ORDER BY extract(epoch FROM NOW() - ss.next_review_at)
+                            / (86400.0 * greatest(ss.interval_days, 1)) DESC,
+                            ss.next_review_at
+               ) - 1 AS position,
+               count(*) OVER () AS total
+        FROM public.scheduling_states ss
+        JOIN public.items i ON i.id = ss.item_id
+        WHERE ss.user_id = auth.uid()
+          AND ss.next_review_at <= NOW()
+          AND i.archived_at IS NULL
+          AND (p_collection_id IS NULL OR i.collection_id = p_collection_id)
+    ),
+    planned AS (
+        SELECT id,
+               (position / coalesce(p_daily_cap, ceil(total::NUMERIC / p_days)::BIGINT))::INTEGER AS day_offset
+        FROM backlog
+    ),
+    moved AS (
+        UPDATE public.scheduling_states ss
+        SET next_review_at = NOW() + make_interval(days => p.day_offset)
+        FROM planned p
+        WHERE ss.id = p.id
+          AND p.day_offset > 0
+          AND NOT p_dry_run
+        RETURNING ss.id
+    )
+    SELECT CURRENT_DATE + p.day_offset, p.day_offset, count(*)
+    FROM planned p
+    GROUP BY 1, 2
+    ORDER BY 1;
+$$ LANGUAGE sql VOLATILE;
+
+-- =====================================================
+-- DELTA SYNC
+-- =====================================================
+
+-- Drop tombstones older than p_keep_days. GET /api/sync answers clients
+-- further behind than its retention (30 days) with a full snapshot, so
+-- keep at least that. Schedule it, e.g. with pg_cron:
+--   SELECT cron.schedule('prune-deleted-records', '0 4 * * *',
+--                        'SELECT public.prune_deleted_records()');
+CREATE OR REPLACE FUNCTION public.prune_deleted_records(p_keep_days INTEGER DEFAULT 30)
+RETURNS BIGINT AS $$
+    WITH pruned AS (
+        DELETE FROM public.deleted_records
+        WHERE deleted_at < NOW() - make_interval(days => greatest(p_keep_days, 30))
+        RETURNING 1
+    )
+    SELECT count(*) FROM pruned;
+$$ LANGUAGE sql;
+
+REVOKE EXECUTE ON FUNCTION public.prune_deleted_records(INTEGER) FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- COLLECTION CLONE AND MERGE
+-- =====================================================
+
+-- Copy the caller's active items of p_source_id into p_target_id, with
+-- their scheduling states (or fresh ones without p_include_progress), as
+-- one INSERT ... SELECT per table. Items already in the target, by
+-- external_id or, lacking one, by title, are skipped, so re-running a
+-- merge copies only what is new. Returns no row unless the caller owns
+-- both collections.
+CREATE OR REPLACE FUNCTION public.merge_collection_items(
+    p_source_id UUID,
+    p_target_id UUID,
+    p_include_progress BOOLEAN DEFAULT TRUE
+)
+RETURNS TABLE (copied BIGINT, skipped BIGINT) AS $$
+    WITH owned AS (
+        SELECT count(*) = 2 AS ok
+        FROM public.collections
+        WHERE id IN (p_source_id, p_target_id)
+          AND user_id = auth.uid()
+          AND p_source_id <> p_target_id
+    ),
+    source AS (
+        -- New IDs up front, to pair each copy with its original's state
+        SELECT uuid_generate_v4() AS new_id, i.*
+        FROM public.items i, owned
+        WHERE owned.ok
+          AND i.user_id = auth.uid()
+          AND i.collection_id = p_source_id
+          AND i.archived_at IS NULL
+    ),
+    fresh AS (
+        SELECT s.*
+        FROM source s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM public.items t
+            WHERE t.user_id = auth.uid()
+              AND t.collection_id = p_target_id
+              AND (t.external_id = s.external_id
+                   OR (s.external_id IS NULL AND t.external_id IS NULL AND t.title = s.title))
+        )
+    ),
+    inserted AS (
+        INSERT INTO public.items (id, user_id, collection_id, title, external_id, external_url, metadata, notes)
+        SELECT new_id, auth.uid(), p_target_id, title, external_id, external_url, metadata, notes
+        FROM fresh
+        ON CONFLICT (user_id, collection_id, external_id) DO NOTHING
+        RETURNING id
+    ),
+    states AS (
+        -- Runs to completion even though nothing reads it
+        INSERT INTO public.scheduling_states (
+            item_id, user_id, ease_factor, interval_days, repetitions, status,
+            next_review_at, last_review_at, last_rating, stability, difficulty
+        )
+        SELECT f.new_id, auth.uid(),
+               coalesce(ss.ease_factor, 2.5), coalesce(ss.interval_days, 0),
+               coalesce(ss.repetitions, 0), coalesce(ss.status, 'new'),
+               coalesce(ss.next_review_at, NOW()), ss.last_review_at, ss.last_rating,
+               ss.stability, ss.difficulty
+        FROM inserted n
+        JOIN fresh f ON f.new_id = n.id
+        LEFT JOIN public.scheduling_states ss
+            ON p_include_progress AND ss.item_id = f.id AND ss.user_id = auth.uid()
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM inserted),
+           (SELECT count(*) FROM source) - (SELECT count(*) FROM inserted)
+    FROM owned
+    WHERE owned.ok;
+$$ LANGUAGE sql VOLATILE;
+
+-- Create collection p_name with p_source_id's type and config, and copy
+-- its items into it (see merge_collection_items). Returns no row unless
+-- the caller owns the source; a taken name raises unique_violation.
+CREATE OR REPLACE FUNCTION public.clone_collection(
+    p_source_id UUID,
+    p_name TEXT,
+    p_description TEXT DEFAULT NULL,
+    p_include_progress BOOLEAN DEFAULT TRUE
+)
+RETURNS TABLE (collection_id UUID, copied BIGINT, skipped BIGINT) AS $$
+DECLARE
+    v_id UUID;
+BEGIN
+    INSERT INTO public.collections (user_id, name, description, item_type, config)
+    SELECT auth.uid(), p_name, coalesce(p_description, c.description), c.item_type, c.config
+    FROM public.collections c
+    WHERE c.id = p_source_id AND c.user_id = auth.uid()
+    RETURNING id INTO v_id;
+
+    IF v_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT v_id, m.copied, m.skipped
+    FROM public.merge_collection_items(p_source_id, v_id, p_include_progress) m;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- =====================================================
+-- BACKFILLS (idempotent)
+-- =====================================================
+
+-- Denormalize the most recent rating onto scheduling_states
+UPDATE public.scheduling_states ss
+SET last_rating = latest.rating
+FROM (
+    SELECT DISTINCT ON (item_id, user_id) item_id, user_id, rating
+    FROM public.reviews
+    ORDER BY item_id, user_id, reviewed_at DESC
+) latest
+WHERE ss.item_id = latest.item_id
+  AND ss.user_id = latest.user_id
+  AND ss.last_rating IS NULL;
+
 -- =====================================================
 -- DONE
 -- =====================================================
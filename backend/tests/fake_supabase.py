@@ -0,0 +1,591 @@
+"""In-memory stand-in for the Supabase client.
+
+Implements the subset of the fluent PostgREST API the app uses
+(``.table().select().eq()...execute()``, inserts, updates, upserts,
+deletes, embedded resources and ``.rpc()``) over plain Python lists, and
+records every round trip so tests can assert query budgets.
+"""
+import json
+import re
+import uuid
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+# (parent table, embedded name) -> (parent column, child table, child column, many)
+RELATIONS: Dict[Tuple[str, str], Tuple[str, str, str, bool]] = {
+    ("items", "scheduling_states"): ("id", "scheduling_states", "item_id", True),
+    ("items", "reviews"): ("id", "reviews", "item_id", True),
+    ("items", "item_tags"): ("id", "item_tags", "item_id", True),
+    ("items", "collections"): ("collection_id", "collections", "id", False),
+    ("collections", "items"): ("id", "items", "collection_id", True),
+    ("scheduling_states", "items"): ("item_id", "items", "id", False),
+    ("reviews", "items"): ("item_id", "items", "id", False),
+    ("tags", "item_tags"): ("id", "item_tags", "tag_id", True),
+    ("item_tags", "items"): ("item_id", "items", "id", False),
+    ("item_tags", "tags"): ("tag_id", "tags", "id", False),
+    ("scheduling_states", "profiles"): ("user_id", "profiles", "id", False),
+    ("profiles", "collections"): ("id", "collections", "user_id", True),
+}
+
+# Column defaults applied on insert, mirroring schema_setup.sql
+TABLE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "profiles": {
+        "email": None, "display_name": None, "avatar_url": None, "timezone": "UTC",
+        "daily_review_limit": 100, "new_items_per_day": 20, "default_ease_factor": 2.5,
+        "fsrs_parameters": None,
+    },
+    "collections": {"description": None, "item_type": "leetcode", "is_default": False, "config": {}},
+    "items": {"external_id": None, "external_url": None, "metadata": {}, "notes": None, "archived_at": None},
+    "tags": {"collection_id": None, "color": "#6B7280"},
+    "item_tags": {},
+    "scheduling_states": {
+        "ease_factor": 2.5, "interval_days": 0, "repetitions": 0, "status": "new",
+        "last_review_at": None, "last_rating": None, "stability": None, "difficulty": None,
+    },
+    "reviews": {
+        "ease_factor_before": None, "interval_before": None,
+        "ease_factor_after": None, "interval_after": None,
+    },
+    "jobs": {
+        "status": "queued", "params": {}, "progress": 0, "total": None, "result": None,
+        "error": None, "started_at": None, "finished_at": None,
+    },
+}
+
+# Tables whose hard deletes are logged to deleted_records
+LOGGED_DELETES = {"collections", "items", "scheduling_states"}
+
+# Tables without a surrogate id or timestamps
+NO_ID_TABLES = {"item_tags", "review_daily_summaries"}
+TIMESTAMP_COLUMNS = {
+    "reviews": ("reviewed_at",),
+    "tags": ("created_at",),
+    "scheduling_states": ("created_at", "updated_at", "next_review_at"),
+    "deleted_records": ("deleted_at",),
+}
+
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T")
+
+
+@dataclass
+class RecordedQuery:
+    """One round trip issued by the app."""
+
+    table: str
+    method: str
+    select: Optional[str] = None
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)
+    rows: int = 0
+
+
+@dataclass
+class FakeResponse:
+    data: Any
+    count: Optional[int] = None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _coerce(value: Any) -> Any:
+    if isinstance(value, str) and _TIMESTAMP_RE.match(value):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _compare(left: Any, right: Any) -> Tuple[Any, Any]:
+    left, right = _coerce(left), _coerce(right)
+    if isinstance(left, (int, float)) and isinstance(right, str):
+        right = float(right)
+    return left, right
+
+
+def _contains(container: Any, contained: Any) -> bool:
+    """JSONB @> semantics."""
+    if isinstance(contained, dict):
+        return isinstance(container, dict) and all(
+            key in container and _contains(container[key], value)
+            for key, value in contained.items()
+        )
+    if isinstance(contained, list):
+        return isinstance(container, list) and all(
+            any(_contains(element, value) for element in container)
+            for value in contained
+        )
+    return container == contained
+
+
+def _match(row_value: Any, operator: str, value: Any) -> bool:
+    if operator == "is":
+        return row_value is None if value in (None, "null") else row_value == value
+    if operator == "in":
+        return str(row_value) in {str(v) for v in value}
+    if operator == "cs":
+        return _contains(row_value, value)
+    if row_value is None:
+        return False
+
+    left, right = _compare(row_value, value)
+    if operator == "eq":
+        return str(left) == str(right) if not isinstance(left, datetime) else left == right
+    if operator == "neq":
+        return str(left) != str(right) if not isinstance(left, datetime) else left != right
+    if operator == "gt":
+        return left > right
+    if operator == "gte":
+        return left >= right
+    if operator == "lt":
+        return left < right
+    if operator == "lte":
+        return left <= right
+    raise NotImplementedError(operator)
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in text:
+        if char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _parse_logic(combine: str, text: str) -> Tuple[str, list]:
+    """PostgREST ``or=(...)`` / ``and(...)`` filters as (combine, terms)."""
+    terms: list = []
+    for part in _split_top_level(text):
+        nested = re.match(r"^(and|or)\((.*)\)$", part)
+        if nested:
+            terms.append(_parse_logic(nested.group(1), nested.group(2)))
+            continue
+        column, operator, value = part.split(".", 2)
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        elif operator == "cs" and value.startswith("{"):
+            value = json.loads(value)
+        terms.append((column, operator, value))
+    return combine, terms
+
+
+@dataclass
+class SelectNode:
+    columns: List[str]
+    embeds: Dict[str, "EmbedNode"]
+
+
+@dataclass
+class EmbedNode:
+    name: str
+    inner: bool
+    select: SelectNode
+
+
+def parse_select(select: str) -> SelectNode:
+    columns: List[str] = []
+    embeds: Dict[str, EmbedNode] = {}
+    for part in _split_top_level(select):
+        if "(" in part:
+            head, body = part.split("(", 1)
+            name, _, hint = head.partition("!")
+            embeds[name] = EmbedNode(name=name, inner=hint == "inner", select=parse_select(body[:-1]))
+        else:
+            columns.append(part)
+    return SelectNode(columns=columns, embeds=embeds)
+
+
+class FakeQuery:
+    """Fluent query builder over one in-memory table."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.method = "select"
+        self.select_text = "*"
+        self.count_mode: Optional[str] = None
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.limit_count: Optional[int] = None
+        self.offset_count = 0
+        self.single_mode: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+
+    # Verbs
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        self.select_text = columns
+        self.count_mode = count
+        return self
+
+    def insert(self, data: Any, **kwargs) -> "FakeQuery":
+        self.method = "insert"
+        self.payload = data
+        return self
+
+    def upsert(self, data: Any, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs) -> "FakeQuery":
+        self.method = "upsert"
+        self.payload = data
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any], **kwargs) -> "FakeQuery":
+        self.method = "update"
+        self.payload = data
+        return self
+
+    def delete(self, **kwargs) -> "FakeQuery":
+        self.method = "delete"
+        return self
+
+    # Filters
+    def _filter(self, column: str, operator: str, value: Any) -> "FakeQuery":
+        self.filters.append((column, operator, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def contains(self, column, value):
+        return self._filter(column, "cs", value)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None, **kwargs):
+        # On a referenced table, applied to the embedded rows while shaping
+        column = f"{reference_table}." if reference_table else ""
+        return self._filter(column, "or", _parse_logic("or", filters))
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False, **kwargs) -> "FakeQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs) -> "FakeQuery":
+        self.limit_count = size
+        return self
+
+    def offset(self, size: int) -> "FakeQuery":
+        self.offset_count = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "FakeQuery":
+        self.offset_count = start
+        self.limit_count = end - start + 1
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self) -> "FakeQuery":
+        self.single_mode = "maybe"
+        return self
+
+    # Execution
+    def execute(self) -> FakeResponse:
+        handler = getattr(self, f"_execute_{self.method}")
+        response = handler()
+        rows = response.data if isinstance(response.data, list) else ([response.data] if response.data else [])
+        self.db.queries.append(RecordedQuery(
+            table=self.table,
+            method=self.method,
+            select=self.select_text if self.method == "select" else None,
+            filters=list(self.filters),
+            rows=len(rows),
+        ))
+        return response
+
+    def _execute_select(self) -> FakeResponse:
+        tree = parse_select(self.select_text)
+        rows = [
+            shaped for row in self.db.rows(self.table)
+            if self._row_matches(row)
+            for shaped in [self._shape(self.table, row, tree, "")]
+            if shaped is not None
+        ]
+        count = len(rows) if self.count_mode else None
+
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda r: (r.get(column) is None, _coerce(r.get(column))), reverse=desc)
+        rows = rows[self.offset_count:]
+        if self.limit_count is not None:
+            rows = rows[:self.limit_count]
+
+        return self._finish(rows, count)
+
+    def _execute_insert(self) -> FakeResponse:
+        records = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = [self.db.insert_row(self.table, record) for record in records]
+        return FakeResponse(data=deepcopy(inserted))
+
+    def _execute_upsert(self) -> FakeResponse:
+        records = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = [key.strip() for key in (self.on_conflict or "id").split(",")]
+        written = []
+        for record in records:
+            existing = next((
+                row for row in self.db.rows(self.table)
+                if all(str(row.get(key)) == str(record.get(key)) for key in keys)
+            ), None)
+            if existing is None:
+                written.append(self.db.insert_row(self.table, record))
+            elif not self.ignore_duplicates:
+                existing.update(deepcopy(record))
+                written.append(existing)
+        return FakeResponse(data=deepcopy(written))
+
+    def _execute_update(self) -> FakeResponse:
+        updated = []
+        for row in self.db.rows(self.table):
+            if self._row_matches(row):
+                row.update(deepcopy(self.payload))
+                if "updated_at" in row:
+                    # The update_*_updated_at triggers
+                    row["updated_at"] = _now()
+                updated.append(row)
+        return self._finish(deepcopy(updated), None)
+
+    def _execute_delete(self) -> FakeResponse:
+        table = self.db.rows(self.table)
+        deleted = [row for row in table if self._row_matches(row)]
+        for row in deleted:
+            self.db.delete_row(self.table, row)
+        return FakeResponse(data=deepcopy(deleted))
+
+    def _finish(self, rows: List[Dict[str, Any]], count: Optional[int]) -> FakeResponse:
+        if self.single_mode:
+            if len(rows) != 1:
+                if self.single_mode == "maybe" and not rows:
+                    return FakeResponse(data=None)
+                raise APIError({
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "code": "PGRST116",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                })
+            return FakeResponse(data=rows[0], count=count)
+        return FakeResponse(data=rows, count=count)
+
+    def _row_matches(self, row: Dict[str, Any]) -> bool:
+        for column, operator, value in self.filters:
+            if operator == "or" and not column:
+                if not self._logic_matches(row, value):
+                    return False
+                continue
+            if "." in column:
+                continue  # embedded filter, applied while shaping
+            if not _match(self._column_value(row, column), operator, value):
+                return False
+        return True
+
+    def _logic_matches(self, row: Dict[str, Any], tree: Tuple[str, list]) -> bool:
+        combine, terms = tree
+        results = (
+            self._logic_matches(row, term) if isinstance(term[1], list)
+            else _match(self._column_value(row, term[0]), term[1], term[2])
+            for term in terms
+        )
+        return any(results) if combine == "or" else all(results)
+
+    @staticmethod
+    def _column_value(row: Dict[str, Any], column: str) -> Any:
+        if "->>" in column:
+            base, key = column.split("->>", 1)
+            value = (row.get(base) or {}).get(key)
+            return str(value) if value is not None else None
+        if "->" in column:
+            base, key = column.split("->", 1)
+            return (row.get(base) or {}).get(key)
+        return row.get(column)
+
+    def _shape(self, table: str, row: Dict[str, Any], tree: SelectNode, prefix: str) -> Optional[Dict[str, Any]]:
+        """Project columns and resolve embeds; None drops the row (inner join)."""
+        if "*" in tree.columns:
+            shaped = deepcopy(row)
+        else:
+            shaped = {column: deepcopy(row.get(column)) for column in tree.columns}
+
+        for name, embed in tree.embeds.items():
+            parent_column, child_table, child_column, many = RELATIONS[(table, name)]
+            path = f"{prefix}{name}."
+            children = [
+                child for child in self.db.rows(child_table)
+                if str(child.get(child_column)) == str(row.get(parent_column))
+                and all(
+                    self._logic_matches(child, value) if operator == "or"
+                    else _match(self._column_value(child, column[len(path):]), operator, value)
+                    for column, operator, value in self.filters
+                    if column.startswith(path) and "." not in column[len(path):]
+                )
+            ]
+
+            if embed.select.columns == ["count"]:
+                shaped[name] = [{"count": len(children)}]
+                continue
+
+            shaped_children = [
+                shaped_child for child in children
+                for shaped_child in [self._shape(child_table, child, embed.select, path)]
+                if shaped_child is not None
+            ]
+
+            if embed.inner and not shaped_children:
+                return None
+
+            if many:
+                shaped[name] = shaped_children
+            else:
+                shaped[name] = shaped_children[0] if shaped_children else None
+
+        return shaped
+
+
+def _review_activity(db: "FakeSupabase") -> List[Dict[str, Any]]:
+    """The review_activity view: raw reviews plus compacted daily summaries."""
+    return [
+        {
+            "user_id": review["user_id"],
+            "item_id": review["item_id"],
+            "reviewed_at": review["reviewed_at"],
+            "review_count": 1,
+            "successful_count": int(review["rating"] >= 3),
+        }
+        for review in db.rows("reviews")
+    ] + [
+        {
+            "user_id": summary["user_id"],
+            "item_id": summary["item_id"],
+            "reviewed_at": f"{summary['day']}T00:00:00+00:00",
+            "review_count": summary["review_count"],
+            "successful_count": summary["successful_count"],
+        }
+        for summary in db.rows("review_daily_summaries")
+    ]
+
+
+# Read-only views, computed from the tables on each read
+VIEWS = {"review_activity": _review_activity}
+
+
+class FakeRPC:
+    def __init__(self, db: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self) -> FakeResponse:
+        if self.name not in self.db.rpcs:
+            raise APIError({"message": f"function {self.name} not found", "code": "PGRST202", "details": None, "hint": None})
+        data = self.db.rpcs[self.name](self.db, self.params)
+        self.db.queries.append(RecordedQuery(
+            table=f"rpc:{self.name}",
+            method="rpc",
+            rows=len(data) if isinstance(data, list) else 1,
+        ))
+        return FakeResponse(data=data)
+
+
+class FakeSupabase:
+    """Drop-in for ``supabase.Client`` backed by in-memory tables."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.queries: List[RecordedQuery] = []
+        self.rpcs: Dict[str, Callable[["FakeSupabase", Dict[str, Any]], Any]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRPC:
+        return FakeRPC(self, name, params or {})
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        if table in VIEWS:
+            return VIEWS[table](self)
+        return self.tables.setdefault(table, [])
+
+    def insert_row(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(TABLE_DEFAULTS.get(table, {}))
+        if table not in NO_ID_TABLES:
+            row["id"] = str(uuid.uuid4())
+            row["created_at"] = row["updated_at"] = _now()
+        for column in TIMESTAMP_COLUMNS.get(table, ()):
+            row[column] = _now()
+        row.update(deepcopy(record))
+        self.rows(table).append(row)
+        return row
+
+    def delete_row(self, table: str, row: Dict[str, Any]) -> None:
+        self.rows(table).remove(row)
+        if table in LOGGED_DELETES:
+            # The log_deleted_record trigger
+            self.insert_row("deleted_records", {"user_id": row["user_id"], "table_name": table, "record_id": row["id"]})
+
+    def seed(self, table: str, *records: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Insert rows directly, without recording a round trip."""
+        return [self.insert_row(table, record) for record in records]
+
+    def canned_rpc(self, name: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Answer RPC ``name`` with ``rows``; returns the parameters of each call.
+
+        For router contracts only: the SQL itself is covered by the
+        ``requires_postgres`` tests (see tests/postgres.py).
+        """
+        calls: List[Dict[str, Any]] = []
+
+        def rpc(db: "FakeSupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+            calls.append(params)
+            return deepcopy(rows)
+
+        self.rpcs[name] = rpc
+        return calls
+
+    def reset_queries(self) -> None:
+        self.queries.clear()
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.queries)
+
+    @property
+    def rows_fetched(self) -> int:
+        return sum(query.rows for query in self.queries)
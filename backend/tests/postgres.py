@@ -0,0 +1,122 @@
+"""Run SQL functions against a real Postgres.
+
+Most tests use the in-memory fake client, which cannot run the SQL in
+supabase_setup.sql. Tests marked ``requires_postgres`` do, against the
+database in ``TEST_DATABASE_URL`` (a scratch Supabase database, e.g. from
+``supabase start``: it provides the ``auth`` schema and the
+``authenticated`` role). The schema files are applied once per session;
+each test runs in a transaction that is rolled back.
+"""
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+import pytest
+
+from tests.conftest import USER_ID
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+OTHER_USER_ID = "00000000-0000-0000-0000-000000000002"
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCHEMA_FILES = ("schema_setup.sql", "supabase_setup.sql", "partition_reviews.sql")
+
+requires_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+_schema_applied = False
+
+
+async def _apply_schema(conn) -> None:
+    global _schema_applied
+    if not _schema_applied:
+        for name in SCHEMA_FILES:
+            await conn.execute((BACKEND_DIR / name).read_text())
+        _schema_applied = True
+
+
+def run_in_rollback(scenario: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Run ``scenario(conn)`` in a transaction that is rolled back.
+
+    Both test users have profiles. The connection starts as the database
+    owner (for seeding and checking); ``act_as`` switches to a user.
+    """
+    import asyncpg
+
+    async def main():
+        conn = await asyncpg.connect(TEST_DATABASE_URL)
+        try:
+            await _apply_schema(conn)
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                await conn.execute(
+                    "INSERT INTO public.profiles (id, email) VALUES ($1::uuid, 'a@test.local'), ($2::uuid, 'b@test.local')",
+                    USER_ID, OTHER_USER_ID,
+                )
+                return await scenario(conn)
+            finally:
+                await transaction.rollback()
+        finally:
+            await conn.close()
+
+    return asyncio.run(main())
+
+
+async def act_as(conn, user_id: Optional[str]) -> None:
+    """Continue as ``user_id`` through RLS and auth.uid(), or as the owner again with None."""
+    if user_id is None:
+        await conn.execute("RESET ROLE")
+        return
+    claims = json.dumps({"sub": user_id, "role": "authenticated"})
+    await conn.execute(
+        "SELECT set_config('request.jwt.claims', $1, true), set_config('request.jwt.claim.sub', $2, true)",
+        claims, user_id,
+    )
+    await conn.execute("SET LOCAL ROLE authenticated")
+
+
+async def seed_collection(conn, user_id: str, name: str = "Deck") -> str:
+    return await conn.fetchval(
+        "INSERT INTO public.collections (user_id, name) VALUES ($1::uuid, $2) RETURNING id::text",
+        user_id, name,
+    )
+
+
+async def seed_item(
+    conn,
+    user_id: str,
+    collection_id: str,
+    title: str,
+    external_id: Optional[str] = None,
+    interval_days: int = 6,
+    days_overdue: float = 1,
+    archived: bool = False,
+) -> str:
+    """An item with a review-status scheduling state ``days_overdue`` past due."""
+    item_id = await conn.fetchval(
+        """
+        INSERT INTO public.items (user_id, collection_id, title, external_id, archived_at)
+        VALUES ($1::uuid, $2::uuid, $3, $4, CASE WHEN $5 THEN NOW() END)
+        RETURNING id::text
+        """,
+        user_id, collection_id, title, external_id, archived,
+    )
+    await conn.execute(
+        """
+        INSERT INTO public.scheduling_states (item_id, user_id, interval_days, repetitions, status, next_review_at)
+        VALUES ($1::uuid, $2::uuid, $3, 2, 'review', NOW() - make_interval(secs => $4 * 86400))
+        """,
+        item_id, user_id, interval_days, float(days_overdue),
+    )
+    return item_id
+
+
+async def due_dates(conn, item_ids) -> dict:
+    """item_id -> next_review_at, read as the owner."""
+    rows = await conn.fetch(
+        "SELECT item_id::text, next_review_at FROM public.scheduling_states WHERE item_id = ANY($1::uuid[])",
+        list(item_ids),
+    )
+    return {row["item_id"]: row["next_review_at"] for row in rows}
@@ -0,0 +1,120 @@
+"""Analytics count raw reviews and compacted history alike."""
+import bisect
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.analytics.router import forgetting_curves
+from tests.conftest import USER_ID
+from tests.test_round_trips import seed_deck
+
+
+def _compacted(fake_db, item_id, days_ago, review_count, successful_count):
+    day = (datetime.now(timezone.utc) - timedelta(days=days_ago)).date().isoformat()
+    fake_db.seed("review_daily_summaries", {
+        "user_id": USER_ID,
+        "item_id": item_id,
+        "day": day,
+        "review_count": review_count,
+        "successful_count": successful_count,
+        "last_rating": 3,
+    })
+    return day
+
+
+def test_heatmap_and_retention_include_compacted_days(client, fake_db):
+    _, items = seed_deck(fake_db, items=2, reviews_per_item=1)
+    day = _compacted(fake_db, items[0]["id"], days_ago=200, review_count=5, successful_count=4)
+
+    heatmap = {row["date"]: row["count"] for row in client.get("/api/analytics/heatmap").json()}
+    assert heatmap[day] == 5
+    assert sum(heatmap.values()) == 7
+
+    retention = {row["date"]: row for row in client.get("/api/analytics/retention?days=365").json()}
+    assert retention[day] == {"date": day, "rate": 80.0, "total_reviews": 5}
+
+
+def test_topics_weight_compacted_reviews(client, fake_db):
+    _, items = seed_deck(fake_db, items=1, reviews_per_item=2)
+    _compacted(fake_db, items[0]["id"], days_ago=400, review_count=8, successful_count=2)
+
+    topics = client.get("/api/analytics/topics").json()
+
+    assert topics == [{"topic": "Array", "total_reviews": 10, "success_rate": 40.0}]
+    assert fake_db.round_trips == 2
+
+
+def fake_forgetting_curve(db, params):
+    """In-memory stand-in for the forgetting_curve SQL function."""
+    since = datetime.now(timezone.utc) - timedelta(days=params["p_days"])
+    own = [r for r in db.rows("reviews") if r["user_id"] == db.user_id]
+    reviews = [
+        r for r in own
+        if datetime.fromisoformat(r["reviewed_at"]) >= since and r.get("interval_before") is not None
+        and r.get("ease_factor_before") is not None
+    ]
+    first = {}
+    for review in own:
+        first[review["item_id"]] = min(first.get(review["item_id"], review["reviewed_at"]), review["reviewed_at"])
+    low, high = Decimal(str(params["p_ease_low"])), Decimal(str(params["p_ease_high"]))
+    count = params["p_ease_buckets"]
+
+    def ease_bucket(ease):
+        ease = Decimal(str(ease))  # numeric, as in Postgres
+        if ease < low:
+            return 0
+        return min(int((ease - low) / (high - low) * count) + 1, count + 1)
+
+    totals, successes = Counter(), Counter()
+    for review in reviews:
+        age = (datetime.fromisoformat(review["reviewed_at"]).date()
+               - datetime.fromisoformat(first[review["item_id"]]).date()).days
+        for key in (
+            ("interval", bisect.bisect_right(params["p_interval_edges"], review["interval_before"])),
+            ("ease", ease_bucket(review["ease_factor_before"])),
+            ("age", bisect.bisect_right(params["p_age_edges"], age)),
+        ):
+            totals[key] += 1
+            successes[key] += review["rating"] >= 3
+    return [
+        {"dimension": d, "bucket": b, "review_count": totals[(d, b)], "successful_count": successes[(d, b)]}
+        for d, b in sorted(totals)
+    ]
+
+
+def test_forgetting_curve_buckets_and_caches(client, fake_db):
+    forgetting_curves.clear()
+    fake_db.rpcs["forgetting_curve"] = fake_forgetting_curve
+    _, items = seed_deck(fake_db, items=1, reviews_per_item=0)
+    now = datetime.now(timezone.utc)
+    for days_ago, interval, ease, rating in ((40, 0, 2.5, 3), (30, 3, 2.5, 1), (20, 3, 2.3, 3), (10, 6, 2.4, 4)):
+        fake_db.seed("reviews", {
+            "item_id": items[0]["id"], "user_id": USER_ID, "rating": rating,
+            "interval_before": interval, "ease_factor_before": ease,
+            "reviewed_at": (now - timedelta(days=days_ago)).isoformat(),
+        })
+
+    curve = client.get("/api/analytics/forgetting-curve").json()
+
+    assert curve["total_reviews"] == 4
+    assert curve["interval"] == [
+        {"min": None, "max": 1, "total_reviews": 1, "success_rate": 100.0},
+        {"min": 3, "max": 7, "total_reviews": 3, "success_rate": 66.7},
+    ]
+    assert {(b["min"], b["max"]) for b in curve["ease"]} == {(2.3, 2.5), (2.5, 2.7)}
+    assert [(b["min"], b["max"], b["total_reviews"]) for b in curve["age"]] == [(None, 7, 1), (7, 30, 2), (30, 90, 1)]
+
+    # Unchanged log: only the version check
+    fake_db.reset_queries()
+    assert client.get("/api/analytics/forgetting-curve").json() == curve
+    assert fake_db.round_trips == 1
+
+    fake_db.seed("reviews", {
+        "item_id": items[0]["id"], "user_id": USER_ID, "rating": 1,
+        "interval_before": 6, "ease_factor_before": 2.5, "reviewed_at": now.isoformat(),
+    })
+    assert client.get("/api/analytics/forgetting-curve").json()["total_reviews"] == 5
+
+    # Card age still counts from the first review, before the window
+    recent = client.get("/api/analytics/forgetting-curve", params={"days": 25}).json()
+    assert [(b["min"], b["max"], b["total_reviews"]) for b in recent["age"]] == [(7, 30, 1), (30, 90, 2)]
@@ -0,0 +1,128 @@
+"""Single-flight coalescing of identical concurrent GETs."""
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.coalesce import CoalesceMiddleware
+from app.ratelimit import RateLimiter, check_user_rate
+
+
+def make_app(cache_ms: int = 0):
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/api/analytics/summary")
+    async def summary(days: int = 30):
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        return {"calls": app.state.calls, "days": days}
+
+    @app.post("/api/reviews")
+    async def review():
+        return {"ok": True}
+
+    @app.post("/api/items/bulk")
+    async def bulk():
+        await asyncio.sleep(0.1)
+        return {"ok": True}
+
+    app.add_middleware(CoalesceMiddleware, cache_ms=cache_ms)
+    return app
+
+
+def auth(token):
+    return {"headers": {"Authorization": f"Bearer {token}"}}
+
+
+def test_identical_concurrent_requests_share_one_execution():
+    app = make_app()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.get("/api/analytics/summary?days=30&x=1", **auth("a")),
+                client.get("/api/analytics/summary?x=1&days=30", **auth("a")),
+                client.get("/api/analytics/summary?days=30&x=1", **auth("a")),
+                # Different caller and different parameters run separately
+                client.get("/api/analytics/summary?days=30&x=1", **auth("b")),
+                client.get("/api/analytics/summary?days=7&x=1", **auth("a")),
+            )
+
+    responses = asyncio.run(scenario())
+
+    assert app.state.calls == 3
+    assert len({r.content for r in responses[:3]}) == 1
+    assert sum(r.headers.get("x-coalesced") == "hit" for r in responses[:3]) == 2
+
+
+def test_micro_cache_is_dropped_by_the_callers_writes():
+    app = make_app(cache_ms=5000)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/api/analytics/summary", **auth("a"))
+            cached = await client.get("/api/analytics/summary", **auth("a"))
+            await client.post("/api/reviews", **auth("a"))
+            fresh = await client.get("/api/analytics/summary", **auth("a"))
+            return first, cached, fresh
+
+    first, cached, fresh = asyncio.run(scenario())
+
+    assert cached.headers["x-coalesced"] == "cache"
+    assert cached.json() == first.json()
+    assert fresh.json()["calls"] == 2
+
+
+def test_reads_during_a_write_are_not_cached_past_it():
+    app = make_app(cache_ms=5000)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            write = asyncio.create_task(client.post("/api/items/bulk", **auth("a")))
+            await asyncio.sleep(0.01)
+            # Runs while the write is in flight and may see the old state
+            during = await client.get("/api/analytics/summary", **auth("a"))
+            await write
+            after = await client.get("/api/analytics/summary", **auth("a"))
+            return during, after
+
+    during, after = asyncio.run(scenario())
+
+    assert "x-coalesced" not in after.headers
+    assert after.json()["calls"] == during.json()["calls"] + 1
+
+
+def test_followers_are_charged_and_labelled_like_the_leader():
+    app = FastAPI()
+    limiter = RateLimiter({"reads": (0.001, 2), "writes": (1.0, 2), "imports": (0.1, 1)})
+
+    @app.get("/api/analytics/summary")
+    async def summary(request: Request):
+        # What get_current_user does once the token is verified
+        request.state.user_id = "user-a"
+        check_user_rate(request, "user-a", limiter=limiter)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(CoalesceMiddleware, limiter=limiter)
+    routes = []
+
+    async def outer(scope, receive, send):
+        await app(scope, receive, send)
+        if scope["type"] == "http":
+            routes.append(getattr(scope.get("route"), "path", "unmatched"))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=outer)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[client.get("/api/analytics/summary", **auth("a")) for _ in range(3)])
+
+    responses = asyncio.run(scenario())
+
+    # One run plus two replays, against a burst of two
+    assert sorted(r.status_code for r in responses) == [200, 200, 429]
+    assert routes == ["/api/analytics/summary"] * 3
@@ -0,0 +1,126 @@
+"""Collection clone and merge run as one set-based RPC each."""
+import uuid
+
+from postgrest.exceptions import APIError
+
+from app.reviews.ingest import review_ingestor
+from tests.conftest import USER_ID
+from tests.postgres import OTHER_USER_ID, act_as, requires_postgres, run_in_rollback, seed_collection, seed_item
+
+
+def test_clone_contract(client, fake_db, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(review_ingestor, "invalidate_engine", invalidated.append)
+    clone_id, source_id = str(uuid.uuid4()), str(uuid.uuid4())
+    calls = fake_db.canned_rpc("clone_collection", [{"collection_id": clone_id, "copied": 3, "skipped": 0}])
+
+    response = client.post(f"/api/collections/{source_id}/clone", json={"name": "Interview prep", "include_progress": False})
+
+    assert response.status_code == 200
+    assert response.json() == {"collection_id": clone_id, "copied": 3, "skipped": 0}
+    assert calls == [{"p_source_id": source_id, "p_name": "Interview prep", "p_description": None, "p_include_progress": False}]
+    assert invalidated == [USER_ID]
+    assert fake_db.round_trips == 1
+
+    fake_db.canned_rpc("clone_collection", [])
+    assert client.post(f"/api/collections/{source_id}/clone", json={"name": "Nope"}).status_code == 404
+
+    def taken(db, params):
+        raise APIError({"message": "duplicate key value", "code": "23505", "details": None, "hint": None})
+
+    fake_db.rpcs["clone_collection"] = taken
+    assert client.post(f"/api/collections/{source_id}/clone", json={"name": "Interview prep"}).status_code == 409
+
+
+def test_merge_contract(client, fake_db):
+    source_id, target_id = str(uuid.uuid4()), str(uuid.uuid4())
+    calls = fake_db.canned_rpc("merge_collection_items", [{"copied": 2, "skipped": 1}])
+    url = f"/api/collections/{source_id}/merge"
+
+    response = client.post(url, json={"target_id": target_id})
+
+    assert response.status_code == 200
+    assert response.json() == {"collection_id": target_id, "copied": 2, "skipped": 1}
+    assert calls == [{"p_source_id": source_id, "p_target_id": target_id, "p_include_progress": True}]
+
+    assert client.post(url, json={"target_id": source_id}).status_code == 400
+    assert len(calls) == 1
+    fake_db.canned_rpc("merge_collection_items", [])
+    assert client.post(url, json={"target_id": target_id}).status_code == 404
+
+
+@requires_postgres
+def test_merge_collection_items_sql():
+    async def scenario(conn):
+        source = await seed_collection(conn, USER_ID, "Source")
+        target = await seed_collection(conn, USER_ID, "Target")
+        theirs = await seed_collection(conn, OTHER_USER_ID, "Theirs")
+        await seed_item(conn, USER_ID, source, "Two Sum", external_id="1")
+        add_two = await seed_item(conn, USER_ID, source, "Add Two Numbers", external_id="2", interval_days=12)
+        await seed_item(conn, USER_ID, source, "Own notes")
+        await seed_item(conn, USER_ID, source, "Archived", external_id="3", archived=True)
+        # Already in the target: by external_id (title differs) and by title
+        await seed_item(conn, USER_ID, target, "Two Sum (again)", external_id="1")
+        await seed_item(conn, USER_ID, target, "Own notes")
+
+        await act_as(conn, USER_ID)
+        first = await conn.fetchrow("SELECT * FROM public.merge_collection_items($1::uuid, $2::uuid)", source, target)
+        again = await conn.fetchrow("SELECT * FROM public.merge_collection_items($1::uuid, $2::uuid)", source, target)
+        foreign = await conn.fetch("SELECT * FROM public.merge_collection_items($1::uuid, $2::uuid)", source, theirs)
+        await act_as(conn, None)
+
+        assert (first["copied"], first["skipped"]) == (1, 2)
+        assert (again["copied"], again["skipped"]) == (0, 3)
+        assert foreign == []
+        copy = await conn.fetchrow(
+            """
+            SELECT i.title, ss.interval_days, ss.status
+            FROM public.items i JOIN public.scheduling_states ss ON ss.item_id = i.id
+            WHERE i.collection_id = $1::uuid AND i.external_id = '2'
+            """,
+            target,
+        )
+        original = await conn.fetchval("SELECT interval_days FROM public.scheduling_states WHERE item_id = $1::uuid", add_two)
+        assert (copy["title"], copy["interval_days"], copy["status"]) == ("Add Two Numbers", original, "review")
+        assert await conn.fetchval("SELECT count(*) FROM public.items WHERE collection_id = $1::uuid", theirs) == 0
+
+    run_in_rollback(scenario)
+
+
+@requires_postgres
+def test_clone_collection_sql():
+    import asyncpg
+
+    async def scenario(conn):
+        source = await seed_collection(conn, USER_ID, "Source")
+        theirs = await seed_collection(conn, OTHER_USER_ID, "Theirs")
+        for n in range(3):
+            await seed_item(conn, USER_ID, source, f"Problem {n}", external_id=str(n))
+        await seed_item(conn, USER_ID, source, "Archived", external_id="9", archived=True)
+
+        await act_as(conn, USER_ID)
+        clone = await conn.fetchrow("SELECT * FROM public.clone_collection($1::uuid, 'Interview prep', NULL, FALSE)", source)
+        try:
+            async with conn.transaction():
+                await conn.fetch("SELECT * FROM public.clone_collection($1::uuid, 'Interview prep')", source)
+            raise AssertionError("a taken name should raise")
+        except asyncpg.UniqueViolationError as error:
+            assert error.sqlstate == "23505"
+        foreign = await conn.fetch("SELECT * FROM public.clone_collection($1::uuid, 'Mine now')", theirs)
+        await act_as(conn, None)
+
+        assert (clone["copied"], clone["skipped"]) == (3, 0)
+        assert foreign == []
+        statuses = await conn.fetch(
+            """
+            SELECT ss.status
+            FROM public.items i JOIN public.scheduling_states ss ON ss.item_id = i.id
+            WHERE i.collection_id = $1
+            """,
+            clone["collection_id"],
+        )
+        assert [row["status"] for row in statuses] == ["new"] * 3
+        names = await conn.fetch("SELECT name FROM public.collections WHERE user_id = $1::uuid ORDER BY name", USER_ID)
+        assert [row["name"] for row in names] == ["Interview prep", "Source"]
+
+    run_in_rollback(scenario)
@@ -0,0 +1,59 @@
+"""Response encoding negotiation and compression on the production app."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_current_user, get_authenticated_supabase, get_supabase
+from app.encoding import wants_msgpack
+from app.main import app
+from tests.conftest import USER_ID
+from tests.test_round_trips import seed_deck
+
+
+@pytest.fixture
+def main_client(fake_db):
+    app.dependency_overrides[get_current_user] = lambda: {
+        "id": USER_ID, "email": "test@example.com", "token": "test-token"
+    }
+    app.dependency_overrides[get_authenticated_supabase] = lambda: fake_db
+    app.dependency_overrides[get_supabase] = lambda: fake_db
+    # No lifespan: the job runner is not needed here
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_json_by_default_and_gzipped_when_large(main_client, fake_db):
+    seed_deck(fake_db, items=50, reviews_per_item=0)
+
+    response = main_client.get("/api/items", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept" in response.headers["vary"]
+    assert len(response.json()) == 50
+
+
+def test_small_responses_are_not_compressed(main_client):
+    response = main_client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "healthy"}
+
+
+def test_msgpack_when_accepted(main_client, fake_db):
+    msgpack = pytest.importorskip("msgpack")
+    seed_deck(fake_db, items=10, reviews_per_item=0)
+
+    response = main_client.get("/api/items", headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert len(msgpack.unpackb(response.content)) == 10
+
+
+def test_accept_parsing():
+    if not wants_msgpack("application/msgpack"):
+        pytest.skip("msgpack not installed")
+    assert wants_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert not wants_msgpack("application/msgpack;q=0")
+    assert not wants_msgpack("*/*")
+    assert not wants_msgpack(None)
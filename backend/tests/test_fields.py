@@ -0,0 +1,47 @@
+"""Sparse fieldsets are applied in the select list, not after the fact."""
+from tests.test_round_trips import seed_deck
+
+
+def test_list_items_card_preset_selects_only_card_columns(client, fake_db):
+    seed_deck(fake_db, items=5, reviews_per_item=0)
+
+    response = client.get("/api/items", params={"fields": "card"})
+
+    assert response.status_code == 200
+    item = response.json()[0]
+    assert "notes" not in item and "created_at" not in item
+    assert set(item["scheduling_states"][0]) == {"status", "next_review_at", "last_review_at", "last_rating"}
+    assert item["recent_review"]["rating"] == 3
+    assert "notes" not in fake_db.queries[0].select
+
+
+def test_column_list_keeps_required_columns(client, fake_db):
+    seed_deck(fake_db, items=3, reviews_per_item=0)
+
+    response = client.get("/api/items", params={"fields": "title,scheduling_states.next_review_at"})
+
+    assert response.status_code == 200
+    item = response.json()[0]
+    assert set(item) == {"id", "title", "scheduling_states", "recent_review"}
+    assert set(item["scheduling_states"][0]) == {"last_rating", "last_review_at", "next_review_at"}
+
+
+def test_due_items_card_preset(client, fake_db):
+    seed_deck(fake_db, items=5, reviews_per_item=0)
+
+    response = client.get("/api/reviews/due", params={"fields": "card", "difficulty": "Medium"})
+
+    assert response.status_code == 200
+    state = response.json()[0]
+    assert set(state) == {"item_id", "status", "next_review_at", "interval_days", "items"}
+    assert set(state["items"]) == {"id", "title", "external_id", "external_url", "metadata"}
+    assert fake_db.round_trips == 1
+
+
+def test_unknown_fields_are_rejected(client, fake_db):
+    seed_deck(fake_db, items=1, reviews_per_item=0)
+
+    for fields in ("compact", "title,password", "items.title"):
+        response = client.get("/api/items", params={"fields": fields})
+        assert response.status_code == 400
+    assert fake_db.round_trips == 0
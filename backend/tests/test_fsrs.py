@@ -0,0 +1,137 @@
+"""FSRS engine: scheduling, per-collection selection and parameter fitting."""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.reviews.fsrs import DEFAULT_PARAMETERS, FSRSScheduler, retrievability
+from app.reviews.scheduler import SM2Scheduler, SchedulingState, scheduler_for
+from tests.conftest import USER_ID
+from tests.test_round_trips import seed_deck
+
+
+def _reviewed(days_ago: int, interval_days: int, **memory) -> SchedulingState:
+    now = datetime.now(timezone.utc)
+    return SchedulingState(
+        interval_days=interval_days,
+        repetitions=2,
+        status="review",
+        next_review_at=now,
+        last_review_at=now - timedelta(days=days_ago),
+        **memory,
+    )
+
+
+def test_fsrs_intervals_follow_memory_state():
+    engine = FSRSScheduler()
+
+    first = engine.process_review(SchedulingState(), 3).new_state
+    assert first.stability == pytest.approx(DEFAULT_PARAMETERS[2])
+    assert first.interval_days == round(DEFAULT_PARAMETERS[2])
+
+    state = _reviewed(10, 10, stability=10.0, difficulty=5.0)
+    good = engine.process_review(state, 3).new_state
+    easy = engine.process_review(state, 4).new_state
+    again = engine.process_review(state, 1).new_state
+    assert again.stability < 10 < good.stability < easy.stability
+    assert again.repetitions == 0 and again.status == "learning"
+    assert easy.difficulty < good.difficulty < again.difficulty
+
+    # Recalling after a longer gap is stronger evidence
+    late = engine.process_review(_reviewed(30, 10, stability=10.0, difficulty=5.0), 3).new_state
+    assert late.stability > good.stability
+
+    # Items new to FSRS start from their SM-2 interval
+    seeded = engine.process_review(_reviewed(6, 6), 3).new_state
+    assert seeded.stability > 6
+
+
+def test_higher_desired_retention_shortens_intervals():
+    stability = 20.0
+    assert FSRSScheduler(desired_retention=0.9).next_interval(stability) == 20
+    assert FSRSScheduler(desired_retention=0.95).next_interval(stability) < 20
+    assert retrievability(stability, stability) == pytest.approx(0.9)
+
+
+def test_scheduler_for_reads_collection_config():
+    assert isinstance(scheduler_for(None), SM2Scheduler)
+    assert isinstance(scheduler_for({"scheduler": "sm2"}), SM2Scheduler)
+
+    engine = scheduler_for({"scheduler": "fsrs", "desired_retention": 0.85}, [1.0] * 17)
+    assert isinstance(engine, FSRSScheduler)
+    assert engine.desired_retention == 0.85
+    # Clamped to the parameter bounds
+    assert engine.w[7] == 0.5
+
+
+def test_review_in_fsrs_collection_stores_memory_state(client, fake_db):
+    collections, items = seed_deck(fake_db, items=1, reviews_per_item=1)
+    fake_db.rows("collections")[0]["config"] = {"scheduler": "fsrs"}
+
+    response = client.post("/api/reviews", json={"item_id": items[0]["id"], "rating": 3})
+
+    assert response.status_code == 200
+    state = fake_db.rows("scheduling_states")[0]
+    assert state["stability"] > 6
+    assert 1 <= state["difficulty"] <= 10
+    assert response.json()["interval_days"] == state["interval_days"]
+
+
+def _simulated_log(engine: FSRSScheduler, items: int, reviews: int, seed: int = 0):
+    rng = random.Random(seed)
+    log = []
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(items):
+        at = start
+        log.append({"item_id": f"item-{i:05d}", "rating": 3, "reviewed_at": at.isoformat()})
+        stability, difficulty = engine.w[2], engine.initial_difficulty(3)
+        for _ in range(reviews - 1):
+            elapsed = max(1, round(rng.uniform(0.5, 2.0) * engine.next_interval(stability)))
+            at += timedelta(days=elapsed)
+            r = retrievability(elapsed, stability)
+            rating = 1 if rng.random() > r else rng.choice([2, 3, 3, 4])
+            log.append({"item_id": f"item-{i:05d}", "rating": rating, "reviewed_at": at.isoformat()})
+            if rating == 1:
+                stability = min(stability, engine.forget_stability(difficulty, stability, r))
+            else:
+                stability = engine.recall_stability(difficulty, stability, r, rating)
+            difficulty = engine.next_difficulty(difficulty, rating)
+    return log
+
+
+def test_fit_improves_log_loss():
+    pytest.importorskip("numpy")
+    from app.reviews.fsrs_optimizer import build_sequences, fit_parameters
+
+    truth = FSRSScheduler([0.8, 2.0, 6.0, 20.0, 6.0, 1.0, 1.2, 0.05, 1.2, 0.2, 1.3, 2.0, 0.1, 0.3, 1.5, 0.3, 2.5])
+    sequences = build_sequences(_simulated_log(truth, items=400, reviews=6))
+    assert len(sequences) == 400 and all(len(sequence) == 6 for sequence in sequences)
+
+    result = fit_parameters(sequences, epochs=3, batch_size=128)
+
+    assert result["reviews"] == 2000
+    assert result["loss_after"] < result["loss_before"]
+    assert len(result["parameters"]) == 17
+    assert build_sequences([{"item_id": "a", "rating": 3, "reviewed_at": "2024-01-01T00:00:00+00:00"}]) == []
+
+
+def test_fetch_reviews_pages_by_key(fake_db, monkeypatch):
+    from app.reviews import fsrs_optimizer
+
+    monkeypatch.setattr(fsrs_optimizer, "REVIEW_PAGE_SIZE", 2)
+    # Two reviews share a timestamp across the first page boundary
+    tied = "2024-01-02T00:00:00+00:00"
+    fake_db.seed(
+        "reviews",
+        *({"user_id": USER_ID, "item_id": "b", "rating": 3, "reviewed_at": at} for at in (tied, "2024-01-01T00:00:00+00:00")),
+        *({"user_id": USER_ID, "item_id": "a", "rating": 3, "reviewed_at": at} for at in (tied, tied, "2024-01-03T00:00:00+00:00")),
+        {"user_id": "00000000-0000-0000-0000-000000000002", "item_id": "a", "rating": 1, "reviewed_at": tied},
+    )
+
+    reviews = fsrs_optimizer.fetch_reviews(fake_db, USER_ID)
+
+    assert [(review["item_id"], review["reviewed_at"][:10]) for review in reviews] == [
+        ("a", "2024-01-02"), ("a", "2024-01-02"), ("a", "2024-01-03"), ("b", "2024-01-01"), ("b", "2024-01-02"),
+    ]
+    assert len({review["id"] for review in reviews}) == 5
+    assert fake_db.round_trips == 3
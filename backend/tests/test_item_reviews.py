@@ -0,0 +1,54 @@
+"""An item's review timeline, paged newest first."""
+from uuid import uuid4
+
+from tests.test_round_trips import seed_deck
+
+
+def test_timeline_pages_with_a_cursor(client, fake_db):
+    _, items = seed_deck(fake_db, items=2, reviews_per_item=5)
+    url = f"/api/items/{items[0]['id']}/reviews"
+
+    first = client.get(url, params={"limit": 3}).json()
+    assert len(first["reviews"]) == 3
+    assert fake_db.round_trips == 1
+    second = client.get(url, params={"limit": 3, "cursor": first["next_cursor"]}).json()
+
+    timeline = [review["reviewed_at"] for review in first["reviews"] + second["reviews"]]
+    assert timeline == sorted(timeline, reverse=True)
+    assert len(set(timeline)) == 5
+    assert second["next_cursor"] is None
+    assert set(first["reviews"][0]) == {
+        "id", "rating", "reviewed_at",
+        "ease_factor_before", "ease_factor_after", "interval_before", "interval_after",
+    }
+
+
+def test_timeline_of_unreviewed_and_missing_items(client, fake_db):
+    _, items = seed_deck(fake_db, items=1, reviews_per_item=0)
+
+    body = client.get(f"/api/items/{items[0]['id']}/reviews").json()
+    assert body == {"reviews": [], "next_cursor": None}
+
+    assert client.get(f"/api/items/{uuid4()}/reviews").status_code == 404
+    assert client.get(f"/api/items/{items[0]['id']}/reviews?cursor=not-a-cursor").status_code == 400
+
+
+def test_timeline_pages_through_equal_timestamps(client, fake_db):
+    _, items = seed_deck(fake_db, items=1, reviews_per_item=0)
+    item = items[0]
+    # Bulk-imported history: several reviews share one timestamp
+    fake_db.seed("reviews", *[
+        {"item_id": item["id"], "user_id": item["user_id"], "rating": 3, "reviewed_at": "2026-01-01T00:00:00+00:00"}
+        for _ in range(5)
+    ])
+    url = f"/api/items/{item['id']}/reviews"
+
+    seen, cursor = [], None
+    while True:
+        body = client.get(url, params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        seen += [review["id"] for review in body["reviews"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(review["id"] for review in fake_db.rows("reviews"))
@@ -0,0 +1,76 @@
+"""Background job runner: orphaned jobs and the service-role client."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.jobs.router import _bulk_create, _fit_fsrs, _import_preset
+from app.jobs.runner import JobRunner
+from app.services.items import ItemsService
+from tests.conftest import USER_ID
+
+OTHER_USER_ID = "00000000-0000-0000-0000-000000000002"
+
+
+def test_beat_fails_orphaned_jobs(fake_db):
+    long_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    orphan, queued_here, finished = fake_db.seed(
+        "jobs",
+        {"user_id": USER_ID, "kind": "bulk_import", "status": "running", "updated_at": long_ago},
+        {"user_id": USER_ID, "kind": "bulk_import", "status": "queued", "updated_at": long_ago},
+        {"user_id": USER_ID, "kind": "bulk_import", "status": "succeeded", "updated_at": long_ago},
+    )
+    runner = JobRunner(max_concurrency=1, supabase=fake_db)
+    runner._unfinished.add(queued_here["id"])
+
+    runner._beat()
+
+    status = {row["id"]: row["status"] for row in fake_db.rows("jobs")}
+    # Still queued here, so the heartbeat kept it alive
+    assert status == {orphan["id"]: "failed", queued_here["id"]: "queued", finished["id"]: "succeeded"}
+    assert fake_db.rows("jobs")[0]["error"].startswith("Interrupted")
+
+
+def test_stop_fails_jobs_still_queued(fake_db):
+    job = fake_db.seed("jobs", {"user_id": USER_ID, "kind": "bulk_import", "status": "queued"})[0]
+    runner = JobRunner(max_concurrency=1, supabase=fake_db)
+
+    async def scenario():
+        await runner.start()
+        runner._unfinished.add(job["id"])
+        await runner.stop()
+
+    asyncio.run(scenario())
+
+    assert fake_db.rows("jobs")[0]["status"] == "failed"
+
+
+def test_bulk_job_checks_the_collection_owner(fake_db):
+    # Jobs run on the service-role client, so RLS does not stop this
+    other_collection = fake_db.seed("collections", {"user_id": OTHER_USER_ID, "name": "Theirs"})[0]
+
+    async def progress(done, total):
+        pass
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_bulk_create(progress, ItemsService(fake_db, USER_ID), other_collection["id"], [{"title": "Two Sum"}]))
+
+    assert exc.value.status_code == 404
+    assert not fake_db.rows("items")
+
+
+def test_jobs_report_missing_rows_as_not_found(fake_db):
+    other_collection = fake_db.seed("collections", {"user_id": OTHER_USER_ID, "name": "Theirs"})[0]
+
+    async def progress(done, total):
+        pass
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_import_preset(progress, ItemsService(fake_db, USER_ID), other_collection["id"], {"problems": []}))
+    assert (exc.value.status_code, exc.value.detail) == (404, "Collection not found")
+
+    # No profile row: a 404, not PostgREST's "multiple (or no) rows" error
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(_fit_fsrs(progress, fake_db, OTHER_USER_ID))
+    assert (exc.value.status_code, exc.value.detail) == (404, "Profile not found")
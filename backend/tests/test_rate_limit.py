@@ -0,0 +1,135 @@
+"""Token bucket rate limiting and the import concurrency gate."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.ratelimit import (
+    ConcurrencyGate, RateLimiter, RateLimitMiddleware, caller_key, check_user_rate, parse_networks, route_class,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def limited_client(clock):
+    app = FastAPI()
+
+    @app.get("/api/analytics/summary")
+    async def summary():
+        return {"ok": True}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+    limiter = RateLimiter({"reads": (1.0, 3), "writes": (1.0, 3), "imports": (0.1, 1)}, clock=clock)
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return TestClient(app)
+
+
+def test_route_classes():
+    assert route_class("GET", "/api/items") == "reads"
+    assert route_class("POST", "/api/reviews") == "writes"
+    assert route_class("POST", "/api/presets/blind75/import") == "imports"
+    assert route_class("POST", "/api/items/bulk") == "imports"
+    assert route_class("OPTIONS", "/api/items") is None
+    assert route_class("GET", "/api/health") is None
+
+
+def test_bucket_empties_then_refills(limited_client, clock):
+    for _ in range(3):
+        assert limited_client.get("/api/analytics/summary").status_code == 200
+
+    response = limited_client.get("/api/analytics/summary")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+    # Exempt routes are unaffected
+    assert limited_client.get("/api/health").status_code == 200
+
+    clock.now += 1
+    assert limited_client.get("/api/analytics/summary").status_code == 200
+
+
+def test_unverified_tokens_share_the_address_bucket(limited_client):
+    # The token is not verified before the middleware, so a new one each
+    # time must not buy a fresh bucket
+    for n in range(3):
+        headers = {"Authorization": f"Bearer made-up-{n}"}
+        assert limited_client.get("/api/analytics/summary", headers=headers).status_code == 200
+    headers = {"Authorization": "Bearer made-up-3"}
+    assert limited_client.get("/api/analytics/summary", headers=headers).status_code == 429
+
+
+def test_client_address_behind_trusted_proxies():
+    proxies = parse_networks("10.0.0.0/8, 192.168.1.5")
+
+    def scope(client, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return {"type": "http", "client": (client, 443), "headers": headers}
+
+    # Hops are peeled off from the right while they are trusted proxies
+    assert caller_key(scope("10.0.0.2", "203.0.113.7, 192.168.1.5"), proxies) == "ip:203.0.113.7"
+    # A client cannot pick its address by prepending entries
+    assert caller_key(scope("10.0.0.2", "1.1.1.1, 203.0.113.7"), proxies) == "ip:203.0.113.7"
+    # Untrusted peers are taken as they are
+    assert caller_key(scope("198.51.100.1", "1.1.1.1"), proxies) == "ip:198.51.100.1"
+    assert caller_key(scope("10.0.0.2", "1.1.1.1")) == "ip:10.0.0.2"
+
+
+def test_user_budget_is_keyed_on_verified_id(clock):
+    app = FastAPI()
+    limiter = RateLimiter({"reads": (1.0, 2), "writes": (1.0, 2), "imports": (0.1, 1)}, clock=clock)
+    tokens = {"token-1": "user-a", "token-2": "user-a", "token-3": "user-b"}
+
+    @app.get("/api/items")
+    async def items(request: Request):
+        user_id = tokens[request.headers["authorization"].split()[1]]
+        check_user_rate(request, user_id, limiter=limiter)
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    def get(token):
+        return client.get("/api/items", headers={"Authorization": f"Bearer {token}"})
+
+    # Two tokens for the same user draw from one budget
+    assert get("token-1").status_code == 200
+    assert get("token-2").status_code == 200
+    response = get("token-1")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert get("token-2").status_code == 429
+
+    # Other users are unaffected
+    assert get("token-3").status_code == 200
+
+
+def test_concurrency_gate_rejects_when_full():
+    gate = ConcurrencyGate("test_gate", limit=1, wait_seconds=0.01)
+
+    async def scenario():
+        async with gate:
+            with pytest.raises(HTTPException) as exc:
+                async with gate:
+                    pass
+            assert exc.value.status_code == 503
+            assert exc.value.headers["Retry-After"]
+        # Released again
+        async with gate:
+            assert gate.active == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,200 @@
+"""Bulk reschedules and the urgency-ordered queue are set-based RPCs."""
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.reviews import router as reviews_router
+from app.reviews.ingest import ReviewIngestor
+from tests.conftest import USER_ID
+from tests.postgres import (
+    OTHER_USER_ID, act_as, due_dates, requires_postgres, run_in_rollback, seed_collection, seed_item,
+)
+from tests.test_round_trips import seed_deck
+
+
+def test_shift_due_dates_contract(client, fake_db):
+    calls = fake_db.canned_rpc("shift_due_dates", [{
+        "affected": 5, "first_due": "2026-01-08T00:00:00+00:00", "last_due": "2026-01-09T00:00:00+00:00",
+    }])
+    collection_id = str(uuid.uuid4())
+
+    preview = client.post("/api/reviews/reschedule/shift", json={"days": 7, "dry_run": True, "collection_id": collection_id})
+
+    assert preview.status_code == 200
+    assert calls == [{"p_days": 7, "p_collection_id": collection_id, "p_dry_run": True}]
+    assert preview.json()["affected"] == 5 and preview.json()["dry_run"] is True
+    assert preview.json()["first_due"].startswith("2026-01-08")
+    assert fake_db.round_trips == 1
+
+    applied = client.post("/api/reviews/reschedule/shift", json={"days": -3}).json()
+    assert calls[-1] == {"p_days": -3, "p_collection_id": None, "p_dry_run": False}
+    assert applied["dry_run"] is False
+
+
+def test_spread_backlog_contract(client, fake_db):
+    calls = fake_db.canned_rpc("spread_backlog", [
+        {"day": "2026-01-01", "day_offset": 0, "count": 4},
+        {"day": "2026-01-02", "day_offset": 1, "count": 4},
+        {"day": "2026-01-03", "day_offset": 2, "count": 2},
+    ])
+
+    response = client.post("/api/reviews/reschedule/spread", json={"days": 3, "daily_cap": 4})
+
+    assert response.status_code == 200
+    assert calls == [{"p_days": 3, "p_daily_cap": 4, "p_collection_id": None, "p_dry_run": False}]
+    body = response.json()
+    assert [day["count"] for day in body["days"]] == [4, 4, 2]
+    assert (body["affected"], body["due_now"]) == (6, 4)
+    assert fake_db.round_trips == 1
+
+
+@requires_postgres
+def test_shift_due_dates_sql():
+    async def scenario(conn):
+        deck = await seed_collection(conn, USER_ID)
+        other_deck = await seed_collection(conn, USER_ID, "Other deck")
+        active = [await seed_item(conn, USER_ID, deck, f"Problem {n}") for n in range(2)]
+        elsewhere = await seed_item(conn, USER_ID, other_deck, "Elsewhere")
+        archived = await seed_item(conn, USER_ID, deck, "Archived", archived=True)
+        theirs = await seed_item(conn, OTHER_USER_ID, await seed_collection(conn, OTHER_USER_ID), "Theirs")
+        everything = [*active, elsewhere, archived, theirs]
+        before = await due_dates(conn, everything)
+
+        await act_as(conn, USER_ID)
+        preview = await conn.fetchrow("SELECT * FROM public.shift_due_dates(7, $1::uuid, TRUE)", deck)
+        await act_as(conn, None)
+        assert preview["affected"] == 2
+        assert await due_dates(conn, everything) == before
+
+        await act_as(conn, USER_ID)
+        applied = await conn.fetchrow("SELECT * FROM public.shift_due_dates(7, $1::uuid, FALSE)", deck)
+        await act_as(conn, None)
+        after = await due_dates(conn, everything)
+        assert applied["affected"] == 2
+        assert applied["last_due"] == max(after[item] for item in active)
+        assert all(after[item] - before[item] == timedelta(days=7) for item in active)
+        # Other collections, archived items and other users are left alone
+        assert all(after[item] == before[item] for item in (elsewhere, archived, theirs))
+
+    run_in_rollback(scenario)
+
+
+@requires_postgres
+def test_spread_backlog_sql():
+    async def scenario(conn):
+        deck = await seed_collection(conn, USER_ID)
+        # Most urgent first: overdue relative to interval
+        backlog = [
+            await seed_item(conn, USER_ID, deck, f"Problem {n}", interval_days=interval, days_overdue=late)
+            for n, (interval, late) in enumerate(((1, 3), (2, 3), (3, 3), (6, 3), (10, 3), (30, 3), (60, 3)))
+        ]
+        archived = await seed_item(conn, USER_ID, deck, "Archived", interval_days=1, days_overdue=9, archived=True)
+        not_due = await seed_item(conn, USER_ID, deck, "Later", days_overdue=-2)
+        theirs = await seed_item(conn, OTHER_USER_ID, await seed_collection(conn, OTHER_USER_ID), "Theirs")
+        everything = [*backlog, archived, not_due, theirs]
+        before = await due_dates(conn, everything)
+
+        await act_as(conn, USER_ID)
+        plan = await conn.fetch("SELECT * FROM public.spread_backlog(3, 3, NULL, TRUE)")
+        await act_as(conn, None)
+        assert [(row["day_offset"], row["count"]) for row in plan] == [(0, 3), (1, 3), (2, 1)]
+        assert await due_dates(conn, everything) == before
+
+        await act_as(conn, USER_ID)
+        applied = await conn.fetch("SELECT * FROM public.spread_backlog(3, 3, NULL, FALSE)")
+        now = await conn.fetchval("SELECT NOW()")
+        await act_as(conn, None)
+        after = await due_dates(conn, everything)
+        assert [(row["day_offset"], row["count"]) for row in applied] == [(0, 3), (1, 3), (2, 1)]
+        # Day 0 keeps its due dates; the rest move whole days out, in urgency order
+        assert all(after[item] == before[item] for item in backlog[:3])
+        assert all(after[item] == now + timedelta(days=1) for item in backlog[3:6])
+        assert after[backlog[6]] == now + timedelta(days=2)
+        assert all(after[item] == before[item] for item in (archived, not_due, theirs))
+
+    run_in_rollback(scenario)
+
+
+def test_reschedule_flushes_pending_reviews_first(client, fake_db, tmp_path, monkeypatch):
+    fake_db.canned_rpc("shift_due_dates", [{"affected": 2, "first_due": None, "last_due": None}])
+    _, items = seed_deck(fake_db, items=2, reviews_per_item=0)
+    ingestor = ReviewIngestor(log_dir=str(tmp_path), flush_interval=60, batch_size=100)
+    asyncio.run(ingestor.start(run_flusher=False))
+    monkeypatch.setattr(reviews_router, "review_ingestor", ingestor)
+    original_flush = ingestor.flush
+    monkeypatch.setattr(ingestor, "flush", lambda supabase=None, **kwargs: original_flush(fake_db, **kwargs))
+    # Another user's review, queued ahead of this user's
+    ingestor._append({
+        "review": {"id": "other-review", "user_id": OTHER_USER_ID, "item_id": items[1]["id"], "rating": 3},
+        "state": {},
+        "collection_id": None,
+    })
+
+    client.post("/api/reviews", json={"item_id": items[0]["id"], "rating": 3})
+    assert ingestor.pending_count() == 2
+
+    client.post("/api/reviews/reschedule/shift", json={"days": 2})
+
+    assert ingestor.pending_count() == 1
+    assert len(fake_db.rows("reviews")) == 1
+    assert ingestor.pending_items(OTHER_USER_ID)
+    ingestor._log.close()
+
+
+def test_due_queue_by_urgency(client, fake_db):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=0)
+    collection_id = items[0]["collection_id"]
+    # The ranking is the database's (see test_urgent_due_items_sql); the
+    # router keeps its order when reading the states
+    calls = fake_db.canned_rpc("urgent_due_items", [
+        {"item_id": items[2]["id"], "urgency": 1.0},
+        {"item_id": items[1]["id"], "urgency": 0.67},
+    ])
+
+    by_due = client.get("/api/reviews/due").json()
+    by_urgency = client.get(
+        "/api/reviews/due", params={"order": "urgency", "limit": 2, "collection_id": collection_id},
+    ).json()
+
+    assert [s["item_id"] for s in by_due] == [items[0]["id"], items[1]["id"], items[2]["id"]]
+    assert calls == [{"p_limit": 2, "p_collection_id": collection_id, "p_metadata": {}, "p_tag_id": None}]
+    assert [s["item_id"] for s in by_urgency] == [items[2]["id"], items[1]["id"]]
+    assert by_urgency[0]["items"]["title"] == items[2]["title"]
+    assert client.get("/api/reviews/due", params={"order": "random"}).status_code == 422
+
+
+def test_archived_items_are_not_due(client, fake_db):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=0)
+    client.delete(f"/api/items/{items[0]['id']}")  # archived
+
+    # Like the due_only facets, which count unarchived items only; the
+    # urgency order leaves them out in SQL (test_urgent_due_items_sql)
+    due = client.get("/api/reviews/due").json()
+    assert {state["item_id"] for state in due} == {items[1]["id"], items[2]["id"]}
+
+
+@requires_postgres
+def test_urgent_due_items_sql():
+    async def scenario(conn):
+        deck = await seed_collection(conn, USER_ID)
+        # (interval, days overdue): urgency 1, 0.67, 0.33, 0.025
+        ranked = [
+            await seed_item(conn, USER_ID, deck, f"Problem {n}", interval_days=interval, days_overdue=late)
+            for n, (interval, late) in enumerate(((1, 1), (3, 2), (30, 10), (200, 5)))
+        ]
+        await seed_item(conn, USER_ID, deck, "Archived", interval_days=1, days_overdue=9, archived=True)
+        await seed_item(conn, USER_ID, deck, "Later", interval_days=1, days_overdue=-1)
+        await seed_item(conn, OTHER_USER_ID, await seed_collection(conn, OTHER_USER_ID), "Theirs", interval_days=1, days_overdue=9)
+
+        await act_as(conn, USER_ID)
+        everything = await conn.fetch("SELECT item_id::text, urgency FROM public.urgent_due_items(10)")
+        top = await conn.fetch("SELECT item_id::text FROM public.urgent_due_items(2)")
+        await act_as(conn, None)
+
+        assert [row["item_id"] for row in everything] == ranked
+        assert everything[0]["urgency"] == pytest.approx(1, abs=0.01)
+        assert [row["item_id"] for row in top] == ranked[:2]
+
+    run_in_rollback(scenario)
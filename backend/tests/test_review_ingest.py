@@ -0,0 +1,148 @@
+"""Write-behind review ingestion: acknowledge from the log, flush in batches."""
+import asyncio
+import json
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.reviews import router as reviews_router
+from app.reviews.ingest import ReviewIngestor, ReviewLog
+from tests.conftest import USER_ID
+from tests.test_round_trips import seed_deck
+
+
+@pytest.fixture
+def ingestor(tmp_path, monkeypatch):
+    ingestor = ReviewIngestor(log_dir=str(tmp_path), flush_interval=60, batch_size=100)
+    asyncio.run(ingestor.start(run_flusher=False))
+    monkeypatch.setattr(reviews_router, "review_ingestor", ingestor)
+    yield ingestor
+    if ingestor._log is not None:
+        ingestor._log.close()
+
+
+def test_review_is_acknowledged_before_database_write(client, fake_db, ingestor):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=1)
+
+    response = client.post("/api/reviews", json={"item_id": items[0]["id"], "rating": 3})
+
+    assert response.status_code == 200
+    # profile check, state read and the user's scheduler settings; no writes
+    assert [query.method for query in fake_db.queries] == ["select", "select", "select"]
+    assert len(fake_db.rows("reviews")) == 3
+    assert ingestor.pending_count() == 1
+
+    due = client.get("/api/reviews/due").json()
+    assert items[0]["id"] not in [state["item_id"] for state in due]
+    assert len(due) == 2
+
+
+def test_flush_batches_reviews_and_states(client, fake_db, ingestor):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=0)
+    client.get("/api/reviews/due")  # warms the state cache
+    fake_db.reset_queries()
+
+    for item in items:
+        assert client.post("/api/reviews", json={"item_id": item["id"], "rating": 4}).status_code == 200
+    # the first write checks the profile and loads the scheduler settings;
+    # every state came from the cache
+    assert [query.table for query in fake_db.queries] == ["profiles", "profiles"]
+    fake_db.reset_queries()
+
+    assert asyncio.run(ingestor.flush(fake_db)) == 3
+
+    assert fake_db.round_trips == 2
+    assert len(fake_db.rows("reviews")) == 3
+    assert all(state["last_rating"] == 4 for state in fake_db.rows("scheduling_states"))
+    assert ingestor.pending_count() == 0
+    assert client.get("/api/reviews/due").json() == []
+
+
+def test_replay_after_crash_is_idempotent(tmp_path, fake_db, monkeypatch):
+    _, items = seed_deck(fake_db, items=2, reviews_per_item=0)
+    first = ReviewIngestor(log_dir=str(tmp_path), flush_interval=60, batch_size=100)
+
+    async def crash_after_write():
+        await first.start(run_flusher=False)
+        for item in items:
+            await first.submit(fake_db, USER_ID, item["id"], 3)
+        # The batch reaches the database, then the process dies before checkpointing
+        monkeypatch.setattr(first, "_checkpoint", lambda *args: (_ for _ in ()).throw(OSError("killed")))
+        with pytest.raises(OSError):
+            await first.flush(fake_db)
+        first._log.close()
+
+    asyncio.run(crash_after_write())
+    assert len(fake_db.rows("reviews")) == 2
+
+    # A torn append that was never acknowledged
+    with open(tmp_path / "reviews-0.log", "ab") as log:
+        log.write(b'{"review": {"id"')
+
+    second = ReviewIngestor(log_dir=str(tmp_path), flush_interval=60, batch_size=100)
+
+    async def restart():
+        await second.start(run_flusher=False)
+        assert second.pending_count() == 2
+        assert await second.flush(fake_db) == 2
+        await second.stop()
+
+    asyncio.run(restart())
+
+    assert len(fake_db.rows("reviews")) == 2
+    assert (tmp_path / "reviews-0.log").read_bytes() == b""
+
+
+def test_concurrent_submits_share_an_fsync(fake_db, ingestor, monkeypatch):
+    _, items = seed_deck(fake_db, items=8, reviews_per_item=0)
+    syncs = []
+    original_sync = ingestor._log.sync
+    monkeypatch.setattr(ingestor._log, "sync", lambda: (syncs.append(1), original_sync()))
+
+    async def review_all():
+        await asyncio.gather(*(ingestor.submit(fake_db, USER_ID, item["id"], 3) for item in items))
+
+    asyncio.run(review_all())
+
+    assert ingestor.pending_count() == 8
+    assert 1 <= len(syncs) < 8
+
+
+def test_rejected_review_is_dead_lettered(fake_db, ingestor, monkeypatch, tmp_path):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=0)
+    for item in items:
+        asyncio.run(ingestor.submit(fake_db, USER_ID, item["id"], 3))
+
+    # Hard-deleted after the review was acknowledged: the foreign key fails
+    fake_db.tables["items"] = [item for item in fake_db.rows("items") if item["id"] != items[1]["id"]]
+    original_write = ReviewIngestor._write
+
+    def write_with_foreign_key(supabase, reviews, records):
+        live = {item["id"] for item in supabase.rows("items")}
+        if any(review["item_id"] not in live for review in reviews):
+            raise APIError({"message": "violates foreign key constraint", "code": "23503", "details": None, "hint": None})
+        original_write(supabase, reviews, records)
+
+    monkeypatch.setattr(ReviewIngestor, "_write", staticmethod(write_with_foreign_key))
+
+    assert asyncio.run(ingestor.flush(fake_db)) == 3
+
+    assert ingestor.pending_count() == 0
+    assert {review["item_id"] for review in fake_db.rows("reviews")} == {items[0]["id"], items[2]["id"]}
+    dead = [json.loads(line) for line in (tmp_path / "reviews-0.dead").read_text().splitlines()]
+    assert [entry["record"]["review"]["item_id"] for entry in dead] == [items[1]["id"]]
+    assert (tmp_path / "reviews-0.log").read_bytes() == b""
+
+
+def test_stale_checkpoint_past_the_end_is_clamped(tmp_path):
+    # Crashed after truncating the log, before resetting the checkpoint
+    (tmp_path / "reviews-0.log").write_bytes(b"")
+    (tmp_path / "reviews-0.checkpoint").write_text("4096")
+
+    log = ReviewLog(tmp_path)
+    assert log.open() == []
+    log.append({"review": {"id": "r1"}})
+    log.close()
+
+    assert b"\0" not in (tmp_path / "reviews-0.log").read_bytes()
+    assert (tmp_path / "reviews-0.checkpoint").read_text() == "0"
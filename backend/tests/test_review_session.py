@@ -0,0 +1,43 @@
+"""Review session prefetch: due cards with a preview per rating."""
+from datetime import datetime, timezone
+
+from app.reviews.scheduler import scheduler, state_from_row
+from tests.test_review_ingest import ingestor  # noqa: F401
+from tests.test_round_trips import seed_deck
+
+
+def test_cards_come_with_previews_in_one_round_trip(client, fake_db):
+    _, items = seed_deck(fake_db, items=4, reviews_per_item=0)
+
+    cards = client.get("/api/reviews/session/next", params={"n": 3}).json()
+
+    assert fake_db.round_trips == 1
+    assert len(cards) == 3
+    card = cards[0]
+    assert "collections" not in card["items"] and "profiles" not in card
+    assert [preview["rating"] for preview in card["previews"]] == [1, 2, 3, 4]
+    state = next(s for s in fake_db.rows("scheduling_states") if s["item_id"] == card["item_id"])
+    expected = scheduler.process_review(state_from_row(state), 3).new_state
+    assert card["previews"][2]["interval_days"] == expected.interval_days
+    assert datetime.fromisoformat(card["previews"][2]["next_review_at"]) > datetime.now(timezone.utc)
+
+    # Prefetching past the cards already held
+    held = [card["item_id"] for card in cards]
+    rest = client.get("/api/reviews/session/next", params={"n": 3, "exclude": held}).json()
+    assert [card["item_id"] for card in rest] == [
+        item["id"] for item in items if item["id"] not in held
+    ]
+
+
+def test_session_warms_the_ingest_state_cache(client, fake_db, ingestor):  # noqa: F811
+    _, items = seed_deck(fake_db, items=2, reviews_per_item=0)
+    client.post("/api/reviews", json={"item_id": items[0]["id"], "rating": 3})
+
+    cards = client.get("/api/reviews/session/next").json()
+    assert [card["item_id"] for card in cards] == [items[1]["id"]]
+    fake_db.reset_queries()
+
+    response = client.post("/api/reviews", json={"item_id": items[1]["id"], "rating": 3})
+    assert response.json()["interval_days"] == cards[0]["previews"][2]["interval_days"]
+    # State from the session read, profile and scheduler settings already known
+    assert fake_db.round_trips == 0
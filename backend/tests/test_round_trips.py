@@ -0,0 +1,181 @@
+"""Round-trip and row budgets per endpoint.
+
+Each test seeds a deck, calls one endpoint and asserts how many Supabase
+round trips it made and how many rows it pulled back. A new N+1 query or
+an unbounded scan fails here instead of in production.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+from tests.conftest import USER_ID
+from tests.postgres import requires_postgres, run_in_rollback
+
+
+def seed_deck(db, items=50, reviews_per_item=20, collections=1):
+    """A user with reviewed items spread over collections, all due."""
+    now = datetime.now(timezone.utc)
+    collection_rows = db.seed("collections", *[
+        {"user_id": USER_ID, "name": f"Collection {c}"} for c in range(collections)
+    ])
+
+    item_rows = db.seed("items", *[
+        {
+            "user_id": USER_ID,
+            "collection_id": collection_rows[i % collections]["id"],
+            "title": f"Problem {i}",
+            "external_id": str(i),
+            "metadata": {"difficulty": "Medium", "topics": ["Array"], "pattern": "Two Pointers"},
+        }
+        for i in range(items)
+    ])
+
+    for item in item_rows:
+        db.seed("scheduling_states", {
+            "item_id": item["id"],
+            "user_id": USER_ID,
+            "status": "review",
+            "interval_days": 6,
+            "repetitions": 2,
+            "next_review_at": (now - timedelta(days=1)).isoformat(),
+            "last_review_at": (now - timedelta(days=7)).isoformat(),
+            "last_rating": 3,
+        })
+        db.seed("reviews", *[
+            {
+                "item_id": item["id"],
+                "user_id": USER_ID,
+                "rating": 3,
+                "reviewed_at": (now - timedelta(days=7 * (r + 1))).isoformat(),
+            }
+            for r in range(reviews_per_item)
+        ])
+
+    db.reset_queries()
+    return collection_rows, item_rows
+
+
+def test_list_items_is_one_bounded_query(client, fake_db):
+    seed_deck(fake_db, items=50, reviews_per_item=20)
+
+    response = client.get("/api/items", params={"limit": 500})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+    assert response.json()[0]["recent_review"]["rating"] == 3
+    assert fake_db.round_trips == 1
+    # Review history must not be scanned to build recent_review
+    assert fake_db.rows_fetched == 50
+
+
+def test_list_items_with_filters_stays_one_query(client, fake_db):
+    collections, _ = seed_deck(fake_db, items=20, reviews_per_item=5, collections=2)
+
+    response = client.get("/api/items", params={
+        "collection_id": collections[0]["id"],
+        "difficulty": "Medium",
+        "topic": "Array",
+    })
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert fake_db.round_trips == 1
+
+
+def test_repeated_topics_match_any(client, fake_db):
+    _, items = seed_deck(fake_db, items=4, reviews_per_item=0)
+    for item, topics in zip(items, (["Array"], ["Graph", "Hash, Set"], ["Tree"], ["Array", "Tree"])):
+        item["metadata"]["topics"] = topics
+    params = {"difficulty": "Medium", "topic": ["Graph", "Hash, Set", "Tree"]}
+
+    listed = client.get("/api/items", params=params).json()
+    due = client.get("/api/reviews/due", params=params).json()
+
+    expected = {items[1]["id"], items[2]["id"], items[3]["id"]}
+    assert {item["id"] for item in listed} == expected
+    assert {state["item_id"] for state in due} == expected
+
+
+@requires_postgres
+def test_metadata_matches_sql():
+    async def scenario(conn):
+        item = json.dumps({"difficulty": "Medium", "topics": ["Array", "Tree"], "pattern": "DFS"})
+        cases = {
+            '{}': True,
+            '{"topics": ["Graph", "Tree"]}': True,
+            '{"topics": ["Graph"]}': False,
+            '{"difficulty": "Medium", "topics": ["Array"]}': True,
+            '{"difficulty": "Easy", "topics": ["Array"]}': False,
+        }
+        for metadata_filter, expected in cases.items():
+            matched = await conn.fetchval("SELECT public.metadata_matches($1::jsonb, $2::jsonb)", item, metadata_filter)
+            assert matched is expected, metadata_filter
+
+    run_in_rollback(scenario)
+
+
+def test_get_due_items_is_one_query(client, fake_db):
+    seed_deck(fake_db, items=80, reviews_per_item=5)
+
+    response = client.get("/api/reviews/due", params={"limit": 50})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+    assert fake_db.round_trips == 1
+    assert fake_db.rows_fetched == 50
+
+
+def test_submit_review_budget(client, fake_db):
+    _, items = seed_deck(fake_db, items=5, reviews_per_item=5)
+
+    response = client.post("/api/reviews", json={"item_id": items[0]["id"], "rating": 3})
+
+    assert response.status_code == 200
+    # profile check, read state, insert review, update state
+    assert fake_db.round_trips <= 4
+
+
+def test_summary_budget(client, fake_db):
+    seed_deck(fake_db, items=20, reviews_per_item=10)
+
+    response = client.get("/api/analytics/summary")
+
+    assert response.status_code == 200
+    assert fake_db.round_trips <= 6
+
+
+def test_import_preset_does_not_insert_per_item(client, fake_db):
+    collections, _ = seed_deck(fake_db, items=0, reviews_per_item=0)
+
+    response = client.post("/api/presets/neetcode150/import", json={"collection_id": collections[0]["id"]})
+
+    assert response.status_code == 200
+    assert response.json()["items_created"] == 150
+    # profile check, collection check, existing ids, then items + states per 100-row chunk
+    assert fake_db.round_trips <= 3 + 2 * 2
+
+
+def test_collections_with_stats_has_no_per_collection_queries(client, fake_db):
+    seed_deck(fake_db, items=30, reviews_per_item=2, collections=10)
+    fake_db.rpcs["collection_stats"] = lambda db, params: []
+
+    response = client.get("/api/collections", params={"with_stats": True})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert fake_db.round_trips == 2
+
+
+def test_bulk_tag_is_set_based(client, fake_db):
+    _, items = seed_deck(fake_db, items=200, reviews_per_item=0)
+    tags = fake_db.seed("tags", {"user_id": USER_ID, "name": "Revisit"}, {"user_id": USER_ID, "name": "Hard"})
+    fake_db.reset_queries()
+
+    response = client.post("/api/tags/bulk", json={
+        "tag_ids": [tag["id"] for tag in tags],
+        "item_ids": [item["id"] for item in items],
+    })
+
+    assert response.status_code == 200
+    assert len(fake_db.rows("item_tags")) == 400
+    # tag ownership check plus one upsert
+    assert fake_db.round_trips == 2
@@ -0,0 +1,60 @@
+"""Worker cold start budget.
+
+Workers are scaled up on the morning review spike, so importing the app and
+running its startup must stay cheap: no Supabase or Prisma clients are built
+until a request needs them. Override the budget with STARTUP_BUDGET_SECONDS
+on slow machines.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "3.0"))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    healthy = client.get("/api/health").status_code == 200
+started_up = time.perf_counter() - started
+
+print(json.dumps({
+    "import_s": imported,
+    "startup_s": started_up,
+    "healthy": healthy,
+    "modules": [name for name in ("prisma", "supabase") if name in sys.modules],
+}))
+"""
+
+
+@pytest.fixture(scope="module")
+def probe() -> dict:
+    """Import and start the app in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_cold_start_is_within_budget(probe):
+    assert probe["healthy"]
+    assert probe["startup_s"] < STARTUP_BUDGET_SECONDS, probe
+
+
+def test_clients_are_not_built_at_startup(probe):
+    # Neither client library is even imported until first use
+    assert probe["modules"] == []
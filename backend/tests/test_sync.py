@@ -0,0 +1,81 @@
+"""Delta sync: full snapshot first, then only what changed."""
+from datetime import datetime, timedelta, timezone
+
+from app.sync import router as sync_router
+from tests.test_round_trips import seed_deck
+
+
+def _backdate(fake_db, days):
+    """Pretend every row was last written ``days`` ago."""
+    then = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    for table in ("collections", "items", "scheduling_states"):
+        for row in fake_db.rows(table):
+            row["updated_at"] = then
+
+
+def test_first_sync_is_a_full_snapshot(client, fake_db):
+    _, items = seed_deck(fake_db, items=3, reviews_per_item=0)
+    client.delete(f"/api/items/{items[2]['id']}")  # archived
+    fake_db.reset_queries()
+
+    body = client.get("/api/sync").json()
+
+    assert body["reset"] is True
+    assert len(body["collections"]) == 1
+    assert {item["id"] for item in body["items"]} == {items[0]["id"], items[1]["id"]}
+    assert len(body["scheduling_states"]) == 3
+    assert body["tombstones"] == []
+    assert fake_db.round_trips == 3
+
+
+def test_delta_returns_changes_and_tombstones(client, fake_db):
+    _, items = seed_deck(fake_db, items=4, reviews_per_item=0)
+    watermark = client.get("/api/sync").json()["watermark"]
+    # Age the snapshot's rows out of the overlap window
+    _backdate(fake_db, days=1)
+
+    client.patch(f"/api/items/{items[0]['id']}", json={"notes": "Use a monotonic stack"})
+    client.delete(f"/api/items/{items[1]['id']}")
+    client.delete(f"/api/items/{items[2]['id']}?archive=false")
+    fake_db.reset_queries()
+
+    body = client.get("/api/sync", params={"since": watermark}).json()
+
+    assert body["reset"] is False
+    assert [item["id"] for item in body["items"]] == [items[0]["id"]]
+    assert body["collections"] == [] and body["scheduling_states"] == []
+    assert {(t["id"], t["reason"]) for t in body["tombstones"]} == {
+        (items[1]["id"], "archived"),
+        (items[2]["id"], "deleted"),
+    }
+    assert body["watermark"] >= watermark
+    assert fake_db.round_trips == 4
+
+    # Nothing new: the watermark holds
+    again = client.get("/api/sync", params={"since": body["watermark"]}).json()
+    assert again["watermark"] == body["watermark"]
+
+
+def test_stale_watermark_gets_a_snapshot(client, fake_db):
+    seed_deck(fake_db, items=2, reviews_per_item=0)
+    since = (datetime.now(timezone.utc) - timedelta(days=90)).isoformat()
+
+    body = client.get("/api/sync", params={"since": since}).json()
+
+    assert body["reset"] is True
+    assert len(body["items"]) == 2
+
+
+def test_reads_are_paged_past_the_row_cap(client, fake_db, monkeypatch):
+    monkeypatch.setattr(sync_router, "SYNC_PAGE_SIZE", 2)
+    _, items = seed_deck(fake_db, items=5, reviews_per_item=0)
+
+    snapshot = client.get("/api/sync").json()
+    assert len(snapshot["items"]) == 5 and len(snapshot["scheduling_states"]) == 5
+    _backdate(fake_db, days=1)
+
+    for item in items:
+        client.delete(f"/api/items/{item['id']}?archive=false")
+    delta = client.get("/api/sync", params={"since": snapshot["watermark"]}).json()
+
+    assert {t["id"] for t in delta["tombstones"] if t["table"] == "items"} == {item["id"] for item in items}
@@ -24,7 +24,7 @@ export async function apiClient(endpoint: string, options: RequestInit = {}) {
 
 // Collections API
 export const collectionsAPI = {
-  list: () => apiClient('/api/collections'),
+  list: (withStats = false) => apiClient(`/api/collections${withStats ? '?with_stats=true' : ''}`),
   create: (data: any) => apiClient('/api/collections', {
     method: 'POST',
     body: JSON.stringify(data),
@@ -37,14 +37,28 @@ export const collectionsAPI = {
   delete: (id: string) => apiClient(`/api/collections/${id}`, {
     method: 'DELETE',
   }),
+  clone: (id: string, data: { name: string; description?: string; include_progress?: boolean }) =>
+    apiClient(`/api/collections/${id}/clone`, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    }),
+  merge: (id: string, data: { target_id: string; include_progress?: boolean }) =>
+    apiClient(`/api/collections/${id}/merge`, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    }),
 }
 
 // Items API
 export const itemsAPI = {
-  list: (params?: { collection_id?: string; archived?: boolean; limit?: number }) => {
+  list: (params?: { collection_id?: string; archived?: boolean; limit?: number; difficulty?: string; topic?: string; pattern?: string; tag?: string; facets?: boolean; fields?: string }) => {
     const query = new URLSearchParams(params as any).toString()
     return apiClient(`/api/items${query ? '?' + query : ''}`)
   },
+  search: (params: { q: string; collection_id?: string; limit?: number; offset?: number }) => {
+    const query = new URLSearchParams(params as any).toString()
+    return apiClient(`/api/items/search?${query}`)
+  },
   create: (data: any) => apiClient('/api/items', {
     method: 'POST',
     body: JSON.stringify(data),
@@ -54,6 +68,10 @@ export const itemsAPI = {
     body: JSON.stringify(data),
   }),
   get: (id: string) => apiClient(`/api/items/${id}`),
+  reviews: (id: string, params?: { limit?: number; cursor?: string }) => {
+    const query = new URLSearchParams(params as any).toString()
+    return apiClient(`/api/items/${id}/reviews${query ? '?' + query : ''}`)
+  },
   update: (id: string, data: any) => apiClient(`/api/items/${id}`, {
     method: 'PATCH',
     body: JSON.stringify(data),
@@ -65,10 +83,18 @@ export const itemsAPI = {
 
 // Reviews API
 export const reviewsAPI = {
-  getDue: (params?: { limit?: number; collection_id?: string }) => {
+  getDue: (params?: { limit?: number; collection_id?: string; difficulty?: string; topic?: string; pattern?: string; tag?: string; facets?: boolean; fields?: string; order?: 'due' | 'urgency' }) => {
     const query = new URLSearchParams(params as any).toString()
     return apiClient(`/api/reviews/due${query ? '?' + query : ''}`)
   },
+  sessionNext: (params?: { n?: number; collection_id?: string; exclude?: string[] }) => {
+    const query = new URLSearchParams()
+    if (params?.n) query.set('n', String(params.n))
+    if (params?.collection_id) query.set('collection_id', params.collection_id)
+    params?.exclude?.forEach(id => query.append('exclude', id))
+    const qs = query.toString()
+    return apiClient(`/api/reviews/session/next${qs ? '?' + qs : ''}`)
+  },
   submit: (data: { item_id: string; rating: 1 | 2 | 3 | 4 }) => apiClient('/api/reviews', {
     method: 'POST',
     body: JSON.stringify(data),
@@ -83,6 +109,7 @@ export const analyticsAPI = {
   getRetention: (days = 30) => apiClient(`/api/analytics/retention?days=${days}`),
   getHeatmap: (days = 365) => apiClient(`/api/analytics/heatmap?days=${days}`),
   getTopics: () => apiClient('/api/analytics/topics'),
+  getForgettingCurve: (days = 365) => apiClient(`/api/analytics/forgetting-curve?days=${days}`),
 }
 
 // Presets API
@@ -95,6 +122,45 @@ export const presetsAPI = {
   }),
 }
 
+// Tags API
+export const tagsAPI = {
+  list: (collectionId?: string) => apiClient(`/api/tags${collectionId ? '?collection_id=' + collectionId : ''}`),
+  create: (data: { name: string; color?: string; collection_id?: string }) => apiClient('/api/tags', {
+    method: 'POST',
+    body: JSON.stringify(data),
+  }),
+  update: (id: string, data: any) => apiClient(`/api/tags/${id}`, {
+    method: 'PATCH',
+    body: JSON.stringify(data),
+  }),
+  delete: (id: string) => apiClient(`/api/tags/${id}`, {
+    method: 'DELETE',
+  }),
+  bulk: (data: { tag_ids: string[]; item_ids: string[]; action?: 'add' | 'remove' }) => apiClient('/api/tags/bulk', {
+    method: 'POST',
+    body: JSON.stringify(data),
+  }),
+}
+
+// Jobs API
+export const jobsAPI = {
+  list: (limit = 20) => apiClient(`/api/jobs?limit=${limit}`),
+  get: (id: string) => apiClient(`/api/jobs/${id}`),
+  importPreset: (name: string, collectionId: string) => apiClient(`/api/jobs/presets/${name}/import`, {
+    method: 'POST',
+    body: JSON.stringify({ collection_id: collectionId }),
+  }),
+  bulkCreate: (data: any) => apiClient('/api/jobs/items/bulk', {
+    method: 'POST',
+    body: JSON.stringify(data),
+  }),
+}
+
+// Sync API (pass the previous response's watermark to get only changes)
+export const syncAPI = {
+  pull: (since?: string) => apiClient(`/api/sync${since ? '?since=' + encodeURIComponent(since) : ''}`),
+}
+
 // Auth API
 export const authAPI = {
   getMe: () => apiClient('/api/auth/me'),
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { useNavigate, useSearchParams } from 'react-router-dom'
 import { reviewsAPI, collectionsAPI } from '../api/client'
 import { Collection } from '../types'
@@ -8,9 +8,15 @@ import Card from '../components/common/Card'
 import CollectionSelector from '../components/review/CollectionSelector'
 import { getDifficultyVariant } from '../utils/badgeHelpers'
 
+interface RatingPreview {
+  rating: 1 | 2 | 3 | 4
+  interval_days: number
+  next_review_at: string
+}
+
 interface DueItem {
-  id: string
   item_id: string
+  previews: RatingPreview[]
   items: {
     id: string
     title: string
@@ -30,6 +36,9 @@ interface SessionState {
 
 const SESSION_STORAGE_KEY = 'review_session_state'
 const SESSION_EXPIRY_MS = 30 * 60 * 1000 // 30 minutes
+const BATCH_SIZE = 50
+// Fetch the next batch when this few cards are left
+const PREFETCH_REMAINING = 10
 
 function saveSessionState(state: SessionState) {
   try {
@@ -78,7 +87,10 @@ export default function ReviewSession() {
   const [dueItems, setDueItems] = useState<DueItem[]>([])
   const [currentIndex, setCurrentIndex] = useState(0)
   const [loading, setLoading] = useState(true)
-  const [submitting, setSubmitting] = useState(false)
+  const [hasMore, setHasMore] = useState(false)
+  const [prefetching, setPrefetching] = useState(false)
+  const [waitingForMore, setWaitingForMore] = useState(false)
+  const prefetchRequest = useRef<Promise<number> | null>(null)
   const [sessionComplete, setSessionComplete] = useState(false)
   const [reviewsCompleted, setReviewsCompleted] = useState(0)
   const [showPattern, setShowPattern] = useState(false)
@@ -121,12 +133,12 @@ export default function ReviewSession() {
   const loadDueItems = async () => {
     try {
       setLoading(true)
-      const params: any = { limit: 50 }
-      if (selectedCollectionId) {
-        params.collection_id = selectedCollectionId
-      }
-      const data = await reviewsAPI.getDue(params)
+      const data = await reviewsAPI.sessionNext({
+        n: BATCH_SIZE,
+        collection_id: selectedCollectionId ?? undefined,
+      })
       setDueItems(data)
+      setHasMore(data.length === BATCH_SIZE)
 
       if (data.length === 0) {
         setSessionComplete(true)
@@ -178,36 +190,85 @@ export default function ReviewSession() {
     setSessionRestored(false)
   }
 
+  // Append the cards after the ones already held; resolves to how many were
+  // new. Callers during a fetch share it.
+  const prefetchMore = () => {
+    if (!prefetchRequest.current) {
+      prefetchRequest.current = (async () => {
+        try {
+          setPrefetching(true)
+          const data: DueItem[] = await reviewsAPI.sessionNext({
+            n: BATCH_SIZE,
+            collection_id: selectedCollectionId ?? undefined,
+            exclude: dueItems.slice(-100).map(item => item.item_id),
+          })
+          const held = new Set(dueItems.map(item => item.item_id))
+          const fresh = data.filter(item => !held.has(item.item_id))
+          setDueItems(prev => [...prev, ...fresh])
+          setHasMore(data.length === BATCH_SIZE)
+          return fresh.length
+        } catch (err) {
+          console.error('Error prefetching due items:', err)
+          return 0
+        } finally {
+          setPrefetching(false)
+          prefetchRequest.current = null
+        }
+      })()
+    }
+    return prefetchRequest.current
+  }
+
+  const completeSession = () => {
+    setSessionComplete(true)
+    clearSessionState()
+  }
+
   const handleRating = async (rating: 1 | 2 | 3 | 4) => {
-    if (!currentItem) return
+    if (!currentItem || waitingForMore) return
 
-    try {
-      setSubmitting(true)
-      await reviewsAPI.submit({
-        item_id: currentItem.items.id,
-        rating,
-      })
+    // The next card is already here; the review is saved in the background
+    reviewsAPI.submit({
+      item_id: currentItem.items.id,
+      rating,
+    }).catch(err => {
+      console.error('Error submitting review:', err)
+      alert(`Failed to submit review for "${currentItem.items.title}"`)
+    })
 
-      setReviewsCompleted(prev => prev + 1)
+    setReviewsCompleted(prev => prev + 1)
 
-      // Reset pattern visibility for next item
-      setShowPattern(false)
+    // Reset pattern visibility for next item
+    setShowPattern(false)
 
-      // Move to next item or complete session
-      if (currentIndex < dueItems.length - 1) {
+    if (hasMore && !prefetching && dueItems.length - currentIndex - 1 <= PREFETCH_REMAINING) {
+      prefetchMore()
+    }
+
+    // Move to next item or complete session
+    if (currentIndex < dueItems.length - 1) {
+      setCurrentIndex(prev => prev + 1)
+    } else if (hasMore || prefetching) {
+      // Out of loaded cards, but more are on the way
+      setWaitingForMore(true)
+      const added = await prefetchMore()
+      setWaitingForMore(false)
+      if (added > 0) {
         setCurrentIndex(prev => prev + 1)
       } else {
-        setSessionComplete(true)
-        clearSessionState()
+        completeSession()
       }
-    } catch (err) {
-      console.error('Error submitting review:', err)
-      alert('Failed to submit review')
-    } finally {
-      setSubmitting(false)
+    } else {
+      completeSession()
     }
   }
 
+  const intervalLabel = (rating: 1 | 2 | 3 | 4) => {
+    const preview = currentItem?.previews?.find(p => p.rating === rating)
+    if (!preview) return undefined
+    return preview.interval_days === 1 ? 'in 1 day' : `in ${preview.interval_days} days`
+  }
+
   const currentItem = dueItems[currentIndex]
 
   if (showCollectionSelector) {
@@ -228,6 +289,14 @@ export default function ReviewSession() {
     )
   }
 
+  if (waitingForMore) {
+    return (
+      <div className="flex justify-center items-center h-64">
+        <div className="text-lg">Loading more cards...</div>
+      </div>
+    )
+  }
+
   const selectedCollection = selectedCollectionId
     ? collections.find(c => c.id === selectedCollectionId)
     : null
@@ -387,29 +456,29 @@ export default function ReviewSession() {
               label="Forgot"
               description="Couldn't recall at all"
               color="red"
+              interval={intervalLabel(1)}
               onClick={() => handleRating(1)}
-              disabled={submitting}
             />
             <RatingButton
               label="Hard"
               description="Recalled with struggle"
               color="orange"
+              interval={intervalLabel(2)}
               onClick={() => handleRating(2)}
-              disabled={submitting}
             />
             <RatingButton
               label="Good"
               description="Recalled with effort"
               color="blue"
+              interval={intervalLabel(3)}
               onClick={() => handleRating(3)}
-              disabled={submitting}
             />
             <RatingButton
               label="Easy"
               description="Instant recall"
               color="green"
+              interval={intervalLabel(4)}
               onClick={() => handleRating(4)}
-              disabled={submitting}
             />
           </div>
         </div>
@@ -418,12 +487,13 @@ export default function ReviewSession() {
   )
 }
 
-function RatingButton({ label, description, color, onClick, disabled }: {
+function RatingButton({ label, description, color, interval, onClick, disabled = false }: {
   label: string
   description: string
   color: string
+  interval?: string
   onClick: () => void
-  disabled: boolean
+  disabled?: boolean
 }) {
   const colorClasses: Record<string, string> = {
     red: 'bg-red-50 hover:bg-red-100 border-red-200 text-red-900',
@@ -440,6 +510,7 @@ function RatingButton({ label, description, color, onClick, disabled }: {
     >
       <div className="font-semibold text-lg">{label}</div>
       <div className="text-sm opacity-75">{description}</div>
+      {interval && <div className="text-xs font-medium mt-1">{interval}</div>}
     </button>
   )
 }
@@ -47,6 +47,7 @@ export interface SchedulingState {
   status: 'new' | 'learning' | 'review'
   next_review_at: string
   last_review_at?: string
+  last_rating?: 1 | 2 | 3 | 4
   created_at: string
   updated_at: string
 }